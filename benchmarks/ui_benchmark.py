@@ -0,0 +1,240 @@
+"""Benchmark sin ventana de los refrescos de FinanceApp.
+
+Arranca la app real (main_kivy.FinanceApp) con una ventana fuera de pantalla contra una BD
+generada con N categorías y M transacciones, ejecuta las acciones de la UI y mide, por
+escenario, el tiempo hasta que la pantalla queda al día, los percentiles del tiempo de frame
+y el pico de memoria. El resultado es JSON (por stdout o --output).
+
+    python -m benchmarks.ui_benchmark --categories 300 --transactions 100000 --repeat 5
+"""
+import os
+
+# La ventana y el Clock se configuran antes de importar Kivy
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_WINDOW', 'sdl2')
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen') # Contexto GL sin pantalla ('dummy' en SDL antiguos)
+
+import argparse
+import contextlib
+import json
+import logging
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+try:
+    import resource # Solo en Unix
+except ImportError:
+    resource = None
+
+from kivy.config import Config
+Config.set('graphics', 'maxfps', '0') # Sin esperas entre frames: se mide el trabajo, no el vsync
+
+from src import database
+from src.repository import category_repository
+
+SCENARIOS = ('load_categories', 'update_graph', 'update_totals', 'add_category', 'edit_category',
+             'distribute_income', 'burst_edits', 'timeline_pan')
+SETTLE_TIMEOUT_SECONDS = 60.0
+
+class _BenchmarkPopup:
+    """Sustituto del popup de alta/edición: las acciones solo llaman a dismiss()."""
+    def dismiss(self):
+        pass
+
+def generate_database(path: str, categories: int, transactions: int, seed: int = 0):
+    """Crea en 'path' una BD con el esquema actual, 'categories' categorías y 'transactions' gastos."""
+    database.DB_PATH = path
+    database.create_tables()
+    rng = random.Random(seed)
+    # Los porcentajes suman el 90%: queda margen para los escenarios de alta y edición
+    percentage = round(90 / categories, 4)
+    now = datetime.now()
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO Categories (name, percentage) VALUES (?, ?)",
+                         [(f"Categoría {i:05d}", percentage) for i in range(categories)])
+        category_ids = [row[0] for row in conn.execute("SELECT id FROM Categories")]
+        batch = []
+        for i in range(transactions):
+            amount_cents = rng.randint(100, 20000)
+            date = (now - timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S')
+            batch.append(('Expense', f"Gasto {i}", amount_cents, date, rng.choice(category_ids), -amount_cents))
+            if len(batch) >= 10000:
+                conn.executemany("""
+                    INSERT INTO Transactions (type, description, amount_cents, date, category_id, balance_delta_cents)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, batch)
+                batch = []
+        conn.executemany("""
+            INSERT INTO Transactions (type, description, amount_cents, date, category_id, balance_delta_cents)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, batch)
+        database.mark_changed('Categories', 'Transactions')
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class UIBenchmark:
+    """Arranca FinanceApp sin ventana visible y mide escenarios de refresco."""
+
+    def __init__(self):
+        import main_kivy # Importa KivyMD y registra las clases del kv
+        from kivy.base import EventLoop
+        self.main_kivy = main_kivy
+        self.event_loop = EventLoop
+        self.app = main_kivy.FinanceApp()
+        self.app._run_prepare() # Carga el kv, llama a build() y on_start() y crea la ventana
+        logging.getLogger().setLevel(logging.WARNING) # build() lo pone en INFO; el log no debe entrar en la medida
+        self.wait_until_settled()
+
+    def close(self):
+        self.app.stop()
+        self.event_loop.close()
+        self.main_kivy.db_worker.shutdown()
+        database.close_all_connections()
+
+    def _settled(self, barrier) -> bool:
+        ids = self.app.root.ids
+        return barrier.done() and self.app.refresh.idle and ids.chart_view.idle and ids.timeseries_view.idle
+
+    def wait_until_settled(self, frame_times: list = None):
+        """Avanza frames hasta que no queda trabajo: BD, refrescos y dibujo del gráfico."""
+        # El escritor es un único hilo: cuando termina esta tarea, terminaron las anteriores
+        barrier = self.main_kivy.db_worker.submit(lambda: None)
+        deadline = time.perf_counter() + SETTLE_TIMEOUT_SECONDS
+        settled_frames = 0
+        while settled_frames < 2: # Un frame más para las entregas que el Clock aún tenga en cola
+            started = time.perf_counter()
+            self.event_loop.idle()
+            if frame_times is not None:
+                frame_times.append((time.perf_counter() - started) * 1000)
+            settled_frames = settled_frames + 1 if self._settled(barrier) else 0
+            if time.perf_counter() > deadline:
+                raise TimeoutError("La UI no terminó de refrescarse a tiempo.")
+
+    # --- Escenarios: cada uno lanza una acción real de la app ---
+
+    def scenario_load_categories(self, iteration):
+        category_repository.invalidate() # Fuerza la lectura de la BD, como tras otro proceso
+        self.app.refresh.mark_dirty(self.main_kivy.LIST)
+
+    def scenario_update_graph(self, iteration):
+        # Mismas categorías en otro orden: el gráfico tiene que redibujarse entero
+        categories = category_repository.get_all()
+        categories.append(categories.pop(0))
+        self.app.update_graph(categories=categories)
+
+    def scenario_update_totals(self, iteration):
+        self.app.refresh.mark_dirty(self.main_kivy.TOTALS)
+
+    def scenario_add_category(self, iteration):
+        self.app.add_category_from_popup(_BenchmarkPopup(), f"Benchmark {iteration} {time.time_ns()}", "0.001")
+
+    def scenario_edit_category(self, iteration):
+        categories = category_repository.get_all()
+        category = categories[iteration % len(categories)]
+        percentage = category['percentage'] + (0.001 if iteration % 2 == 0 else -0.001)
+        self.app.update_category_from_popup(_BenchmarkPopup(), str(category['id']), category['name'], str(percentage))
+
+    def scenario_distribute_income(self, iteration):
+        self.app.ui_distribute_income_kivy(f"{1000 + iteration}")
+
+    def scenario_burst_edits(self, iteration):
+        # Diez ediciones seguidas: deberían agruparse en un solo refresco
+        for offset in range(10):
+            self.scenario_edit_category(iteration * 10 + offset)
+
+    def scenario_timeline_pan(self, iteration):
+        # Un arrastre de 30 pasos por la gráfica de evolución: se agrupan en pocos dibujos
+        self.app.show_graph('balance')
+        self.wait_until_settled()
+        view = self.app.root.ids.timeseries_view
+        start, end = view.full_range or (0, 365)
+        span = (end - start) / 4
+        for step in range(30):
+            offset = start + (iteration * 30 + step) * span / 30 % (end - start - span)
+            view.set_window((offset, offset + span))
+
+    def run(self, scenario: str, repeat: int) -> dict:
+        action = getattr(self, f"scenario_{scenario}")
+        wall_times, frame_times = [], []
+        tracemalloc.start()
+        for iteration in range(repeat):
+            started = time.perf_counter()
+            action(iteration)
+            self.wait_until_settled(frame_times)
+            wall_times.append((time.perf_counter() - started) * 1000)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'scenario': scenario,
+            'repeat': repeat,
+            'wall_ms': {'mean': round(statistics.fmean(wall_times), 2), 'min': round(min(wall_times), 2),
+                        'max': round(max(wall_times), 2)},
+            'frames': len(frame_times),
+            'frame_ms': {'p50': round(_percentile(frame_times, 0.50), 2),
+                         'p95': round(_percentile(frame_times, 0.95), 2),
+                         'p99': round(_percentile(frame_times, 0.99), 2),
+                         'max': round(max(frame_times), 2)},
+            'peak_python_kib': round(peak / 1024, 1),
+        }
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark sin ventana de los refrescos de FinanceApp.")
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help="Escenario a medir (repetible; por defecto todos)")
+    parser.add_argument('--output', help="Fichero JSON de resultados (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='finanzas-bench-')
+    # Los print() de src/database.py van a stderr para que stdout sea solo el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = _run(args, workdir)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output)
+    else:
+        print(output)
+    return report
+
+def _run(args, workdir: str) -> dict:
+    try:
+        db_path = os.path.join(workdir, 'benchmark.db')
+        started = time.perf_counter()
+        generate_database(db_path, args.categories, args.transactions, args.seed)
+        generate_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        benchmark = UIBenchmark()
+        boot_ms = (time.perf_counter() - started) * 1000
+        try:
+            results = [benchmark.run(scenario, args.repeat) for scenario in (args.scenario or SCENARIOS)]
+        finally:
+            benchmark.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'categories': args.categories,
+        'transactions': args.transactions,
+        'window': os.environ.get('KIVY_WINDOW'),
+        'video_driver': os.environ.get('SDL_VIDEODRIVER'),
+        'generate_db_ms': round(generate_ms, 2),
+        'boot_ms': round(boot_ms, 2),
+        'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        'scenarios': results,
+    }
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
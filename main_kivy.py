@@ -1,3 +1,6 @@
+import time
+_STARTUP_T0 = time.perf_counter() # Reference for the startup profile (see src/startup_profile.py)
+
 from kivy.config import Config
 Config.set('graphics', 'width', '1200')
 Config.set('graphics', 'height', '800')
@@ -19,89 +22,129 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
-from kivy_garden.matplotlib.backend_kivyagg import FigureCanvasKivyAgg
 from kivy.properties import ObjectProperty, NumericProperty, StringProperty
 from kivy.clock import Clock
 from kivy.lang import Builder
 from kivy.metrics import dp
-from kivy.factory import Factory
 from kivy.utils import get_color_from_hex
-import matplotlib.pyplot as plt
-import numpy as np
 import os
-from src.database import create_tables, get_all_categories, add_category, delete_category, update_category, get_category_by_id, add_allocation_transaction
+from src.money import from_cents
+from src.database import create_tables, add_category, delete_category, update_category, close_all_connections
+from src.repository import category_repository
+from src.ui.chart import ChartView, TimeSeriesView
+from src.ui.category_list import sync_category_rows
+from src.ui.refresh import RefreshCoordinator, LIST, CHART, TOTALS
+from src.ui.search import SearchController, search_row_data
+from src.db_worker import db_worker
+from src.recurring import materialize_due
+from src.balances import update_balance_snapshots
+from src.journal import undo, redo
+from src.startup_profile import StartupProfile
 import logging
+import threading
+from collections import deque
 import sqlite3 # To handle IntegrityError if adding duplicates
 
+# matplotlib/numpy are not imported here: the chart loads them on its render thread when it
+# first draws, so they don't delay the first frame
+startup_profile = StartupProfile(_STARTUP_T0)
+startup_profile.record('imports', _STARTUP_T0)
+
 # --- Logging Configuration ---
 # Global KivyLogHandler instance
 kivy_log_handler_instance = None
 
+LOG_CAPACITY = 200            # Lines kept in the activity log console
+LOG_FLUSH_INTERVAL = 0.2      # Seconds between widget updates (batches bursts of records)
+SNAPSHOT_CHECK_INTERVAL = 60  # Seconds between checks for a month change (closes that month's balance snapshots)
+
+# Basic color coding based on level
+LOG_LEVEL_COLORS = {
+    logging.INFO: "00ff00",    # Green
+    logging.WARNING: "ffff00", # Yellow
+    logging.ERROR: "ff0000",   # Red
+    logging.CRITICAL: "ff0000",# Red
+    logging.DEBUG: "00ffff",   # Cyan
+}
+
 class KivyLogHandler(logging.Handler):
-    """A logging handler that sends logs to a Kivy Label."""
-    def __init__(self, *args, **kwargs):
+    """A logging handler that shows the latest logs in a Kivy Label.
+
+    Records are kept in a fixed-size ring buffer: emit() only appends under a lock, so it is
+    cheap and safe from any thread. A throttled Clock trigger formats the new records and
+    sets the label text once per batch on the Kivy thread, so a burst of thousands of records
+    costs one texture update and memory stays bounded.
+    """
+    def __init__(self, *args, capacity=LOG_CAPACITY, **kwargs):
         super().__init__(*args, **kwargs)
         self.log_widget = None # Will be set later from the app
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=capacity) # Records not shown yet (oldest dropped unformatted)
+        self._lines = deque(maxlen=capacity)   # Formatted lines currently shown
+        self._flush_trigger = None
 
     def set_widget(self, widget):
-        """Assigns the Kivy Label widget to display logs."""
+        """Assigns the Kivy Label widget to display logs (records logged before are shown too)."""
         self.log_widget = widget
+        self._flush_trigger = Clock.create_trigger(self.flush_to_widget, LOG_FLUSH_INTERVAL)
+        self._flush_trigger()
 
     def emit(self, record):
-        """Formats and sends the log record to the Kivy widget."""
-        if not self.log_widget:
-            # Queue the message if the widget isn't ready yet? Or just drop?
-            # For now, let's just drop if the widget isn't set.
-            # print(f"Log widget not set, dropping message: {self.format(record)}") # Debug print
+        """Queues the record; the widget is updated in batches on the Kivy clock."""
+        # Records below the handler level were already dropped by logging, before any formatting
+        with self._lock:
+            self._pending.append(record)
+        if self._flush_trigger:
+            self._flush_trigger() # Does nothing if a flush is already scheduled
+
+    def flush_to_widget(self, dt=None):
+        """Formats the queued records and shows the last lines (Kivy thread only)."""
+        with self._lock:
+            records = list(self._pending)
+            self._pending.clear()
+        if not records or not self.log_widget:
             return
-
-        # Acortar mensajes largos para aprovechar mejor el espacio
-        log_entry = self.format(record)
-        
-        # Optimizaciones para mensajes comunes y repetitivos
-        if "Successfully allocated" in log_entry:
-            # Formato más compacto para asignaciones
-            parts = log_entry.split("to category ID")
-            if len(parts) > 1:
-                amount = parts[0].split("Successfully allocated")[1].strip()
-                cat_info = parts[1].strip()
-                log_entry = f"✅ Asignado {amount} → Cat ID{cat_info}"
-        
-        elif "Asignación del" in log_entry and "de $" in log_entry:
-            # Acortar mensajes de asignación
-            log_entry = log_entry.replace("[📝 Transacción 'Allocation' registrada para Cat ID", "💼 Cat ID")
-            log_entry = log_entry.replace("Asignación del", "→")
-        
-        elif "[💰 Balance establecido para Cat ID" in log_entry:
-            # Acortar mensajes de balance
-            parts = log_entry.split("[💰 Balance establecido para Cat ID")
-            if len(parts) > 1:
-                cat_id = parts[1].split("]")[0].strip()
-                balance = parts[1].split("]")[1].strip()
-                log_entry = f"💰 Balance Cat ID {cat_id}: {balance}"
-        
-        # Limitar longitud máxima
-        if len(log_entry) > 80:
-            log_entry = log_entry[:77] + "..."
-            
-        # Basic color coding based on level
-        level_color_map = {
-            logging.INFO: "00ff00",    # Green
-            logging.WARNING: "ffff00", # Yellow
-            logging.ERROR: "ff0000",   # Red
-            logging.CRITICAL: "ff0000",# Red
-            logging.DEBUG: "00ffff",   # Cyan
-        }
-        color = level_color_map.get(record.levelno, "ffffff") # Default white
-
-        # Append new log with color markup
-        self.log_widget.text += f"[color={color}]{log_entry}[/color]\n"
+        for record in records:
+            try:
+                log_entry = _compact_log_entry(self.format(record))
+            except Exception:
+                self.handleError(record)
+                continue
+            color = LOG_LEVEL_COLORS.get(record.levelno, "ffffff") # Default white
+            self._lines.append(f"[color={color}]{log_entry}[/color]")
+
+        self.log_widget.text = "\n".join(self._lines) + "\n"
         # Auto-scroll to the bottom
         if hasattr(self.log_widget.parent, 'scroll_y'):
-            scroll_view = self.log_widget.parent # Assuming Label is direct child of ScrollView
-            # Scroll only if needed (optional, might save minor performance)
-            # if scroll_view.scroll_y > 0:
-            scroll_view.scroll_y = 0
+            self.log_widget.parent.scroll_y = 0 # Assuming Label is direct child of ScrollView
+
+def _compact_log_entry(log_entry):
+    """Shortens common, repetitive messages to make better use of the console width."""
+    if "Successfully allocated" in log_entry:
+        # Formato más compacto para asignaciones
+        parts = log_entry.split("to category ID")
+        if len(parts) > 1:
+            amount = parts[0].split("Successfully allocated")[1].strip()
+            cat_info = parts[1].strip()
+            log_entry = f"✅ Asignado {amount} → Cat ID{cat_info}"
+
+    elif "Asignación del" in log_entry and "de $" in log_entry:
+        # Acortar mensajes de asignación
+        log_entry = log_entry.replace("[📝 Transacción 'Allocation' registrada para Cat ID", "💼 Cat ID")
+        log_entry = log_entry.replace("Asignación del", "→")
+
+    elif "[💰 Balance establecido para Cat ID" in log_entry:
+        # Acortar mensajes de balance
+        parts = log_entry.split("[💰 Balance establecido para Cat ID")
+        if len(parts) > 1:
+            cat_id = parts[1].split("]")[0].strip()
+            balance = parts[1].split("]")[1].strip()
+            log_entry = f"💰 Balance Cat ID {cat_id}: {balance}"
+
+    # Limitar longitud máxima
+    if len(log_entry) > 80:
+        log_entry = log_entry[:77] + "..."
+    return log_entry
 
 # --- UI Widgets (Popups, etc.) ---
 class EditCategoryPopup(Popup):
@@ -117,18 +160,28 @@ class EditCategoryPopup(Popup):
     category_id = NumericProperty(0)
     pass # Defined in KV, but Python class helps linkage
 
+class SearchPopup(Popup):
+    pass # Defined in KV
+
 # --- Define Root Widget Class Explicitly --- #
 class FinanceRootWidget(MDBoxLayout): # Inherit from MDBoxLayout
     pass # No logic needed here, defined in KV
 
 class FinanceApp(MDApp): # <--- Inherit from MDApp
     """Main application class."""
-    fig = ObjectProperty(None)
-    ax = ObjectProperty(None)
     graph_widget = ObjectProperty(None)
 
+    def load_kv(self, filename=None):
+        """Loads financeapp.kv (timed for the startup profile)."""
+        with startup_profile.phase('kv_load'):
+            return super().load_kv(filename)
+
     def build(self):
         """Builds the app. KivyMD handles KV file loading automatically."""
+        with startup_profile.phase('build'):
+            return self._build()
+
+    def _build(self):
         global kivy_log_handler_instance
         self.theme_cls.theme_style = "Dark"  # Uncommented - Restore Dark theme
         self.theme_cls.primary_palette = "Green" # Uncommented - Restore Green palette
@@ -137,10 +190,19 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
         # Initialize popup instances to None
         self.add_category_popup_instance = None
         self.edit_popup = None
+        self.chart_view = None # ChartView from the KV file, linked in update_graph
+        self.search_popup = None
+        self.search = SearchController(self._show_search_results) # Debounced search-as-you-type
+
+        # Actions only mark regions dirty; one flush per frame refreshes them from a single data read
+        self.refresh = RefreshCoordinator()
+        self.refresh.register(LIST, lambda categories, summary: self.load_categories(categories=categories))
+        self.refresh.register(CHART, lambda categories, summary: self.update_graph(categories=categories))
+        self.refresh.register(TOTALS, lambda categories, summary: self.update_totals_display(summary=summary))
 
         # Setup logging handler instance (can be done early)
         if kivy_log_handler_instance is None:
-             kivy_log_handler_instance = KivyLogHandler()
+             kivy_log_handler_instance = KivyLogHandler(level=logging.INFO) # DEBUG records are dropped before formatting
              formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
              kivy_log_handler_instance.setFormatter(formatter)
              root_logger = logging.getLogger()
@@ -165,10 +227,43 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
         # This ensures the root widget and its ids dictionary are fully available.
         from kivy.clock import Clock
         Clock.schedule_once(self.initialize_ui, 0)
-        Clock.schedule_once(self.update_graph, 0)  # Initial graph update
+        if startup_profile.enabled:
+            from kivy.core.window import Window
+            Window.bind(on_flip=self._on_first_flip)
+
+    def _on_first_flip(self, *args):
+        """Records time-to-first-frame (and later the first chart frame) in the startup profile."""
+        from kivy.core.window import Window
+        Window.unbind(on_flip=self._on_first_flip)
+        startup_profile.mark('first_frame')
+        startup_profile.write()
+        chart_view = self.root.ids.get('chart_view')
+        if chart_view:
+            chart_view.bind(texture=self._on_first_chart_texture)
+
+    def _on_first_chart_texture(self, chart_view, texture):
+        if texture is not None:
+            chart_view.unbind(texture=self._on_first_chart_texture)
+            startup_profile.mark('first_chart_frame')
+            startup_profile.write()
+
+    def on_stop(self):
+        """Called when the app is closing. Releases the persistent DB connections."""
+        if self.chart_view:
+            self.chart_view.stop()
+        timeseries_view = self.root.ids.get('timeseries_view') if self.root else None
+        if timeseries_view:
+            timeseries_view.stop()
+        logging.info("Closing database connections...")
+        db_worker.shutdown() # Let queued writes finish before closing
+        close_all_connections()
 
     def initialize_ui(self, dt): # dt argument is required by schedule_once
         """Initializes UI elements that depend on the root widget being ready."""
+        with startup_profile.phase('initialize_ui'):
+            self._initialize_ui()
+
+    def _initialize_ui(self):
         try:
             global kivy_log_handler_instance
             if not self.root:
@@ -193,15 +288,19 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                 logging.warning("kivy_log_handler_instance is None, cannot set widget.")
 
             # --- Setup Graph --- #
-            # Note: Graph setup now happens within update_graph, called from on_start
-            # self.setup_graph(...) is likely deprecated or refactored
+            # The ChartView comes from the KV file; update_graph feeds it data
             logging.info("Graph setup is handled by update_graph.") 
 
-            # --- Load Initial Categories --- #
+            # --- Load Initial Categories, Graph and Totals --- #
             logging.info("Initializing categories list...")
-            self.load_categories()
-            Clock.schedule_once(self.update_total_percentage_display, 0.5)
-            Clock.schedule_once(self.update_total_balance_display, 0.6) # Call after categories load
+            self.refresh.mark_dirty(LIST, CHART, TOTALS)
+
+            # --- Catch up on recurring transactions due since the last run (one batched write) --- #
+            db_worker.submit(materialize_due,
+                             on_done=lambda written: written and self.refresh.mark_dirty(LIST, CHART, TOTALS))
+            # Queued behind the catch-up on the single writer, so its transactions are already in the ledger
+            self._schedule_snapshot_update()
+            Clock.schedule_interval(self._check_month_rollover, SNAPSHOT_CHECK_INTERVAL)
 
             logging.info("UI Initialization complete (or attempted).")
 
@@ -212,84 +311,38 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
         except Exception as e:
             logging.error(f"Unexpected error during UI initialization: {e}", exc_info=True)
 
+    def _schedule_snapshot_update(self):
+        """Queues the monthly balance snapshots (incremental; also redoes those dropped by backdated writes)."""
+        self._snapshot_month = time.strftime('%Y-%m', time.gmtime())
+        db_worker.submit(update_balance_snapshots,
+                         on_error=lambda e: logging.error(f"Error updating balance snapshots: {e}"))
+
+    def _check_month_rollover(self, dt):
+        """Closes the previous month's snapshots when the app stays open across a (UTC) month change."""
+        if time.strftime('%Y-%m', time.gmtime()) != self._snapshot_month:
+            self._schedule_snapshot_update()
+
     # --- UI Interaction Methods --- #
-    def setup_graph(self, graph_placeholder):
-        """Sets up the Matplotlib graph area."""
-        logging.info("Setting up graph placeholder...")
-        # Create a figure and axis
-        self.fig, self.ax = plt.subplots()
-        # Set the figure background color to match the dark theme
-        self.fig.patch.set_facecolor('#303030')
-        self.ax.set_facecolor('#303030')
-        # Set the text color for labels, titles, etc.
-        self.ax.tick_params(axis='x', colors='white', rotation=45)
-        self.ax.tick_params(axis='y', colors='white')
-        self.ax.title.set_color('white')
-        # Create a canvas to display the figure
-        self.graph_widget = FigureCanvasKivyAgg(self.fig)
-        # Add the canvas to the placeholder
-        graph_placeholder.add_widget(self.graph_widget)
-
-    def load_categories(self, dt=None):
-        """Loads categories from the database and displays them using CategoryRow (KivyMD)."""
+    def load_categories(self, dt=None, categories=None):
+        """Loads categories from the repository into the RecycleView, touching only the rows that changed."""
         try:
-            category_list_layout = self.root.ids.get('category_list_layout')
-            if not category_list_layout:
-                logging.error("Category list layout not found in root.ids.")
+            category_list = self.root.ids.get('category_list')
+            if not category_list:
+                logging.error("Category list not found in root.ids.")
                 return
 
-            # Clear existing widgets with animation
-            for child in category_list_layout.children[:]:  # Create a copy of the list
-                anim = Animation(opacity=0, duration=0.3)
-                anim.bind(on_complete=lambda *args: category_list_layout.remove_widget(child))
-                anim.start(child)
-
-            # Get categories from database
-            categories = get_all_categories()
-            
-            # Limpiar completamente el layout después de las animaciones
-            Clock.schedule_once(lambda dt: self._add_category_widgets(categories), 0.4)
+            categories = categories if categories is not None else self.refresh.categories
+            if categories is None:
+                self.refresh.mark_dirty(LIST) # Read on a reader thread; this runs again with the result
+                return
+            # Newest first, as the list has always been shown
+            sync_category_rows(category_list, list(reversed(categories)))
 
         except Exception as e:
             logging.error(f"Error loading categories: {e}", exc_info=True)
             self.show_error_popup(f"Error al cargar categorías: {str(e)}")
-            
-    def _add_category_widgets(self, categories):
-        """Helper method to add category widgets after clearing the layout."""
-        try:
-            category_list_layout = self.root.ids.get('category_list_layout')
-            if not category_list_layout:
-                return
-                
-            # Asegurarse de que el layout esté completamente vacío
-            category_list_layout.clear_widgets()
-            
-            # Add new category rows with fade-in animation
-            for category in reversed(categories):  # Usamos reversed para que aparezcan en orden inverso
-                logging.debug(f"Creating CategoryRow for: {category['name']}")
-                balance = category['current_balance'] if category['current_balance'] is not None else 0.0
-                
-                # Create CategoryRow instance using Factory
-                row = Factory.CategoryRow()
-                
-                # Set properties
-                row.category_id = category['id']
-                row.category_name = category['name']
-                row.category_percentage = f"{category['percentage']}%"
-                row.category_balance = f"{balance:.2f} €"
-                
-                # Add to layout (al principio)
-                category_list_layout.add_widget(row)
-                
-                # Start fade-in animation
-                row.opacity = 0
-                anim = Animation(opacity=1, duration=0.5)
-                anim.start(row)
-                
-        except Exception as e:
-            logging.error(f"Error adding category widgets: {e}", exc_info=True)
 
-    def update_graph(self, dt=None):
+    def update_graph(self, dt=None, categories=None):
         """Updates the pie chart with current category data."""
         logging.info("Actualizando gráfico de categorías...")
         try:
@@ -307,47 +360,17 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                      logging.debug("graph_card tampoco fue encontrado.")
                 return
 
-            # Clear previous graph from the placeholder
-            graph_placeholder.clear_widgets()
+            # The figure is created once, on the chart's render thread, and updated in place
+            if self.chart_view is None:
+                self.chart_view = self.graph_widget = self.root.ids.chart_view
 
-            # Get categories data
-            categories = get_all_categories()
+            categories = categories if categories is not None else self.refresh.categories
+            if categories is None:
+                self.refresh.mark_dirty(CHART) # Read on a reader thread; this runs again with the result
+                return
             if not categories:
                 logging.info("No hay categorías para mostrar en el gráfico")
-                return
-
-            # Prepare data for the pie chart
-            labels = [cat['name'] for cat in categories]
-            sizes = [cat['percentage'] for cat in categories]
-            balances = [cat['current_balance'] if cat['current_balance'] is not None else 0 for cat in categories]
-
-            # Create figure with dark theme
-            plt.style.use('dark_background')
-            fig, ax = plt.subplots(figsize=(8, 6))
-            fig.patch.set_facecolor('#1E1E1E')  # Match MDBoxLayout background
-
-            # Porcentajes Pie Chart with better colors
-            colors = plt.cm.Greens(np.linspace(0.5, 0.8, len(sizes)))  # More saturated greens
-            wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%',
-                                            startangle=90, colors=colors,
-                                            textprops={'color': 'white'},
-                                            wedgeprops={'width': 0.7})  # Donut style
-            
-            # Center circle for donut effect
-            centre_circle = plt.Circle((0,0), 0.50, fc='#1E1E1E')
-            ax.add_artist(centre_circle)
-
-            # Style the text
-            plt.setp(autotexts, size=11, weight="bold", color="white")
-            plt.setp(texts, size=10, color="#4CAF50")  # Match category text color
-
-            # Add title with custom style
-            ax.set_title('Distribución de Categorías', color='white', pad=20, fontsize=14, fontweight='bold')
-
-            # Add the graph to the placeholder
-            canvas = FigureCanvasKivyAgg(figure=fig)
-            graph_placeholder.add_widget(canvas)
-            plt.close(fig)  # Close the figure to free memory
+            self.chart_view.show(categories) # Returns at once; unchanged data is not redrawn
 
         except KeyError as ke:
              # Catch KeyError specifically if .get() is not used or if accessing ids fails unexpectedly
@@ -357,6 +380,30 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
             logging.error(f"Error al actualizar el gráfico: {e}", exc_info=True)
             self.show_error_popup(f"Error al actualizar el gráfico: {str(e)}")
 
+    def show_graph(self, mode):
+        """Switches the graph card between the category donut ('donut') and the timeline ('balance' or 'spending')."""
+        timeseries_view = self.root.ids.get('timeseries_view')
+        if not timeseries_view:
+            logging.error("No se encontró 'timeseries_view' en root.ids")
+            return
+        if mode == 'donut':
+            timeseries_view.active = False
+            return
+        timeseries_view.metric = mode # Same metric again keeps the current window
+        timeseries_view.active = True # Queries and draws on the chart's render thread
+        logging.info(f"Mostrando evolución temporal: {mode}")
+
+    def _with_categories(self, callback):
+        """Calls callback(categories) with the categories of the last refresh, so actions never query on the UI thread.
+
+        Before the first refresh has arrived they are read on a reader thread and callback runs when they do.
+        """
+        if self.refresh.categories is not None:
+            callback(self.refresh.categories)
+            return
+        db_worker.submit_read(category_repository.get_all, on_done=callback,
+                              on_error=lambda e: self.show_error_popup(f"Error al leer las categorías: {e}"))
+
     def ui_distribute_income_kivy(self, income_text=None):
         """Distributes income based on the value in the income input field."""
         try:
@@ -376,8 +423,17 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                 return
                 
             logging.info(f"[Attempting to distribute income] {total_income:.2f}")
+            self._with_categories(lambda categories: self._distribute_income(total_income, categories))
             
-            categories = get_all_categories()
+        except ValueError:
+            self.show_error_popup(f"Entrada de ingreso inválida: '{income_text}'. Introduce un número válido.")
+        except Exception as e:
+            logging.error(f"Error distributing income: {e}", exc_info=True)
+            self.show_error_popup(f"Error al distribuir ingreso: {str(e)}")
+
+    def _distribute_income(self, total_income, categories):
+        """Validates the percentages of the given categories and queues the distribution on the DB writer."""
+        try:
             if not categories:
                 self.show_error_popup("No hay categorías definidas para distribuir")
                 return
@@ -391,49 +447,48 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                 
             logging.info(f"Starting income distribution for ${total_income:.2f}")
             
-            # Loop through categories and allocate income
-            for category in categories:
-                cat_id = category['id']
-                cat_name = category['name']
-                percentage = category['percentage']
-                allocated_amount = round((percentage / 100.0) * total_income, 2)
-                
-                if allocated_amount > 0:
-                    description = f"Asignación del {percentage:.2f}% de ${total_income:.2f}"
-                    try:
-                        add_allocation_transaction(cat_id, allocated_amount, description)
-                        logging.info(f"Successfully allocated ${allocated_amount:.2f} to category ID {cat_id} ('{cat_name}')")
-                    except Exception as db_err:
-                        logging.error(f"Error allocating to category ID {cat_id}: {db_err}", exc_info=True)
+            # Same engine as the scripts (src/distribution.py): exact cents, one transaction,
+            # run on the DB writer thread; the UI keeps running until the result arrives
+            def on_saved(distribution):
+                if distribution is None:
+                    self.show_error_popup("Error al guardar la distribución. No se ha aplicado ningún cambio.")
+                    return
+
+                category_names = {cat['id']: cat['name'] for cat in categories}
+                for cat_id, allocated_cents in zip(distribution.category_ids, distribution.shares_cents[0].tolist()):
+                    logging.info(f"Successfully allocated ${from_cents(allocated_cents):.2f} to category ID {cat_id} ('{category_names.get(cat_id, '?')}')")
             
-            logging.info("Income distribution process finished.")
-            Clock.schedule_once(self.load_categories, 0)
-            Clock.schedule_once(self.update_graph, 0.3)
-            Clock.schedule_once(self.update_total_balance_display, 0.3)
+                logging.info("Income distribution process finished.")
+                self.refresh.mark_dirty(LIST, CHART, TOTALS)
             
-            # Mostrar snackbar de éxito
-            snackbar = MDSnackbar(
-                MDBoxLayout(
-                    MDSnackbarSupportingText(
-                        text=f"¡Ingreso de {total_income:.2f}€ distribuido con éxito! 💰",
-                        text_color=get_color_from_hex('#FFFFFF'),
-                        theme_text_color="Custom",
+                # Mostrar snackbar de éxito
+                snackbar = MDSnackbar(
+                    MDBoxLayout(
+                        MDSnackbarSupportingText(
+                            text=f"¡Ingreso de {total_income:.2f}€ distribuido con éxito! 💰",
+                            text_color=get_color_from_hex('#FFFFFF'),
+                            theme_text_color="Custom",
+                        ),
+                        md_bg_color=get_color_from_hex('#00796B'),  # Teal oscuro
+                        padding="12dp",
+                        adaptive_height=True,
                     ),
-                    md_bg_color=get_color_from_hex('#00796B'),  # Teal oscuro
-                    padding="12dp",
-                    adaptive_height=True,
-                ),
-            )
-            snackbar.y = dp(24)
-            snackbar.pos_hint = {"center_x": 0.5}
-            snackbar.size_hint_x = 0.5
-            snackbar.snackbar_animation_dir = "Bottom"
-            snackbar.md_bg_color = (0, 0, 0, 0)  # Hacer transparente el snackbar exterior
-            snackbar.duration = 1.5
-            snackbar.open()
+                )
+                snackbar.y = dp(24)
+                snackbar.pos_hint = {"center_x": 0.5}
+                snackbar.size_hint_x = 0.5
+                snackbar.snackbar_animation_dir = "Bottom"
+                snackbar.md_bg_color = (0, 0, 0, 0)  # Hacer transparente el snackbar exterior
+                snackbar.duration = 1.5
+                snackbar.open()
+
+            def on_failed(e):
+                logging.error(f"Error distributing income: {e}", exc_info=e)
+                self.show_error_popup(f"Error al distribuir ingreso: {str(e)}")
+
+            from src.distribution import distribute_incomes # Loads numpy, so not at startup
+            db_worker.submit(distribute_incomes, [total_income], on_done=on_saved, on_error=on_failed)
             
-        except ValueError:
-            self.show_error_popup(f"Entrada de ingreso inválida: '{income_text}'. Introduce un número válido.")
         except Exception as e:
             logging.error(f"Error distributing income: {e}", exc_info=True)
             self.show_error_popup(f"Error al distribuir ingreso: {str(e)}")
@@ -443,7 +498,7 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
         logging.info(f"Intentando borrar categoría ID: {category_id}")
         # TODO: Añadir diálogo de confirmación aquí para UX
         try:
-            # Find the category widget
+            # Find the category widget (only visible rows have one in the RecycleView)
             category_list = self.root.ids.category_list_layout
             category_widget = None
             for widget in category_list.children:
@@ -451,16 +506,18 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                     category_widget = widget
                     break
 
-            if category_widget:
+            if category_widget is None:
+                db_worker.submit(delete_category, category_id,
+                                 on_done=lambda deleted: self.refresh.mark_dirty(LIST, CHART, TOTALS))
+            else:
                 # Create fade-out animation
                 anim = Animation(opacity=0, duration=0.3)
                 
                 # Definir la función fuera del callback para evitar problemas
                 def on_complete_delete(animation, target_widget):
                     try:
-                        delete_category(category_id)
-                        Clock.schedule_once(self.load_categories, 0)
-                        Clock.schedule_once(self.update_graph, 0.1)
+                        db_worker.submit(delete_category, category_id,
+                                         on_done=lambda deleted: self.refresh.mark_dirty(LIST, CHART, TOTALS))
                         
                         # Show deletion notification
                         snackbar = MDSnackbar(
@@ -485,8 +542,8 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                     except Exception as inner_e:
                         logging.error(f"Error en callback de eliminación: {inner_e}")
                         self.show_error_popup(f"Error al finalizar eliminación: {inner_e}")
-                        # Update percentage display even if snackbar fails
-                        Clock.schedule_once(self.update_total_percentage_display, 0)
+                        # Update the totals even if the snackbar fails
+                        self.refresh.mark_dirty(TOTALS)
                 
                 anim.bind(on_complete=on_complete_delete)
                 anim.start(category_widget)
@@ -500,11 +557,20 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
         """Alias for show_edit_category_popup for backwards compatibility."""
         self.show_edit_category_popup(category_id)
 
-    def show_edit_category_popup(self, category_id):
-        """Shows the popup for editing an existing category."""
+    def show_edit_category_popup(self, category_id, name=None, percentage=None):
+        """Shows the popup for editing an existing category.
+
+        The category row passes the name and percentage it shows; without them they come from the last refresh.
+        """
         logging.info(f"[Abriendo popup de edición para categoría ID] {category_id}")
+        if name is not None and percentage is not None:
+            self._open_edit_popup(category_id, {'name': name, 'percentage': percentage})
+            return
+        self._with_categories(lambda categories: self._open_edit_popup(
+            category_id, next((cat for cat in categories if cat['id'] == category_id), None)))
+
+    def _open_edit_popup(self, category_id, category):
         try:
-            category = get_category_by_id(category_id)
             if not category:
                 logging.error(f"Categoría ID {category_id} no encontrada para editar.")
                 self.show_error_popup(f"No se pudo encontrar la categoría ID {category_id}")
@@ -528,6 +594,50 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
             logging.error(f"Error al abrir popup de edición: {e}", exc_info=True)
             self.show_error_popup(f"Error al abrir editor: {str(e)}")
 
+    # --- Undo / Redo --- #
+    def undo_last_operation(self):
+        """Undoes the last operation (category change, distribution, import...) in one transaction."""
+        db_worker.submit(undo, on_done=self._on_journal_applied,
+                         on_error=lambda e: self.show_error_popup(f"Error al deshacer: {e}"))
+
+    def redo_last_operation(self):
+        """Redoes the last undone operation."""
+        db_worker.submit(redo, on_done=self._on_journal_applied,
+                         on_error=lambda e: self.show_error_popup(f"Error al rehacer: {e}"))
+
+    def _on_journal_applied(self, labels):
+        if labels: # Empty when there was nothing to undo/redo (already logged)
+            self.refresh.mark_dirty(LIST, CHART, TOTALS)
+
+    # --- Transaction Search Popup --- #
+    def show_search_popup(self):
+        """Opens the full-text search over transaction descriptions."""
+        if self.search_popup is None:
+            self.search_popup = SearchPopup() # Reused: keeps the last query and results
+        self.search_popup.open()
+        self.search_popup.ids.search_input.focus = True
+
+    def search_as_you_type(self, text):
+        """Called on every keystroke; SearchController only queries once typing pauses."""
+        self.search.set_text(text)
+
+    def close_search(self):
+        """Drops any pending search when the popup closes."""
+        self.search.cancel()
+
+    def _show_search_results(self, text, rows, elapsed_ms):
+        if not self.search_popup:
+            return
+        ids = self.search_popup.ids
+        if rows is None:
+            ids.search_results.data = []
+            ids.search_status.text = "Escribe al menos 2 letras"
+            return
+        category_names = {category['id']: category['name'] for category in self.refresh.categories or []}
+        ids.search_results.data = [search_row_data(row, category_names) for row in rows]
+        found = f"{len(rows)} resultados" if len(rows) < self.search.limit else f"Los {len(rows)} más relevantes"
+        ids.search_status.text = f"{found} para '{text}' ({elapsed_ms:.0f} ms)" if rows else f"Sin resultados para '{text}'"
+
     # --- Add Category Popup --- > NUEVA FUNCIÓN
     def show_add_category_popup(self):
         """Shows the popup for adding a new category."""
@@ -560,60 +670,66 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
             self.show_error_popup("El porcentaje introducido no es un número válido.")
             return
 
-        # Check total percentage
-        try:
-            categories = get_all_categories()
-            current_total_percentage = sum(cat['percentage'] for cat in categories)
-            if current_total_percentage + percentage > 100.01: # Allow for small float inaccuracies
-                logging.warning(f"Intento de superar el 100% (Actual: {current_total_percentage}, Nuevo: {percentage})")
-                self.show_error_popup(f"Añadir {percentage}% superaría el 100% total (actual: {current_total_percentage:.2f}%)")
-                return
-        except Exception as e:
-            logging.error(f"Error al obtener categorías para validar porcentaje: {e}")
-            self.show_error_popup("Error al verificar el porcentaje total.")
-            # Decide if you want to stop the whole process or continue with others
-            # return # Example: Stop if one fails
-
-        # --- Add to Database --- #
-        try:
-            success = add_category(name, percentage)
-            if success:
-                logging.info(f"Categoría '{name}' añadida exitosamente con {percentage}%.")
-                if log_widget:
-                     log_widget.text += f"[color=00ff00]Categoría '{name}' ({percentage}%) añadida.[/color]\n"
-                popup.dismiss() # Cerrar popup si éxito
-                Clock.schedule_once(self.load_categories, 0) # Refrescar lista
-                Clock.schedule_once(self.update_graph, 0.1)  # Slight delay for smooth animation
-                Clock.schedule_once(self.update_total_percentage_display, 0.1) # Call after adding
+        # Check total percentage (against the categories of the last refresh, not a new query)
+        def check_and_save(categories):
+            try:
+                current_total_percentage = sum(cat['percentage'] for cat in categories)
+                if current_total_percentage + percentage > 100.01: # Allow for small float inaccuracies
+                    logging.warning(f"Intento de superar el 100% (Actual: {current_total_percentage}, Nuevo: {percentage})")
+                    self.show_error_popup(f"Añadir {percentage}% superaría el 100% total (actual: {current_total_percentage:.2f}%)")
+                    return
+            except Exception as e:
+                logging.error(f"Error al obtener categorías para validar porcentaje: {e}")
+                self.show_error_popup("Error al verificar el porcentaje total.")
+                # Decide if you want to stop the whole process or continue with others
+                # return # Example: Stop if one fails
+            db_worker.submit(add_category, name, percentage, on_done=on_saved, on_error=on_failed)
+
+        # --- Add to Database (on the DB writer thread; the result comes back on the Kivy clock) --- #
+        def on_saved(success):
+            try:
+                if success:
+                    logging.info(f"Categoría '{name}' añadida exitosamente con {percentage}%.")
+                    if log_widget:
+                         log_widget.text += f"[color=00ff00]Categoría '{name}' ({percentage}%) añadida.[/color]\n"
+                    popup.dismiss() # Cerrar popup si éxito
+                    self.refresh.mark_dirty(LIST, CHART, TOTALS) # Refrescar lista, gráfico y totales
                 
-                # Show success snackbar
-                snackbar = MDSnackbar(
-                    MDBoxLayout(
-                        MDSnackbarSupportingText(
-                            text=f"¡Categoría {name} añadida! 🎉",
-                            text_color=get_color_from_hex('#FAFAFA'), # Casi blanco para buen contraste
-                            theme_text_color="Custom",
+                    # Show success snackbar
+                    snackbar = MDSnackbar(
+                        MDBoxLayout(
+                            MDSnackbarSupportingText(
+                                text=f"¡Categoría {name} añadida! 🎉",
+                                text_color=get_color_from_hex('#FAFAFA'), # Casi blanco para buen contraste
+                                theme_text_color="Custom",
+                            ),
+                            md_bg_color=get_color_from_hex('#00796B'), # Teal oscuro
+                            padding="12dp",
+                            adaptive_height=True,
                         ),
-                        md_bg_color=get_color_from_hex('#00796B'), # Teal oscuro
-                        padding="12dp",
-                        adaptive_height=True,
-                    ),
-                )
-                snackbar.y = dp(24)
-                snackbar.pos_hint = {"center_x": 0.5}
-                snackbar.size_hint_x = 0.5
-                snackbar.snackbar_animation_dir = "Bottom"
-                snackbar.md_bg_color = (0, 0, 0, 0)  # Hacer transparente el snackbar exterior
-                snackbar.duration = 1.5
-                snackbar.open()
-            else:
-                # add_category should log specifics, show generic error here
-                self.show_error_popup(f"No se pudo añadir la categoría '{name}'. ¿Quizás ya existe?")
-        except Exception as e:
-            logging.error(f"Error inesperado al añadir categoría '{name}': {e}", exc_info=True)
+                    )
+                    snackbar.y = dp(24)
+                    snackbar.pos_hint = {"center_x": 0.5}
+                    snackbar.size_hint_x = 0.5
+                    snackbar.snackbar_animation_dir = "Bottom"
+                    snackbar.md_bg_color = (0, 0, 0, 0)  # Hacer transparente el snackbar exterior
+                    snackbar.duration = 1.5
+                    snackbar.open()
+                else:
+                    # add_category should log specifics, show generic error here
+                    self.show_error_popup(f"No se pudo añadir la categoría '{name}'. ¿Quizás ya existe?")
+            except Exception as e:
+                logging.error(f"Error inesperado al añadir categoría '{name}': {e}", exc_info=True)
+                self.show_error_popup(f"Error inesperado al guardar: {e}")
+                popup.dismiss() # Dismiss even on unexpected error?
+
+        def on_failed(e):
+            logging.error(f"Error inesperado al añadir categoría '{name}': {e}", exc_info=e)
             self.show_error_popup(f"Error inesperado al guardar: {e}")
             popup.dismiss() # Dismiss even on unexpected error?
 
+        self._with_categories(check_and_save)
+
     # --- Process Edit Category Popup --- > NUEVA FUNCIÓN
     def update_category_from_popup(self, popup, category_id_str, new_name, new_percentage_str):
         """Updates an existing category from the EditCategoryPopup data after validation."""
@@ -644,64 +760,71 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
              popup.dismiss()
              return
 
-        # Check total percentage (excluding the original percentage of the item being edited)
-        try:
-            categories = get_all_categories()
-            current_total_percentage_others = sum(cat['percentage'] for cat in categories if cat['id'] != category_id)
-            new_total_percentage = current_total_percentage_others + new_percentage
-
-            if new_total_percentage > 100.01: # Allow for small float inaccuracies
-                original_percentage = next((cat['percentage'] for cat in categories if cat['id'] == category_id), 0)
-                logging.warning(f"Intento de superar el 100% al editar ID {category_id} (Otros: {current_total_percentage_others}, Nuevo: {new_percentage})")
-                self.show_error_popup(f"Editar a {new_percentage}% superaría el 100% total (actual otros: {current_total_percentage_others:.2f}%)")
+        # Check total percentage (excluding the original percentage of the item being edited),
+        # against the categories of the last refresh, not a new query
+        def check_and_save(categories):
+            try:
+                current_total_percentage_others = sum(cat['percentage'] for cat in categories if cat['id'] != category_id)
+                new_total_percentage = current_total_percentage_others + new_percentage
+
+                if new_total_percentage > 100.01: # Allow for small float inaccuracies
+                    original_percentage = next((cat['percentage'] for cat in categories if cat['id'] == category_id), 0)
+                    logging.warning(f"Intento de superar el 100% al editar ID {category_id} (Otros: {current_total_percentage_others}, Nuevo: {new_percentage})")
+                    self.show_error_popup(f"Editar a {new_percentage}% superaría el 100% total (actual otros: {current_total_percentage_others:.2f}%)")
+                    return
+            except Exception as e:
+                logging.error(f"Error al obtener categorías para validar porcentaje en edición: {e}")
+                self.show_error_popup("Error al verificar el porcentaje total durante la edición.")
+                popup.dismiss()
                 return
-        except Exception as e:
-            logging.error(f"Error al obtener categorías para validar porcentaje en edición: {e}")
-            self.show_error_popup("Error al verificar el porcentaje total durante la edición.")
-            popup.dismiss()
-            return
-
-        # --- Update Database --- #
-        try:
-            success = update_category(category_id, new_name, new_percentage)
-            if success:
-                logging.info(f"Categoría ID {category_id} actualizada a '{new_name}' con {new_percentage}%.")
-                if log_widget:
-                    log_widget.text += f"[color=00ff00]Categoría '{new_name}' ({new_percentage}%) actualizada.[/color]\n"
-                popup.dismiss() # Cerrar popup si éxito
-                Clock.schedule_once(self.load_categories, 0) # Refrescar lista
-                Clock.schedule_once(self.update_graph, 0.1)  # Slight delay for smooth animation
-                Clock.schedule_once(self.update_total_percentage_display, 0.1) # Call after updating
+            db_worker.submit(update_category, category_id, new_name, new_percentage, on_done=on_saved, on_error=on_failed)
+
+        # --- Update Database (on the DB writer thread; the result comes back on the Kivy clock) --- #
+        def on_saved(success):
+            try:
+                if success:
+                    logging.info(f"Categoría ID {category_id} actualizada a '{new_name}' con {new_percentage}%.")
+                    if log_widget:
+                        log_widget.text += f"[color=00ff00]Categoría '{new_name}' ({new_percentage}%) actualizada.[/color]\n"
+                    popup.dismiss() # Cerrar popup si éxito
+                    self.refresh.mark_dirty(LIST, CHART, TOTALS) # Refrescar lista, gráfico y totales
                 
-                # Show success snackbar
-                snackbar = MDSnackbar(
-                    MDBoxLayout(
-                        MDSnackbarSupportingText(
-                            text=f"¡Categoría {new_name} actualizada! 🎉",
-                            text_color=get_color_from_hex('#FAFAFA'), # Casi blanco
-                            theme_text_color="Custom",
+                    # Show success snackbar
+                    snackbar = MDSnackbar(
+                        MDBoxLayout(
+                            MDSnackbarSupportingText(
+                                text=f"¡Categoría {new_name} actualizada! 🎉",
+                                text_color=get_color_from_hex('#FAFAFA'), # Casi blanco
+                                theme_text_color="Custom",
+                            ),
+                            md_bg_color=get_color_from_hex('#00796B'), # Teal oscuro
+                            padding="12dp",
+                            adaptive_height=True,
                         ),
-                        md_bg_color=get_color_from_hex('#00796B'), # Teal oscuro
-                        padding="12dp",
-                        adaptive_height=True,
-                    ),
-                )
-                snackbar.y = dp(24)
-                snackbar.pos_hint = {"center_x": 0.5}
-                snackbar.size_hint_x = 0.5
-                snackbar.snackbar_animation_dir = "Bottom"
-                snackbar.md_bg_color = (0, 0, 0, 0)  # Hacer transparente el snackbar exterior
-                snackbar.duration = 1.5
-                snackbar.open()
-            else:
-                # update_category should log specifics, show generic error here
-                logging.error(f"Fallo al actualizar la categoría ID {category_id} desde la UI (update_category devolvió False)")
-                self.show_error_popup(f"No se pudo actualizar la categoría '{new_name}'. ¿Conflicto de nombre?")
-        except Exception as e:
-            logging.error(f"Error inesperado al actualizar categoría ID {category_id} ('{new_name}'): {e}", exc_info=True)
+                    )
+                    snackbar.y = dp(24)
+                    snackbar.pos_hint = {"center_x": 0.5}
+                    snackbar.size_hint_x = 0.5
+                    snackbar.snackbar_animation_dir = "Bottom"
+                    snackbar.md_bg_color = (0, 0, 0, 0)  # Hacer transparente el snackbar exterior
+                    snackbar.duration = 1.5
+                    snackbar.open()
+                else:
+                    # update_category should log specifics, show generic error here
+                    logging.error(f"Fallo al actualizar la categoría ID {category_id} desde la UI (update_category devolvió False)")
+                    self.show_error_popup(f"No se pudo actualizar la categoría '{new_name}'. ¿Conflicto de nombre?")
+            except Exception as e:
+                logging.error(f"Error inesperado al actualizar categoría ID {category_id} ('{new_name}'): {e}", exc_info=True)
+                self.show_error_popup(f"Error inesperado al guardar cambios: {e}")
+                popup.dismiss()
+
+        def on_failed(e):
+            logging.error(f"Error inesperado al actualizar categoría ID {category_id} ('{new_name}'): {e}", exc_info=e)
             self.show_error_popup(f"Error inesperado al guardar cambios: {e}")
             popup.dismiss()
 
+        self._with_categories(check_and_save)
+
     # --- Generic Error Popup --- > RECONSTRUCCIÓN
     def show_error_popup(self, error_message):
         """Displays a simple popup with an error message."""
@@ -733,16 +856,29 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
             logging.critical(f"CRÍTICO: Fallo al crear/mostrar popup de error: {e}", exc_info=True)
             print(f"ERROR CRÍTICO AL MOSTRAR POPUP: {error_message}\nError creación popup: {e}")
 
-    def update_total_percentage_display(self, dt=None):
-        """Calculates and updates the label showing the total assigned percentage."""
+    def update_totals_display(self, dt=None, summary=None):
+        """Updates both header labels from a single dashboard summary query."""
+        summary = summary or self.refresh.summary
+        if summary is None:
+            self.refresh.mark_dirty(TOTALS) # Read on a reader thread; this runs again with the result
+            return
+        self.update_total_percentage_display(summary=summary)
+        self.update_total_balance_display(summary=summary)
+
+    def update_total_percentage_display(self, dt=None, summary=None):
+        """Updates the label showing the total assigned percentage (summed in SQL)."""
+        label = None
         try:
             label = self.root.ids.get('total_percentage_label')
             if not label:
                 logging.warning("total_percentage_label not found in root.ids.")
                 return
 
-            categories = get_all_categories()
-            total_percentage = sum(cat['percentage'] for cat in categories)
+            summary = summary or self.refresh.summary
+            if summary is None:
+                self.refresh.mark_dirty(TOTALS) # Read on a reader thread; this runs again with the result
+                return
+            total_percentage = summary['total_percentage']
 
             text = f"Total Asignado: {total_percentage:.2f}%"
             color = get_color_from_hex('#BDBDBD') # Default grey
@@ -753,7 +889,7 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
             elif total_percentage > 100.01:
                 color = get_color_from_hex('#FF5252') # Red if over 100%
                 text += " ❌ (>100%)"
-            elif total_percentage == 0 and categories:
+            elif total_percentage == 0 and summary['category_count']:
                 color = get_color_from_hex('#FFAB00') # Amber if 0% but categories exist
                 text += " ⚠️ (0%)"
             else: # Less than 100
@@ -770,16 +906,20 @@ class FinanceApp(MDApp): # <--- Inherit from MDApp
                 label.text = "Error al calcular total %"
                 label.text_color = get_color_from_hex('#FF5252')
 
-    def update_total_balance_display(self, dt=None):
-        """Calculates and updates the label showing the total current balance across all categories."""
+    def update_total_balance_display(self, dt=None, summary=None):
+        """Updates the label showing the total current balance across all categories (summed in SQL)."""
+        label = None
         try:
             label = self.root.ids.get('total_balance_label')
             if not label:
                 logging.warning("total_balance_label not found in root.ids.")
                 return
 
-            categories = get_all_categories()
-            total_balance = sum(cat['current_balance'] for cat in categories)
+            summary = summary or self.refresh.summary
+            if summary is None:
+                self.refresh.mark_dirty(TOTALS) # Read on a reader thread; this runs again with the result
+                return
+            total_balance = summary['total_balance'] # Suma exacta en céntimos hecha por SQLite
 
             label.text = f"Balance Total Actual: €{total_balance:.2f}"
             logging.info(f"Updated total balance display: {label.text}")
@@ -797,7 +937,7 @@ if __name__ == '__main__':
 
     # Setup Kivy logging *before* running the app
     # Note: We instantiate the handler here, but it needs the widget from on_start
-    kivy_log_handler_instance = KivyLogHandler()
+    kivy_log_handler_instance = KivyLogHandler(level=logging.INFO) # DEBUG records are dropped before formatting
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     kivy_log_handler_instance.setFormatter(formatter)
     root_logger = logging.getLogger()
@@ -0,0 +1,208 @@
+import argparse
+import logging
+import sqlite3
+from datetime import datetime, timezone
+
+from src.database import get_db_connection, transaction, mark_changed, create_tables, close_all_connections
+from src.money import from_cents
+
+# --- Balances derivados del libro de transacciones ---
+# El balance de una categoría es SUM(balance_delta_cents) de sus transacciones. Para no
+# recorrer todo el historial en cada consulta "¿cuánto tenía el 15/03?", se guardan snapshots
+# al inicio de cada mes en BalanceSnapshots: as_of = '2025-03-01 00:00:00' es el saldo con
+# todas las transacciones de fecha < as_of. Los triggers de Transactions borran los snapshots
+# que deja obsoletos un cambio con fecha anterior; update_balance_snapshots los rehace.
+
+SNAPSHOT_BATCH_SIZE = 1000
+
+def _month_start(date: str) -> str:
+    """'2025-03-17 10:20:00' -> '2025-03-01 00:00:00'."""
+    return f"{date[:7]}-01 00:00:00"
+
+def _next_month_start(date: str) -> str:
+    year, month = int(date[:4]), int(date[5:7])
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01 00:00:00"
+
+def _end_of_day(date: str) -> str:
+    """Una fecha sin hora ('YYYY-MM-DD') incluye el día entero."""
+    return f"{date} 23:59:59" if len(date) == 10 else date
+
+def _replay_snapshots(conn: sqlite3.Connection, since: str | None, running: dict) -> int:
+    """Recorre el libro desde 'since' y escribe un snapshot por categoría en cada inicio de mes cruzado.
+
+    running trae los saldos en 'since' (se modifica). Solo se crean snapshots de meses ya
+    cerrados: el mes en curso todavía puede recibir transacciones. Devuelve cuántos se escribieron.
+    """
+    current_month = _month_start(datetime.now(timezone.utc).strftime('%Y-%m-%d'))
+    params = [current_month]
+    condition = ""
+    if since:
+        condition = "AND date >= ?"
+        params.append(since)
+
+    written = 0
+    batch = []
+    def flush():
+        nonlocal written, batch
+        if batch:
+            conn.executemany("INSERT OR REPLACE INTO BalanceSnapshots (category_id, as_of, balance_cents) VALUES (?, ?, ?)", batch)
+            written += len(batch)
+            batch = []
+
+    next_boundary = _next_month_start(since) if since else None
+    for date, category_id, delta in conn.execute(f"""
+            SELECT date, category_id, balance_delta_cents FROM Transactions
+            WHERE category_id IS NOT NULL AND balance_delta_cents != 0 AND date < ? {condition}
+            ORDER BY date, id""", params):
+        if next_boundary is None:
+            next_boundary = _next_month_start(date)
+        # Un snapshot por cada inicio de mes que quede antes de esta transacción
+        while date >= next_boundary:
+            batch.extend((cat_id, next_boundary, balance) for cat_id, balance in running.items())
+            if len(batch) >= SNAPSHOT_BATCH_SIZE:
+                flush()
+            next_boundary = _next_month_start(next_boundary)
+        running[category_id] = running.get(category_id, 0) + delta
+
+    # Cerrar los meses entre la última transacción y el mes en curso
+    while next_boundary is not None and next_boundary <= current_month:
+        batch.extend((cat_id, next_boundary, balance) for cat_id, balance in running.items())
+        if len(batch) >= SNAPSHOT_BATCH_SIZE:
+            flush()
+        next_boundary = _next_month_start(next_boundary)
+    flush()
+    return written
+
+def update_balance_snapshots() -> int:
+    """Añade los snapshots que falten desde el último guardado (incremental). Devuelve cuántos escribió."""
+    try:
+        with transaction() as conn:
+            last_as_of = conn.execute("SELECT MAX(as_of) FROM BalanceSnapshots").fetchone()[0]
+            running = {}
+            if last_as_of:
+                running = dict(conn.execute("SELECT category_id, balance_cents FROM BalanceSnapshots WHERE as_of = ?",
+                                            (last_as_of,)).fetchall())
+            written = _replay_snapshots(conn, last_as_of, running)
+        if written:
+            logging.info(f"📸 {written} snapshots de balance añadidos.")
+        return written
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al actualizar los snapshots de balance: {e}")
+        return 0
+
+def rebuild_balances() -> bool:
+    """Recalcula desde cero los snapshots y Categories.balance_cents a partir del libro.
+
+    Útil si se editó la BD a mano o se sospecha que la caché de balances no cuadra.
+    """
+    try:
+        with transaction() as conn:
+            conn.execute("DELETE FROM BalanceSnapshots")
+            conn.execute("""
+                UPDATE Categories SET balance_cents = (
+                    SELECT COALESCE(SUM(balance_delta_cents), 0) FROM Transactions
+                    WHERE Transactions.category_id = Categories.id
+                )
+            """)
+            written = _replay_snapshots(conn, None, {})
+            mark_changed('Categories')
+        print(f"✅ Balances recalculados desde el libro ({written} snapshots).")
+        return True
+    except sqlite3.Error as e:
+        print(f"❌ Error al recalcular los balances: {e}")
+        return False
+
+def get_balance_as_of(category_id: int, date: str) -> float:
+    """Balance de una categoría al final de 'date' ('YYYY-MM-DD[ HH:MM:SS]', incluida), en euros.
+
+    Parte del último snapshot anterior y suma solo las transacciones desde entonces.
+    """
+    date = _end_of_day(date)
+    conn = get_db_connection()
+    try:
+        row = conn.execute("""
+            SELECT COALESCE(s.balance_cents, 0) + (
+                SELECT COALESCE(SUM(t.balance_delta_cents), 0) FROM Transactions t
+                WHERE t.category_id = ? AND t.date >= COALESCE(s.as_of, '') AND t.date <= ?
+            )
+            FROM (SELECT 1) LEFT JOIN (
+                SELECT as_of, balance_cents FROM BalanceSnapshots
+                WHERE category_id = ? AND as_of <= ? ORDER BY as_of DESC LIMIT 1
+            ) s
+        """, (category_id, date, category_id, date)).fetchone()
+        return from_cents(row[0])
+    except sqlite3.Error as e:
+        print(f"❌ Error al calcular el balance de la categoría ID {category_id} a {date}: {e}")
+        return 0.0
+
+def balance_cents_before(conn: sqlite3.Connection, date: str, category_id: int = None) -> int:
+    """Suma de balances (o el de una categoría) con las transacciones de fecha < 'date', en céntimos.
+
+    Misma estrategia que get_balances_as_of: último snapshot con as_of <= date más el resto.
+    """
+    condition = "WHERE c.id = ?" if category_id is not None else ""
+    params = (date, date) + ((category_id,) if category_id is not None else ())
+    row = conn.execute(f"""
+        SELECT COALESCE(SUM(COALESCE(s.balance_cents, 0) + (
+            SELECT COALESCE(SUM(t.balance_delta_cents), 0) FROM Transactions t
+            WHERE t.category_id = c.id AND t.date >= COALESCE(s.as_of, '') AND t.date < ?
+        )), 0)
+        FROM Categories c
+        LEFT JOIN BalanceSnapshots s ON s.category_id = c.id AND s.as_of = (
+            SELECT MAX(as_of) FROM BalanceSnapshots WHERE category_id = c.id AND as_of <= ?
+        )
+        {condition}
+    """, params).fetchone()
+    return row[0]
+
+def get_balances_as_of(date: str) -> dict:
+    """Balance de todas las categorías al final de 'date', en euros: {category_id: balance}."""
+    date = _end_of_day(date)
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT c.id, COALESCE(s.balance_cents, 0) + (
+                SELECT COALESCE(SUM(t.balance_delta_cents), 0) FROM Transactions t
+                WHERE t.category_id = c.id AND t.date >= COALESCE(s.as_of, '') AND t.date <= ?
+            )
+            FROM Categories c
+            LEFT JOIN BalanceSnapshots s ON s.category_id = c.id AND s.as_of = (
+                SELECT MAX(as_of) FROM BalanceSnapshots WHERE category_id = c.id AND as_of <= ?
+            )
+        """, (date, date)).fetchall()
+        return {category_id: from_cents(cents) for category_id, cents in rows}
+    except sqlite3.Error as e:
+        print(f"❌ Error al calcular los balances a {date}: {e}")
+        return {}
+
+def verify_balances() -> list[dict]:
+    """Compara Categories.balance_cents con la suma del libro; devuelve las categorías que no cuadran."""
+    conn = get_db_connection()
+    rows = conn.execute("""
+        SELECT c.id, c.name, c.balance_cents,
+               (SELECT COALESCE(SUM(balance_delta_cents), 0) FROM Transactions t WHERE t.category_id = c.id)
+        FROM Categories c
+    """).fetchall()
+    return [{'category_id': cat_id, 'name': name, 'stored_cents': stored, 'ledger_cents': ledger}
+            for cat_id, name, stored, ledger in rows if stored != ledger]
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.balances [--rebuild | --verify]
+    parser = argparse.ArgumentParser(description="Mantenimiento de los balances derivados del libro de transacciones.")
+    parser.add_argument('--rebuild', action='store_true', help="Recalcular balances y snapshots desde cero")
+    parser.add_argument('--verify', action='store_true', help="Solo comprobar que los balances cuadran con el libro")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.rebuild:
+        rebuild_balances()
+    elif args.verify:
+        mismatches = verify_balances()
+        for m in mismatches:
+            print(f"⚠️ {m['name']}: guardado {from_cents(m['stored_cents']):.2f}€, libro {from_cents(m['ledger_cents']):.2f}€")
+        print("✅ Los balances cuadran con el libro." if not mismatches else f"❌ {len(mismatches)} categorías no cuadran.")
+    else:
+        print(f"✅ {update_balance_snapshots()} snapshots nuevos.")
+    close_all_connections()
@@ -1,83 +1,221 @@
 import sqlite3
 import os
+import json
 import logging
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+from src.migrations import apply_migrations, SCHEMA_VERSION
+from src.money import to_cents, from_cents
 
 DATABASE_NAME = "finance_app.db"
 # Ajustamos la ruta: subir un nivel (..) desde la ubicación de este script (src/) y entrar a data/
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', DATABASE_NAME))
 
-def get_db_connection():
-    """Crea o conecta con la base de datos SQLite."""
-    conn = sqlite3.connect(DB_PATH)
+# --- Ajustes de la conexión ---
+# Cada hilo mantiene UNA conexión abierta durante toda la vida de la app, en vez de
+# abrir y cerrar una por cada consulta (eso obligaba a recalentar esquema y caché en cada lectura).
+CACHE_SIZE_KIB = 8192        # Tamaño de la caché de páginas por conexión (PRAGMA cache_size en KiB)
+STATEMENT_CACHE_SIZE = 128   # Sentencias preparadas que sqlite3 reutiliza por conexión
+BUSY_TIMEOUT_SECONDS = 5.0   # Espera máxima si otro hilo/proceso tiene bloqueada la BD
+
+_thread_local = threading.local()
+_open_connections = []  # Todas las conexiones abiertas, para poder cerrarlas al salir
+_connections_lock = threading.Lock()
+_connections_generation = 0  # Se incrementa en close_all_connections() para invalidar las de otros hilos
+
+# --- Avisos de cambios ---
+# Las funciones de escritura marcan qué tablas han cambiado con mark_changed(); los listeners
+# (p.ej. la caché de categorías de src/repository.py) reciben el aviso tras el COMMIT.
+_change_listeners = []
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Abre una conexión nueva y le aplica los PRAGMAs de rendimiento."""
+    # isolation_level=None -> autocommit: las transacciones las abrimos nosotros con transaction()
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None,
+                           cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
     # Para devolver filas como diccionarios (más fácil de usar)
-    conn.row_factory = sqlite3.Row 
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")   # Lectores y escritor no se bloquean entre sí
+    conn.execute("PRAGMA synchronous = NORMAL")  # Seguro con WAL y evita un fsync por commit
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    with _connections_lock:
+        _open_connections.append(conn)
     return conn
 
-def create_tables():
-    """Crea las tablas Categories y Transactions si no existen."""
+def get_db_connection() -> sqlite3.Connection:
+    """Devuelve la conexión persistente del hilo actual, creándola la primera vez.
+
+    No hay que cerrarla después de usarla: se reutiliza en la siguiente llamada.
+    """
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None or _thread_local.path != DB_PATH or _thread_local.generation != _connections_generation:
+        # Primera vez en este hilo, DB_PATH ha cambiado (p.ej. una BD temporal) o se cerró todo
+        if conn is not None:
+            close_db_connection()
+        conn = _open_connection(DB_PATH)
+        _thread_local.conn = conn
+        _thread_local.path = DB_PATH
+        _thread_local.generation = _connections_generation
+        _thread_local.depth = 0
+    return conn
+
+def _rollback(conn: sqlite3.Connection, savepoint: str = None):
+    """Deshace la transacción (o solo el savepoint) si SQLite aún la tiene abierta.
+
+    Algunos errores (disco lleno, E/S, memoria...) hacen que SQLite deshaga la transacción
+    por su cuenta: un ROLLBACK entonces fallaría y taparía el error original, que es el que
+    debe llegar a quien llamó. Por eso un fallo aquí solo se registra.
+    """
+    if not conn.in_transaction:
+        return
+    try:
+        if savepoint is None:
+            conn.execute("ROLLBACK")
+        else:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+    except sqlite3.Error as e:
+        logging.error(f"❌ No se pudo deshacer la transacción: {e}")
+
+@contextmanager
+def transaction():
+    """Abre una transacción de escritura sobre la conexión del hilo y la confirma al salir.
+
+    Si el bloque lanza una excepción se deshace todo y la excepción se propaga.
+    Se puede anidar: los bloques internos usan SAVEPOINT y solo el externo hace COMMIT.
+
+        with transaction() as conn:
+            conn.execute("UPDATE ...")
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
+    depth = _thread_local.depth
+    savepoint = f"sp_{depth}"
+    conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+    if depth == 0:
+        _thread_local.changed_tables = set()
+    _thread_local.depth = depth + 1
     try:
-        # --- Tabla Categories ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                percentage REAL NOT NULL DEFAULT 0, 
-                current_balance REAL NOT NULL DEFAULT 0
-            )
-        ''')
-        print("Tabla 'Categories' comprobada/creada. ")
-
-        # --- Tabla Transactions ---
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL CHECK(type IN ('Income', 'Expense', 'Allocation')),
-                description TEXT,
-                amount REAL NOT NULL,
-                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                category_id INTEGER, 
-                FOREIGN KEY (category_id) REFERENCES Categories (id) 
-                    ON DELETE SET NULL -- Si se borra categoría, la transacción queda sin categoría
-            )
-        ''')
-        print("Tabla 'Transactions' comprobada/creada. ")
-
-        conn.commit()
+        yield conn
+    except BaseException:
+        _thread_local.depth = depth
+        _rollback(conn, savepoint if depth else None)
+        raise
+    _thread_local.depth = depth
+    if depth == 0:
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            _rollback(conn)
+            raise
+        _notify_change(_thread_local.changed_tables)
+    else:
+        conn.execute(f"RELEASE {savepoint}")
+
+@contextmanager
+def operation(label: str):
+    """Como transaction(), pero además anota lo que cambia en el diario para poder deshacerlo.
+
+    Cada acción del usuario (añadir una categoría, repartir un ingreso, importar un fichero...)
+    es una operación; undo()/redo() de src/journal.py la deshacen o rehacen entera. Una
+    operación dentro de otra no se anota aparte: forma parte de la de fuera.
+
+        with operation(f"Borrar categoría ID {category_id}") as conn:
+            conn.execute("DELETE FROM Categories WHERE id = ?", (category_id,))
+    """
+    from src.journal import begin_operation, end_operation # src/journal.py importa este módulo
+    with transaction() as conn:
+        if getattr(_thread_local, 'operation', None) is not None:
+            yield conn
+            return
+        _thread_local.operation = begin_operation(conn, label)
+        try:
+            yield conn
+            end_operation(conn, _thread_local.operation)
+        finally:
+            _thread_local.operation = None
+
+def add_change_listener(callback):
+    """Registra callback(tables: set[str]), que se llama tras cada COMMIT que modifica esas tablas."""
+    _change_listeners.append(callback)
+
+def mark_changed(*tables: str):
+    """Marca tablas como modificadas en la transacción actual (o avisa ya si no hay transacción)."""
+    if getattr(_thread_local, 'depth', 0) > 0:
+        _thread_local.changed_tables.update(tables)
+    else:
+        _notify_change(set(tables))
+
+def _notify_change(tables: set):
+    """Avisa a los listeners de que han cambiado las tablas indicadas."""
+    if not tables:
+        return
+    for callback in _change_listeners:
+        try:
+            callback(tables)
+        except Exception as e:
+            logging.error(f"❌ Error en listener de cambios de BD: {e}", exc_info=True)
+
+def close_db_connection():
+    """Cierra la conexión del hilo actual (la siguiente llamada abrirá otra)."""
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        return
+    _thread_local.conn = None
+    with _connections_lock:
+        if conn in _open_connections:
+            _open_connections.remove(conn)
+    conn.close()
+
+def close_all_connections():
+    """Cierra todas las conexiones abiertas (llamar al cerrar la app)."""
+    global _connections_generation
+    with _connections_lock:
+        _connections_generation += 1
+        connections = _open_connections[:]
+        _open_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logging.warning(f"Error al cerrar conexión: {e}")
+
+def create_tables():
+    """Crea las tablas si no existen y aplica las migraciones de esquema pendientes."""
+    try:
+        applied = apply_migrations(get_db_connection())
+        print(f"Esquema comprobado (versión {SCHEMA_VERSION}, {applied} migraciones aplicadas). ")
         print("Base de datos inicializada correctamente! ")
 
     except sqlite3.Error as e:
         print(f" Error al crear las tablas: {e}")
-    finally:
-        conn.close()
 
 # --- Funciones CRUD para Categorías ---
 
 def get_all_categories() -> list[dict]:
-    """Obtiene todas las categorías de la base de datos, incluyendo su balance actual."""
+    """Obtiene todas las categorías de la base de datos, incluyendo su balance actual.
+
+    'current_balance' va en euros (float) para la UI y 'balance_cents' es el valor exacto guardado.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        # Asegurarse de que la columna se llama 'current_balance'
-        cursor.execute("SELECT id, name, percentage, current_balance FROM Categories ORDER BY name") # Añadido current_balance y orden
-        categories = [{'id': row[0], 'name': row[1], 'percentage': row[2], 'current_balance': row[3]}
+        cursor = conn.execute("SELECT id, name, percentage, balance_cents FROM Categories ORDER BY name")
+        categories = [{'id': row[0], 'name': row[1], 'percentage': row[2],
+                       'current_balance': from_cents(row[3]), 'balance_cents': row[3]}
                       for row in cursor.fetchall()]
         return categories
     except sqlite3.Error as e:
         print(f"❌ Error al obtener categorías: {e}")
         return []
-    finally:
-        conn.close()
 
 def add_category(name: str, percentage: float) -> bool:
     """Añade una nueva categoría a la base de datos."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO Categories (name, percentage) VALUES (?, ?)", (name, percentage))
-        conn.commit()
+        with operation(f"Añadir categoría '{name}'") as conn:
+            conn.execute("INSERT INTO Categories (name, percentage) VALUES (?, ?)", (name, percentage))
+            mark_changed('Categories')
         print(f"Categoría '{name}' añadida con éxito. ")
         return True
     except sqlite3.IntegrityError: # Captura el error si el nombre ya existe (UNIQUE constraint)
@@ -86,17 +224,14 @@ def add_category(name: str, percentage: float) -> bool:
     except sqlite3.Error as e:
         print(f" Error al añadir categoría: {e}")
         return False
-    finally:
-        conn.close()
 
 def update_category(category_id: int, new_name: str, new_percentage: float):
     """Actualiza el nombre y porcentaje de una categoría existente."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("UPDATE Categories SET name = ?, percentage = ? WHERE id = ?", 
-                       (new_name, new_percentage, category_id))
-        conn.commit()
+        with operation(f"Editar categoría ID {category_id}") as conn:
+            cursor = conn.execute("UPDATE Categories SET name = ?, percentage = ? WHERE id = ?", 
+                                  (new_name, new_percentage, category_id))
+            mark_changed('Categories')
         if cursor.rowcount == 0:
             print(f" Error al actualizar: No se encontró la categoría con ID {category_id}.")
             return False
@@ -109,17 +244,14 @@ def update_category(category_id: int, new_name: str, new_percentage: float):
     except sqlite3.Error as e:
         print(f" Error al actualizar categoría ID {category_id}: {e}")
         return False
-    finally:
-        conn.close()
 
 def delete_category(category_id: int):
     """Elimina una categoría de la base de datos."""
     # Podríamos añadir lógica para reasignar transacciones, pero por ahora las dejamos huérfanas (FOREIGN KEY ON DELETE SET NULL)
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM Categories WHERE id = ?", (category_id,))
-        conn.commit()
+        with operation(f"Borrar categoría ID {category_id}") as conn:
+            cursor = conn.execute("DELETE FROM Categories WHERE id = ?", (category_id,))
+            mark_changed('Categories')
         if cursor.rowcount == 0:
             print(f"⚠️ Error al eliminar: No se encontró la categoría con ID {category_id}.")
             return False
@@ -130,152 +262,109 @@ def delete_category(category_id: int):
     except sqlite3.Error as e:
         print(f"❌ Error al eliminar categoría ID {category_id}: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_category_by_id(category_id: int):
     """Obtiene los datos de una categoría por su ID."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, percentage FROM Categories WHERE id = ?", (category_id,))
-    category = cursor.fetchone() # fetchone devuelve una tupla o None
-    conn.close()
+    category = conn.execute("SELECT id, name, percentage FROM Categories WHERE id = ?", (category_id,)).fetchone() # fetchone devuelve una fila o None
     if category:
-        # Convertimos la tupla a un diccionario para facilitar el acceso
+        # Convertimos la fila a un diccionario para facilitar el acceso
         return {'id': category[0], 'name': category[1], 'percentage': category[2]}
     else:
         return None # O podrías lanzar una excepción
 
 # --- Funciones para Transacciones ---
+# El balance de una categoría es la suma de balance_delta_cents de sus transacciones: cada
+# escritura inserta su delta y los triggers de Transactions actualizan Categories.balance_cents
+# (ver la migración 7 y src/balances.py). Nunca se modifica balance_cents directamente.
+# Las asignaciones solo las escribe src/distribution.py (distribute_incomes).
+
+INSERT_BATCH_SIZE = 5000
+
+def insert_transactions(conn: sqlite3.Connection, columns: tuple[str, ...], rows, or_ignore: bool = False) -> int:
+    """Inserta muchas filas en Transactions con UNA sentencia por lote (no una por fila como executemany).
+
+    Cada sentencia sobre Transactions hace que el índice FTS5 de los triggers vuelque a disco
+    lo pendiente, así que para miles de filas una sentencia por lote es varias veces más rápida.
+    Las filas (tuplas con los valores de 'columns') viajan como un array JSON; una fecha None
+    es CURRENT_TIMESTAMP. Devuelve cuántas filas se insertaron (sin contar las de los triggers).
+    """
+    selected = ", ".join(
+        f"COALESCE(json_extract(value, '$[{i}]'), CURRENT_TIMESTAMP)" if column == 'date'
+        else f"json_extract(value, '$[{i}]')"
+        for i, column in enumerate(columns))
+    sql = f"""
+        INSERT {'OR IGNORE ' if or_ignore else ''}INTO Transactions ({', '.join(columns)})
+        SELECT {selected} FROM json_each(?) ORDER BY key
+    """
+    rows = iter(rows)
+    inserted = 0
+    while batch := list(islice(rows, INSERT_BATCH_SIZE)):
+        inserted += conn.execute(sql, (json.dumps(batch),)).rowcount
+    return inserted
 
 def add_transaction(type: str, description: str, amount: float, category_id: int = None):
-    """Añade una transacción general (Ingreso o Gasto)."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Añade una transacción general (Ingreso o Gasto). amount va en euros."""
+    amount_cents = to_cents(amount)
     try:
-        cursor.execute("""
-            INSERT INTO Transactions (type, description, amount, category_id)
-            VALUES (?, ?, ?, ?)
-        """, (type, description, amount, category_id))
-        conn.commit()
-        print(f"✅ Transacción '{type}' añadida: {description} ({amount})")
+        with operation(f"{type}: {description}") as conn:
+            # Si es Gasto y tiene categoría, resta del balance (lo aplica el trigger en la misma transacción)
+            # (Nota: Los ingresos generales no afectan balances de categorías directamente)
+            balance_delta_cents = -amount_cents if type == 'Expense' and category_id is not None else 0
+            conn.execute("""
+                INSERT INTO Transactions (type, description, amount_cents, category_id, balance_delta_cents)
+                VALUES (?, ?, ?, ?, ?)
+            """, (type, description, amount_cents, category_id, balance_delta_cents))
+            mark_changed('Transactions')
+            if balance_delta_cents:
+                mark_changed('Categories')
 
-        # Si es Gasto y tiene categoría, actualizar balance
-        # (Nota: Los ingresos generales no afectan balances de categorías directamente)
+        print(f"✅ Transacción '{type}' añadida: {description} ({amount})")
         if type == 'Expense' and category_id is not None:
-            cursor.execute("""
-                UPDATE Categories
-                SET current_balance = current_balance - ?
-                WHERE id = ?
-            """, (amount, category_id))
-            conn.commit()
             print(f"💰 Balance actualizado para categoría ID {category_id} (-{amount})")
 
     except sqlite3.Error as e:
-        print(f"❌ Error al añadir transacción: {e}")
-        conn.rollback() # Deshacer si hay error
-    finally:
-        conn.close()
+        print(f"❌ Error al añadir transacción: {e}") # transaction() ya ha deshecho los cambios
 
-def add_allocation_transaction(category_id: int, amount: float, description: str):
-    """Añade una transacción de 'Allocation' Y actualiza el balance de la categoría."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        # Insert the allocation transaction (Reverted: removed timestamp column)
-        cursor.execute("""
-            INSERT INTO Transactions (type, description, amount, category_id)
-            VALUES (?, ?, ?, ?)
-        """, ('Allocation', description, amount, category_id))
-        logging.info(f"📝 Transacción 'Allocation' registrada para Cat ID {category_id}: {description} ({amount})")
-
-        # Update the category balance - SETTING the value, not adding
-        cursor.execute("""
-            UPDATE Categories SET current_balance = ? WHERE id = ?
-        """, (amount, category_id))
-        logging.info(f"💰 Balance establecido para Cat ID {category_id}: {amount}")
-
-        conn.commit() # Confirmar ambos cambios
-        logging.info(f"✅ Asignación completada para Cat ID {category_id}.")
+# --- Resúmenes ---
 
-    except sqlite3.Error as e:
-        logging.error(f"❌ Error al añadir asignación para Cat ID {category_id}: {e}")
-        conn.rollback() # Deshacer ambos cambios si algo falla
-    finally:
-        conn.close()
+TRANSACTION_TYPES = ('Income', 'Expense', 'Allocation', 'Adjustment')
 
-# --- Funciones de Lógica Financiera ---
-def distribute_income(total_income: float) -> bool:
-    """Distribuye un ingreso total entre las categorías según sus porcentajes."""
+def get_dashboard_summary(start_date: str = None, end_date: str = None) -> dict:
+    """Devuelve los totales del panel: porcentaje total, balance total y nº de categorías.
+
+    Incluye también la suma de las transacciones de cada tipo con fecha en los días
+    [start_date, end_date) ('YYYY-MM-DD'; None = sin límite). Esas sumas salen de los totales
+    por mes y día de src/rollups.py, no de Transactions, así que no dependen del tamaño del libro.
+    """
+    from src.rollups import select_totals # src/rollups.py importa este módulo
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if total_income <= 0:
-        print("El ingreso a distribuir debe ser positivo.")
-        return False
-        
     try:
-        # Iniciar transacción
-        cursor.execute("BEGIN TRANSACTION")
-        
-        # --- Reset all balances to 0 before distributing --- 
-        cursor.execute("UPDATE Categories SET current_balance = 0")
-        print("  -> Balances reseteados a 0.")
-        
-        # 1. Obtener todas las categorías con porcentaje > 0
-        cursor.execute("SELECT id, percentage FROM Categories WHERE percentage > 0")
-        categories_to_update = cursor.fetchall()
-        
-        if not categories_to_update:
-            print("⚠️ No hay categorías con porcentaje asignado para distribuir el ingreso.")
-            conn.rollback() # Cancelar transacción
-            return False
-            
-        total_percentage = sum(row['percentage'] for row in categories_to_update)
-        # Opcional: Validar si la suma es ~100% ? Por ahora, distribuimos proporcionalmente.
-        # if not (99.9 < total_percentage < 100.1):
-        #    print(f"Advertencia: La suma de porcentajes ({total_percentage}%) no es 100%.")
-            
-        # 2. Calcular y actualizar el saldo de cada categoría
-        distributed_sum = 0
-        updates = []
-        for category_row in categories_to_update:
-            category_id = category_row['id']
-            percentage = category_row['percentage']
-            
-            # Calcula la porción para esta categoría
-            # Usamos total_percentage por si no suman exactamente 100, para distribuir todo el ingreso proporcionalmente
-            amount_to_add = (total_income * percentage / 100) 
-            distributed_sum += amount_to_add
-            updates.append((amount_to_add, category_id))
-
-        # 3. Ejecutar las actualizaciones (OVERWRITE balance, don't add)
-        cursor.executemany("UPDATE Categories SET current_balance = ? WHERE id = ?", updates)
-        
-        # Opcional: Manejar redondeo/sobrante. 
-        # Podría ir a una categoría específica o registrarse aparte.
-        remainder = total_income - distributed_sum
-        if abs(remainder) > 0.001: # Pequeño umbral para errores de punto flotante
-             print(f"💰 Se distribuyó {distributed_sum:.2f}€. Quedó un remanente de {remainder:.2f}€ (posiblemente por redondeo). Considera ajustar porcentajes.")
-             # Aquí podríamos añadir el remanente a una categoría específica, ej. Ahorro
-             # cursor.execute("UPDATE Categories SET current_balance = current_balance + ? WHERE name = ?", (remainder, 'Ahorro'))
-
-        # Confirmar transacción
-        conn.commit()
-        print(f"✅ Ingreso de {total_income:.2f}€ distribuido correctamente.")
-        return True
-
+        row = conn.execute("""
+            SELECT COALESCE(SUM(percentage), 0), COALESCE(SUM(balance_cents), 0), COUNT(*) FROM Categories
+        """).fetchone()
+        totals = dict(select_totals(conn, "type, SUM(amount_cents)", start_date, end_date, group_by="type"))
     except sqlite3.Error as e:
-        print(f"❌ Error al distribuir ingreso: {e}")
-        conn.rollback() # Revertir cambios si hay error
-        return False
-    finally:
-        conn.close()
+        print(f"❌ Error al obtener el resumen del panel: {e}")
+        row, totals = (0, 0, 0), {}
+    return {
+        'total_percentage': row[0],
+        'total_balance': from_cents(row[1]),
+        'total_balance_cents': row[1],
+        'category_count': row[2],
+        'totals_cents': {t: totals.get(t, 0) for t in TRANSACTION_TYPES},
+    }
 
+# --- Funciones de Lógica Financiera ---
+def distribute_income(total_income: float) -> bool:
+    """Distribuye un ingreso total entre las categorías según sus porcentajes (ver src/distribution.py)."""
+    from src.distribution import distribute_incomes # numpy solo se carga al repartir
+    return distribute_incomes([total_income]) is not None
 
 if __name__ == '__main__':
     # Esto se ejecuta solo si corres database.py directamente
     # Útil para inicializar/resetear la BD manualmente si es necesario
     print("Inicializando la base de datos...")
     create_tables()
+    close_all_connections()
     print("Proceso de inicialización terminado.")
@@ -0,0 +1,70 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# --- Trabajo de BD fuera del hilo de la UI ---
+# Las funciones de src/database.py usan la conexión persistente del hilo que las llama, así
+# que basta con ejecutarlas en otros hilos: el hilo escritor tiene su propia conexión (y al ser
+# uno solo, las escrituras quedan serializadas en orden de llegada) y cada hilo lector la suya,
+# que con WAL leen en paralelo sin bloquear al escritor.
+
+READER_THREADS = 2
+
+def _clock_dispatch(callback):
+    """Ejecuta callback en el hilo de Kivy en el próximo frame."""
+    from kivy.clock import Clock # Solo hace falta con la UI: los scripts pueden usar otro dispatch
+    Clock.schedule_once(lambda dt: callback(), 0)
+
+class DatabaseWorker:
+    """Ejecuta funciones de BD en segundo plano y entrega sus resultados en el hilo de la UI.
+
+    submit() encola una escritura (un solo hilo escritor: orden garantizado) y submit_read()
+    una lectura (pool de lectores). Ambas devuelven un concurrent.futures.Future; si se pasan
+    on_done(resultado) u on_error(excepción), se llaman a través de dispatch, por defecto en
+    el Clock de Kivy, así que pueden tocar widgets sin más.
+    """
+
+    def __init__(self, readers: int = READER_THREADS, dispatch=_clock_dispatch):
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader') if readers else None
+        self._dispatch = dispatch
+
+    def submit(self, fn, *args, on_done=None, on_error=None) -> Future:
+        """Encola fn(*args) en el hilo escritor."""
+        return self._submit(self._writer, fn, args, on_done, on_error)
+
+    def submit_read(self, fn, *args, on_done=None, on_error=None) -> Future:
+        """Encola fn(*args), que solo lee, en el pool de lectores (o en el escritor si no hay pool)."""
+        return self._submit(self._readers or self._writer, fn, args, on_done, on_error)
+
+    def shutdown(self, wait: bool = True):
+        """Deja de aceptar trabajo y espera (si wait) a que termine el encolado."""
+        self._writer.shutdown(wait=wait)
+        if self._readers:
+            self._readers.shutdown(wait=wait)
+
+    def _submit(self, executor, fn, args, on_done, on_error) -> Future:
+        future = executor.submit(fn, *args)
+        if on_done or on_error:
+            future.add_done_callback(lambda f: self._dispatch(lambda: self._deliver(f, fn, on_done, on_error)))
+        return future
+
+    @staticmethod
+    def _deliver(future: Future, fn, on_done, on_error):
+        if future.cancelled():
+            return
+        error = future.exception()
+        name = getattr(fn, '__name__', fn)
+        try:
+            if error is None:
+                if on_done:
+                    on_done(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                logging.error(f"❌ Error en tarea de BD '{name}': {error}", exc_info=error)
+        except Exception as e:
+            # Un fallo del callback (p.ej. al crear un widget) no debe tumbar el Clock de Kivy
+            logging.error(f"❌ Error al entregar el resultado de '{name}': {e}", exc_info=True)
+
+# Instancia compartida por toda la app
+db_worker = DatabaseWorker()
@@ -0,0 +1,149 @@
+import argparse
+import logging
+import sqlite3
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from src.database import operation, mark_changed, insert_transactions, create_tables, close_all_connections
+from src.money import to_cents, from_cents
+
+# --- Reparto de ingresos entre categorías ---
+# Único camino para repartir ingresos (la UI y los scripts usan distribute_incomes). El
+# cálculo es entero y vectorizado con NumPy: para M ingresos y N categorías se calcula de
+# una vez la matriz M×N de partes, con el método del mayor resto por fila. Cada ingreso se
+# reparte en céntimos exactos: las partes suman el ingreso × (suma de porcentajes / 100),
+# redondeado a la mitad hacia arriba, sin perder ni inventar céntimos.
+
+# Los porcentajes se pasan a enteros con 6 decimales (33.333333% -> 33333333)
+PERCENT_SCALE = 10 ** 6
+_DENOMINATOR = 100 * PERCENT_SCALE
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+# category_ids y percentages: categorías que participan (porcentaje > 0), por ID
+# incomes_cents[j]: ingreso j; shares_cents[j, i]: parte del ingreso j para la categoría i
+Distribution = namedtuple('Distribution', ['category_ids', 'percentages', 'incomes_cents', 'shares_cents'])
+
+_ALLOCATION_COLUMNS = ('type', 'description', 'amount_cents', 'date', 'category_id', 'balance_delta_cents')
+
+def percentage_weights(percentages) -> np.ndarray:
+    """Porcentajes -> pesos enteros exactos (porcentaje × PERCENT_SCALE); los <= 0 pesan 0."""
+    # str() evita arrastrar el error binario del float, como en money.to_cents
+    return np.array([max(int((Decimal(str(p)) * PERCENT_SCALE).to_integral_value(rounding=ROUND_HALF_UP)), 0)
+                     for p in percentages], dtype=np.int64)
+
+def allocate_batch(incomes_cents, percentages) -> np.ndarray:
+    """Reparte cada ingreso (céntimos) según los porcentajes (sobre 100). Devuelve la matriz M×N de partes.
+
+    Cada parte recibe el suelo de su cuota exacta y los céntimos sobrantes de cada ingreso
+    van, uno a uno, a las partes con mayor resto (a igualdad, la primera). Si los porcentajes
+    suman 100 las partes suman EXACTAMENTE cada ingreso; si suman menos, solo esa fracción.
+    """
+    incomes = np.asarray(incomes_cents, dtype=np.int64).reshape(-1)
+    weights = percentage_weights(percentages)
+    if not len(incomes) or not len(weights):
+        return np.zeros((len(incomes), len(weights)), dtype=np.int64)
+    if incomes.min() < 0:
+        raise ValueError("Los ingresos a repartir no pueden ser negativos.")
+
+    total_weight = int(weights.sum())
+    if int(incomes.max()) * max(total_weight, 1) * 2 + _DENOMINATOR > _INT64_MAX:
+        # Importes enormes: enteros de Python (exactos sin límite, pero más lentos)
+        incomes, weights = incomes.astype(object), weights.astype(object)
+
+    quotas = incomes[:, None] * weights[None, :] # Cuotas exactas × _DENOMINATOR
+    shares = quotas // _DENOMINATOR
+    remainders = (quotas - shares * _DENOMINATOR).astype(np.int64)
+    targets = (incomes * (2 * total_weight) + _DENOMINATOR) // (2 * _DENOMINATOR)
+    leftover = (targets - shares.sum(axis=1)).astype(np.int64)
+
+    # Clave única por fila: el resto y, a igualdad, antes la primera columna. Los 'leftover'
+    # céntimos van a las claves >= la leftover-ésima mayor (np.sort es más rápido que argsort)
+    n = remainders.shape[1]
+    keys = remainders * n + np.arange(n - 1, -1, -1)
+    sorted_keys = np.sort(keys, axis=1)
+    thresholds = sorted_keys[np.arange(len(keys)), np.clip(n - leftover, 0, n - 1)]
+    bonus = (keys >= thresholds[:, None]) & (leftover > 0)[:, None]
+    return shares.astype(np.int64) + bonus
+
+def allocate(income_cents: int, percentages) -> list[int]:
+    """Reparte un solo ingreso (céntimos) según los porcentajes; ver allocate_batch."""
+    return allocate_batch([income_cents], percentages)[0].tolist()
+
+def distribute_incomes(incomes: list[float], dates: list[str] = None) -> Distribution | None:
+    """Reparte uno o varios ingresos (euros) entre las categorías en UNA sola transacción.
+
+    Por cada ingreso, en orden (de fecha si se pasan 'dates', p.ej. para reproducir las
+    nóminas de un año), se registra una 'Allocation' por categoría con porcentaje > 0 que
+    ESTABLECE su balance a la parte calculada. Antes, las categorías sin porcentaje y con
+    saldo vuelven a 0 con un 'Adjustment'. Devuelve el reparto, o None si no se aplicó nada.
+    """
+    if not incomes:
+        return None
+    if dates is not None and len(dates) != len(incomes):
+        raise ValueError("Hace falta una fecha por ingreso.")
+    incomes_cents = np.array([to_cents(income) for income in incomes], dtype=np.int64)
+    if incomes_cents.min() <= 0:
+        logging.warning("El ingreso a distribuir debe ser positivo.")
+        return None
+
+    order = sorted(range(len(incomes)), key=lambda j: dates[j]) if dates else list(range(len(incomes)))
+    try:
+        label = (f"Reparto de {from_cents(int(incomes_cents[0])):.2f}€" if len(incomes) == 1
+                 else f"Reparto de {len(incomes)} ingresos ({from_cents(int(incomes_cents.sum())):.2f}€)")
+        with operation(label) as conn:
+            rows = conn.execute("SELECT id, percentage, balance_cents FROM Categories WHERE percentage > 0 ORDER BY id").fetchall()
+            if not rows:
+                logging.warning("⚠️ No hay categorías con porcentaje asignado para distribuir el ingreso.")
+                return None # Aún no se ha escrito nada
+            category_ids = [row[0] for row in rows]
+            percentages = [row[1] for row in rows]
+            shares = allocate_batch(incomes_cents, percentages)
+
+            # Las categorías sin porcentaje se quedan a 0 (como Adjustment, para que quede en el libro)
+            conn.execute("""
+                INSERT INTO Transactions (type, description, amount_cents, category_id, balance_delta_cents)
+                SELECT 'Adjustment', 'Balance a 0 por reparto de ingreso', -balance_cents, id, -balance_cents
+                FROM Categories WHERE percentage <= 0 AND balance_cents != 0
+            """)
+            # Cada asignación ESTABLECE el balance: su delta es la parte menos el balance que deja
+            # la asignación anterior (el balance actual para la primera)
+            ordered_shares = shares[order]
+            deltas = ordered_shares - np.vstack([np.array([[row[2] for row in rows]], dtype=np.int64),
+                                                 ordered_shares[:-1]])
+            percentage_labels = [f"{percentage:.2f}" for percentage in percentages]
+            insert_transactions(conn, _ALLOCATION_COLUMNS, (
+                ('Allocation', f"Asignación del {pct_label}% de {from_cents(incomes_cents[j]):.2f}€", share,
+                 dates[j] if dates else None, category_id, delta)
+                for j, row_shares, row_deltas in zip(order, ordered_shares.tolist(), deltas.tolist())
+                for category_id, pct_label, share, delta in zip(category_ids, percentage_labels, row_shares, row_deltas)))
+            mark_changed('Transactions', 'Categories')
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al distribuir ingresos (no se aplicó ninguno): {e}") # transaction() revierte
+        return None
+
+    unassigned_cents = int(incomes_cents.sum() - shares.sum())
+    if unassigned_cents:
+        logging.warning(f"💰 Los porcentajes suman {sum(percentages):.2f}%: quedan {from_cents(unassigned_cents):.2f}€ "
+                        f"sin asignar. Considera ajustar porcentajes.")
+    logging.info(f"✅ {len(incomes)} ingresos ({from_cents(int(incomes_cents.sum())):.2f}€) distribuidos "
+                 f"entre {len(category_ids)} categorías.")
+    return Distribution(category_ids, percentages, incomes_cents, shares)
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.distribution 1500 1500 1620.50 [--dates 2025-01-31 2025-02-28 2025-03-31]
+    parser = argparse.ArgumentParser(description="Reparte uno o varios ingresos entre las categorías.")
+    parser.add_argument('incomes', nargs='+', type=float, help="Ingresos en euros")
+    parser.add_argument('--dates', nargs='+', help="Fecha de cada ingreso (YYYY-MM-DD[ HH:MM:SS])")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    create_tables()
+    distribution = distribute_incomes(args.incomes, args.dates)
+    if distribution is not None:
+        for category_id, percentage, total in zip(distribution.category_ids, distribution.percentages,
+                                                  distribution.shares_cents.sum(axis=0).tolist()):
+            print(f"  Cat ID {category_id} ({percentage:.2f}%): {from_cents(total):.2f}€ asignados")
+    close_all_connections()
@@ -0,0 +1,194 @@
+import argparse
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from src.database import get_db_connection, transaction, create_tables, close_all_connections
+from src.money import to_cents, from_cents
+
+# Fila ligera del historial (namedtuple: poca memoria y acceso por nombre o posición)
+TransactionRow = namedtuple('TransactionRow', ['id', 'date', 'type', 'description', 'amount_cents', 'category_id'])
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_SEARCH_LIMIT = 50
+# bm25 cuesta ~2 µs por coincidencia: un prefijo corto que aparece en 100k filas tardaría
+# cientos de ms en ordenarse entero, así que solo se ordenan las más recientes
+RANK_CANDIDATES = 1000
+
+def _filter_conditions(types=None, category_id: int = None, date_from: str = None, date_to: str = None,
+                       min_amount: float = None, max_amount: float = None) -> tuple[list, list]:
+    """Condiciones SQL (y sus parámetros) de los filtros comunes del historial y la búsqueda."""
+    conditions = []
+    params = []
+    if types:
+        types = [types] if isinstance(types, str) else list(types)
+        conditions.append(f"type IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    if category_id is not None:
+        conditions.append("category_id = ?")
+        params.append(category_id)
+    if date_from:
+        conditions.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("date < ?")
+        params.append(date_to)
+    if min_amount is not None:
+        conditions.append("amount_cents >= ?")
+        params.append(to_cents(min_amount))
+    if max_amount is not None:
+        conditions.append("amount_cents <= ?")
+        params.append(to_cents(max_amount))
+    return conditions, params
+
+def get_transactions_page(limit: int = DEFAULT_PAGE_SIZE, after: tuple = None, types=None, category_id: int = None,
+                          date_from: str = None, date_to: str = None,
+                          min_amount: float = None, max_amount: float = None) -> tuple[list, tuple | None]:
+    """Devuelve una página del historial de transacciones, de la más reciente a la más antigua.
+
+    Paginación por clave (keyset) sobre (date, id): en vez de OFFSET se pasa en 'after' el
+    cursor devuelto por la página anterior, así cada página cuesta lo mismo sin importar
+    cuántas filas haya antes. Filtros opcionales:
+      - types: un tipo ('Expense') o una lista de tipos
+      - category_id: solo esa categoría
+      - date_from / date_to: fechas 'YYYY-MM-DD[ HH:MM:SS]', desde incluida y hasta excluida
+      - min_amount / max_amount: importes en euros, ambos incluidos
+
+    Devuelve (filas, cursor_siguiente); el cursor es None cuando no quedan más páginas.
+    """
+    conditions, params = _filter_conditions(types, category_id, date_from, date_to, min_amount, max_amount)
+    if after is not None:
+        conditions.append("(date, id) < (?, ?)")
+        params.extend(after)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    conn = get_db_connection()
+    try:
+        # Pedimos una fila de más para saber si hay página siguiente sin otra consulta
+        cursor = conn.execute(f"""
+            SELECT id, date, type, description, amount_cents, category_id
+            FROM Transactions
+            {where}
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        """, (*params, limit + 1))
+        rows = [TransactionRow(*row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"❌ Error al obtener el historial de transacciones: {e}")
+        return [], None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (last.date, last.id)
+    return rows, None
+
+def iter_transactions(page_size: int = 500, **filters):
+    """Recorre todo el historial (con los mismos filtros) página a página, sin cargarlo entero en memoria."""
+    after = None
+    while True:
+        rows, after = get_transactions_page(limit=page_size, after=after, **filters)
+        yield from rows
+        if after is None:
+            return
+
+# --- Búsqueda por texto en las descripciones ---
+# TransactionsFTS (migración 10) es un índice FTS5 de Transactions.description que los
+# triggers mantienen al día. Cada palabra escrita se busca como prefijo ('nom' encuentra
+# 'Nómina'), todas deben aparecer y los resultados se ordenan por relevancia (bm25) entre
+# las RANK_CANDIDATES coincidencias más recientes.
+# Sin FTS5 en SQLite se busca con LIKE '%palabra%', que recorre toda la tabla.
+
+def _search_terms(text: str) -> list[str]:
+    """Palabras de la búsqueda, separadas como las separa el tokenizador de FTS5."""
+    return re.findall(r"[^\W_]+", text or "")
+
+def _has_search_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'TransactionsFTS'").fetchone() is not None
+
+def search_transactions(text: str, limit: int = DEFAULT_SEARCH_LIMIT, types=None, category_id: int = None,
+                        date_from: str = None, date_to: str = None,
+                        min_amount: float = None, max_amount: float = None) -> list[TransactionRow]:
+    """Busca transacciones cuya descripción contenga todas las palabras de 'text' (como prefijos).
+
+    Acepta los mismos filtros que get_transactions_page. Devuelve como mucho 'limit' filas,
+    las más relevantes primero (a igualdad, las más recientes); una búsqueda vacía devuelve [].
+    Con miles de coincidencias, la relevancia solo se compara entre las RANK_CANDIDATES últimas.
+    """
+    terms = _search_terms(text)
+    if not terms:
+        return []
+    conditions, params = _filter_conditions(types, category_id, date_from, date_to, min_amount, max_amount)
+    conn = get_db_connection()
+    try:
+        if _has_search_index(conn):
+            query = " ".join(f'"{term}"*' for term in terms)
+            where = "".join(f" AND {condition}" for condition in conditions)
+            # Se ordenan por relevancia las RANK_CANDIDATES coincidencias más recientes (por id)
+            cursor = conn.execute(f"""
+                SELECT t.id, t.date, t.type, t.description, t.amount_cents, t.category_id
+                FROM (
+                    SELECT f.rowid, f.rank FROM TransactionsFTS f JOIN Transactions t ON t.id = f.rowid
+                    WHERE TransactionsFTS MATCH ?{where}
+                    ORDER BY f.rowid DESC LIMIT ?
+                ) m JOIN Transactions t ON t.id = m.rowid
+                ORDER BY m.rank, t.date DESC
+                LIMIT ?
+            """, (query, *params, RANK_CANDIDATES, limit))
+        else:
+            # Las palabras solo tienen letras y números: no hay comodines de LIKE que escapar
+            conditions += ["description LIKE ?"] * len(terms)
+            params += [f"%{term}%" for term in terms]
+            cursor = conn.execute(f"""
+                SELECT id, date, type, description, amount_cents, category_id
+                FROM Transactions
+                WHERE {' AND '.join(conditions)}
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+            """, (*params, limit))
+        return [TransactionRow(*row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"❌ Error al buscar transacciones '{text}': {e}")
+        return []
+
+def rebuild_search_index() -> bool:
+    """Rehace el índice de búsqueda desde Transactions y lo compacta (si se editó la BD a mano)."""
+    try:
+        with transaction() as conn:
+            if not _has_search_index(conn):
+                print("⚠️ No hay índice de búsqueda (SQLite sin FTS5): se busca con LIKE.")
+                return False
+            conn.execute("INSERT INTO TransactionsFTS (TransactionsFTS) VALUES ('rebuild')")
+            conn.execute("INSERT INTO TransactionsFTS (TransactionsFTS) VALUES ('optimize')")
+        print("✅ Índice de búsqueda reconstruido.")
+        return True
+    except sqlite3.Error as e:
+        print(f"❌ Error al reconstruir el índice de búsqueda: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.history "asignacion 20" [--category 41] [--from 2025-01-01] [--to 2025-07-01]
+    #      python -m src.history --rebuild-index
+    parser = argparse.ArgumentParser(description="Búsqueda en el historial de transacciones.")
+    parser.add_argument('text', nargs='?', default="", help="Palabras a buscar (como prefijos)")
+    parser.add_argument('--category', type=int)
+    parser.add_argument('--from', dest='date_from', help="Fecha desde (incluida)")
+    parser.add_argument('--to', dest='date_to', help="Fecha hasta (excluida)")
+    parser.add_argument('--limit', type=int, default=DEFAULT_SEARCH_LIMIT)
+    parser.add_argument('--rebuild-index', action='store_true', help="Reconstruir el índice de búsqueda")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.rebuild_index:
+        rebuild_search_index()
+    if args.text:
+        started = time.perf_counter()
+        rows = search_transactions(args.text, args.limit, category_id=args.category,
+                                   date_from=args.date_from, date_to=args.date_to)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for row in rows:
+            print(f"  {row.date}  {row.type:<10} {from_cents(row.amount_cents):>10.2f}€  {row.description}")
+        print(f"{len(rows)} resultados en {elapsed_ms:.1f} ms.")
+    close_all_connections()
@@ -0,0 +1,49 @@
+import hashlib
+import unicodedata
+from functools import lru_cache
+from collections import namedtuple
+from itertools import islice
+
+from src.database import operation, mark_changed, insert_transactions
+
+# Fila lista para insertar en Transactions. import_hash identifica su contenido de origen:
+# el índice único sobre esa columna hace que reimportar el mismo fichero no duplique nada.
+ImportedTransaction = namedtuple('ImportedTransaction',
+                                 ['type', 'description', 'amount_cents', 'date', 'category_id', 'import_hash'])
+
+BATCH_SIZE = 2000
+
+@lru_cache(maxsize=4096) # Los mismos nombres (categorías, tipos) se repiten en miles de filas
+def normalize_name(name: str) -> str:
+    """Clave para comparar nombres sin mayúsculas ni tildes ('ALIMENTACIÓN' == 'alimentacion')."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold().strip()
+
+def content_hash(*parts) -> str:
+    """Huella estable (misma entrada -> mismo valor en cualquier ejecución) de los datos de una fila."""
+    return hashlib.blake2b('\x1f'.join(str(part) for part in parts).encode('utf-8'), digest_size=16).hexdigest()
+
+def write_transactions(rows, batch_size: int = BATCH_SIZE, progress=None,
+                       label: str = "Importación de transacciones") -> tuple[int, int]:
+    """Inserta las filas (iterable de ImportedTransaction) por lotes, en UNA sola transacción.
+
+    Consume 'rows' de forma perezosa, así que la memoria no depende del tamaño del fichero.
+    Las filas cuya import_hash ya existe se ignoran (INSERT OR IGNORE). Si algo falla no se
+    importa nada. progress(procesadas, insertadas) se llama tras cada lote. La importación
+    es una operación del diario (label): se puede deshacer entera con src/journal.py.
+    Devuelve (insertadas, omitidas por duplicadas).
+
+    Las filas importadas son historial: no modifican el balance actual de las categorías.
+    """
+    processed = inserted = 0
+    rows = iter(rows)
+    with operation(label) as conn:
+        while batch := list(islice(rows, batch_size)):
+            # rowcount no cuenta lo que escriben los triggers (totales, índice de búsqueda)
+            inserted += insert_transactions(conn, ImportedTransaction._fields, batch, or_ignore=True)
+            processed += len(batch)
+            if progress:
+                progress(processed, inserted)
+        if inserted:
+            mark_changed('Transactions')
+    return inserted, processed - inserted
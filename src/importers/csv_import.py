@@ -0,0 +1,194 @@
+import argparse
+import csv
+import logging
+import os
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from src.database import create_tables, get_all_categories, close_all_connections
+from src.money import to_cents
+from src.importers.common import ImportedTransaction, content_hash, normalize_name, write_transactions, BATCH_SIZE
+
+# --- Formato por defecto: extracto típico de banco español ---
+# Las columnas se indican por nombre de cabecera o por posición (0, 1, ...).
+# Con 'amount' el signo decide el tipo (negativo = gasto); también se pueden usar columnas
+# separadas 'debit' (cargos) y 'credit' (abonos). 'type' y 'category' son opcionales.
+DEFAULT_MAPPING = {
+    'date': 'Fecha',
+    'description': 'Concepto',
+    'amount': 'Importe',
+    'debit': None,
+    'credit': None,
+    'type': None,
+    'category': None,
+    'date_formats': ['%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S'],
+    'decimal_comma': True,  # '1.234,56' en vez de '1,234.56'
+    'delimiter': ';',
+    'encoding': 'utf-8-sig', # Quita el BOM que añaden muchos bancos
+    'skip_rows': 0,          # Líneas de cabecera del banco antes de la fila de títulos
+}
+
+# Valores de la columna 'type' aceptados (normalizados) -> tipo de la BD
+TYPE_ALIASES = {
+    'income': 'Income', 'ingreso': 'Income', 'abono': 'Income', 'credit': 'Income',
+    'expense': 'Expense', 'gasto': 'Expense', 'cargo': 'Expense', 'debit': 'Expense',
+}
+_AMOUNT_JUNK = re.compile(r'[^\d,.\-+()]')
+
+def parse_amount(text: str, decimal_comma: bool = True) -> Decimal | None:
+    """Convierte '1.234,56 €', '-12,30' o '(12.30)' a Decimal; None si está vacío o no es un número."""
+    text = _AMOUNT_JUNK.sub('', (text or '').replace('−', '-'))
+    if not text:
+        return None
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()')
+    if decimal_comma:
+        text = text.replace('.', '').replace(',', '.')
+    else:
+        text = text.replace(',', '')
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    return -value if negative else value
+
+def parse_date(text: str, date_formats: list[str]) -> str | None:
+    """Convierte la fecha del extracto al formato de la BD ('YYYY-MM-DD HH:MM:SS'); None si no encaja."""
+    text = (text or '').strip()
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(text, date_format).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    return None
+
+def _resolve_columns(header: list[str], mapping: dict) -> dict:
+    """Traduce los nombres de columna del mapeo a posiciones dentro de la fila."""
+    positions = {normalize_name(name): index for index, name in enumerate(header)}
+    columns = {}
+    for field in ('date', 'description', 'amount', 'debit', 'credit', 'type', 'category'):
+        column = mapping.get(field)
+        if column is None:
+            columns[field] = None
+        elif isinstance(column, int):
+            columns[field] = column
+        elif normalize_name(column) in positions:
+            columns[field] = positions[normalize_name(column)]
+        else:
+            raise ValueError(f"La columna '{column}' ({field}) no está en la cabecera: {header}")
+    if columns['date'] is None or (columns['amount'] is None and columns['debit'] is None and columns['credit'] is None):
+        raise ValueError("El mapeo necesita la columna de fecha y la de importe (o cargo/abono).")
+    return columns
+
+def iter_csv_transactions(lines, mapping: dict, category_ids: dict, source: str = '', stats: dict = None):
+    """Genera las transacciones de un CSV fila a fila (no carga el fichero en memoria).
+
+    Cada fila recibe una huella de su contenido (fecha, concepto, importe, tipo, cuenta) más
+    un contador para filas idénticas del mismo día, de modo que reimportar un extracto que se
+    solapa con otro ya importado salta las filas repetidas pero conserva dos compras iguales
+    el mismo día. Las filas que no se pueden interpretar se cuentan en stats['invalid'].
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('invalid', 0)
+    reader = csv.reader(lines, delimiter=mapping['delimiter'])
+    for _ in range(mapping['skip_rows']):
+        next(reader, None)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = _resolve_columns(header, mapping)
+
+    def cell(row, field):
+        index = columns[field]
+        return row[index].strip() if index is not None and index < len(row) else ''
+
+    current_date, occurrences = None, {}
+    last_date_text, date = None, None
+    for line_number, row in enumerate(reader, start=mapping['skip_rows'] + 2):
+        if not any(value.strip() for value in row):
+            continue
+        date_text = cell(row, 'date')
+        if date_text != last_date_text: # strptime es lento y los extractos repiten la fecha en muchas filas seguidas
+            last_date_text, date = date_text, parse_date(date_text, mapping['date_formats'])
+        if columns['amount'] is not None:
+            amount = parse_amount(cell(row, 'amount'), mapping['decimal_comma'])
+        else:
+            debit = parse_amount(cell(row, 'debit'), mapping['decimal_comma']) or Decimal(0)
+            credit = parse_amount(cell(row, 'credit'), mapping['decimal_comma']) or Decimal(0)
+            amount = credit - abs(debit)
+        if date is None or not amount:
+            stats['invalid'] += 1
+            logging.debug(f"Fila {line_number} del CSV ignorada (fecha o importe no válidos): {row}")
+            continue
+
+        transaction_type = TYPE_ALIASES.get(normalize_name(cell(row, 'type')))
+        if transaction_type is None:
+            transaction_type = 'Expense' if amount < 0 else 'Income'
+        description = cell(row, 'description')
+        category_id = category_ids.get(normalize_name(cell(row, 'category'))) if columns['category'] is not None else None
+        amount_cents = abs(to_cents(amount))
+
+        # El contador de filas idénticas solo vive mientras dura el mismo día (memoria constante
+        # con extractos ordenados por fecha, que es como los exportan los bancos)
+        if date != current_date:
+            current_date, occurrences = date, {}
+        key = (description, amount_cents, transaction_type)
+        occurrence = occurrences[key] = occurrences.get(key, -1) + 1
+
+        import_hash = content_hash('csv', source, date, description, amount_cents, transaction_type, occurrence)
+        yield ImportedTransaction(transaction_type, description, amount_cents, date, category_id, import_hash)
+
+def import_csv(path: str, mapping: dict = None, source: str = '', batch_size: int = BATCH_SIZE, progress=None) -> dict:
+    """Importa un extracto bancario en CSV a Transactions en una sola pasada y una sola transacción.
+
+    - mapping: sobrescribe claves de DEFAULT_MAPPING (columnas, formatos de fecha, separadores...).
+    - source: nombre de la cuenta; forma parte de la huella para que dos cuentas con movimientos
+      idénticos no se consideren duplicados entre sí.
+    - progress(procesadas, insertadas): se llama tras cada lote escrito.
+
+    Las filas ya importadas (misma huella) se omiten con INSERT OR IGNORE. Las transacciones
+    importadas son historial: no modifican el balance actual de las categorías.
+    Devuelve {'inserted': n, 'skipped': n, 'invalid': n}.
+    """
+    mapping = {**DEFAULT_MAPPING, **(mapping or {})}
+    category_ids = {normalize_name(cat['name']): cat['id'] for cat in get_all_categories()}
+    stats = {'invalid': 0}
+    with open(path, newline='', encoding=mapping['encoding']) as csv_file:
+        rows = iter_csv_transactions(csv_file, mapping, category_ids, source, stats)
+        inserted, skipped = write_transactions(rows, batch_size, progress,
+                                               f"Importación CSV '{os.path.basename(path)}'")
+
+    logging.info(f"📥 Importación CSV '{path}': {inserted} nuevas, {skipped} duplicadas, {stats['invalid']} no válidas.")
+    return {'inserted': inserted, 'skipped': skipped, 'invalid': stats['invalid']}
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.importers.csv_import extracto.csv [--date Fecha --amount Importe ...]
+    parser = argparse.ArgumentParser(description="Importa un extracto bancario en CSV.")
+    parser.add_argument('path', help="Ruta del .csv")
+    parser.add_argument('--source', default='', help="Nombre de la cuenta (p.ej. 'ING nómina')")
+    parser.add_argument('--delimiter', default=DEFAULT_MAPPING['delimiter'])
+    parser.add_argument('--encoding', default=DEFAULT_MAPPING['encoding'])
+    parser.add_argument('--date-format', action='append', dest='date_formats', help="Formato strptime (repetible)")
+    parser.add_argument('--decimal-point', action='store_true', help="Los importes usan punto decimal ('1,234.56')")
+    parser.add_argument('--skip-rows', type=int, default=0)
+    for field in ('date', 'description', 'amount', 'debit', 'credit', 'type', 'category'):
+        parser.add_argument(f'--{field}', default=DEFAULT_MAPPING[field], help=f"Columna de {field}")
+    args = parser.parse_args()
+
+    mapping = {field: getattr(args, field) for field in ('date', 'description', 'amount', 'debit', 'credit', 'type', 'category')}
+    if args.debit or args.credit:
+        mapping['amount'] = None
+    mapping.update(delimiter=args.delimiter, encoding=args.encoding, decimal_comma=not args.decimal_point,
+                   skip_rows=args.skip_rows)
+    if args.date_formats:
+        mapping['date_formats'] = args.date_formats
+
+    create_tables()
+    try:
+        result = import_csv(args.path, mapping, source=args.source,
+                            progress=lambda processed, inserted: print(f"  ... {processed} filas leídas, {inserted} nuevas"))
+        print(f"✅ Importación terminada: {result}")
+    finally:
+        close_all_connections() # También si el fichero no se puede leer
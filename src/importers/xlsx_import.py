@@ -0,0 +1,168 @@
+import argparse
+import logging
+import os
+import re
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from src.database import create_tables, get_all_categories, operation, mark_changed, close_all_connections
+from src.money import to_cents
+from src.importers.common import ImportedTransaction, content_hash, normalize_name, write_transactions, BATCH_SIZE
+
+# Hoja de cálculo que se incluye con el proyecto (en la raíz del repo)
+WORKBOOK_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'administracion_20dinero.xlsx'))
+
+# --- Estructura del libro ---
+# 'Flujo de Caja planeado': una fila de cabecera con una fecha por columna (un día por columna)
+# y debajo bloques separados por una fila vacía: una cabecera de sección en MAYÚSCULAS y sin
+# importes (INGRESOS, ALIMENTACIÓN...) seguida de partidas ('Mercado', 'Luz'...) con el
+# importe de cada día en su columna.
+# Los textos sueltos en las filas sin importes de una sección son notas del día ('mercadona').
+# 'ingresos & distribución': nombre de categoría en A y fórmula '=<porcentaje>*D18/100' en B.
+CASHFLOW_SHEET = 'Flujo de Caja planeado'
+DISTRIBUTION_SHEET = 'ingresos & distribución'
+INCOME_SECTIONS = {'INGRESOS'}
+LABEL_COLUMN = 1     # Columna B: nombre de la sección o partida
+FIRST_DAY_COLUMN = 2 # Columna C: primer día
+PERCENTAGE_FORMULA = re.compile(r'^=\s*(\d+(?:[.,]\d+)?)\s*\*')
+
+def _clean_label(value) -> str | None:
+    """Limpia una etiqueta ('OCIO_____' -> 'OCIO'); None si no contiene texto útil."""
+    if not isinstance(value, str):
+        return None
+    label = ' '.join(value.replace('_', ' ').split())
+    return label if any(ch.isalnum() for ch in label) else None
+
+def _is_amount(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value != 0
+
+def iter_distribution_categories(worksheet):
+    """Genera (nombre, porcentaje) de la hoja de distribución de ingresos (leída con fórmulas)."""
+    for row in worksheet.iter_rows(max_col=2, values_only=True):
+        name = _clean_label(row[0]) if row else None
+        formula = row[1] if len(row) > 1 else None
+        match = PERCENTAGE_FORMULA.match(formula) if isinstance(formula, str) else None
+        if name and match:
+            yield name, float(match.group(1).replace(',', '.'))
+
+def _section_transactions(section, items, notes, dates, category_id):
+    """Convierte las partidas acumuladas de una sección en filas de Transactions."""
+    transaction_type = 'Income' if section in INCOME_SECTIONS else 'Expense'
+    for item, occurrence, amounts in items:
+        for column, value in amounts:
+            date = dates[column] if column < len(dates) else None
+            if date is None:
+                continue
+            description = section if item == section else f"{section} · {item}"
+            if column in notes:
+                description += f" ({' / '.join(notes[column])})"
+            # La huella identifica la celda (sección, partida, día): reimportar no duplica
+            import_hash = content_hash('xlsx', CASHFLOW_SHEET, section, item, occurrence, date)
+            yield ImportedTransaction(transaction_type, description, to_cents(value), date, category_id, import_hash)
+
+def iter_cashflow_transactions(worksheet, category_ids: dict):
+    """Genera las transacciones de la hoja de flujo de caja (leída con valores, no fórmulas).
+
+    Se lee fila a fila; solo se acumulan en memoria las filas de la sección actual.
+    category_ids relaciona el nombre normalizado de una sección con el ID de su categoría.
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    dates = None
+    for row in rows:
+        if len(row) > FIRST_DAY_COLUMN and isinstance(row[FIRST_DAY_COLUMN], datetime):
+            dates = [value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else None
+                     for value in row[FIRST_DAY_COLUMN:]]
+            break
+    if dates is None:
+        logging.warning(f"No se encontró la fila de fechas en la hoja '{worksheet.title}'.")
+        return
+
+    section, items, notes, seen_labels = None, [], {}, {}
+    previous_label = None
+    for row in rows:
+        label = _clean_label(row[LABEL_COLUMN]) if len(row) > LABEL_COLUMN else None
+        after_separator, previous_label = previous_label is None, label
+        cells = row[FIRST_DAY_COLUMN:]
+        amounts = [(column, value) for column, value in enumerate(cells) if _is_amount(value)]
+
+        if label and after_separator and not amounts and label == label.upper():
+            # Nueva sección: se emite la anterior y se empieza a acumular esta
+            if section:
+                yield from _section_transactions(section, items, notes, dates, category_ids.get(normalize_name(section)))
+            section, items, notes, seen_labels = label, [], {}, {}
+        elif section is None:
+            continue # Filas de saldos y avisos anteriores a la primera sección
+        elif amounts:
+            item = label or section # Filas sin nombre: importes sueltos de la propia sección
+            occurrence = seen_labels[item] = seen_labels.get(item, -1) + 1
+            items.append((item, occurrence, amounts))
+            continue
+
+        for column, value in enumerate(cells):
+            note = _clean_label(value)
+            if note:
+                notes.setdefault(column, []).append(note)
+
+    if section:
+        yield from _section_transactions(section, items, notes, dates, category_ids.get(normalize_name(section)))
+
+def import_workbook(path: str = WORKBOOK_PATH, import_categories: bool = False, category_map: dict = None,
+                    batch_size: int = BATCH_SIZE, progress=None) -> dict:
+    """Importa el libro de Excel a la BD leyendo en modo streaming (openpyxl read-only).
+
+    - import_categories: crea también las categorías de la hoja de distribución (si no existen).
+    - category_map: {sección del libro: nombre de categoría} para asignar transacciones a
+      categorías; por defecto se usa la categoría con el mismo nombre que la sección, si existe.
+    - progress(procesadas, insertadas): se llama tras cada lote escrito.
+
+    Todo se escribe en una sola transacción: o se importa el libro entero o nada. Se puede
+    ejecutar varias veces: las celdas ya importadas se omiten (si se cambia el importe de una
+    celda ya importada, se conserva el valor anterior). Devuelve un resumen con los contadores.
+    """
+    summary = {'categories': 0, 'inserted': 0, 'skipped': 0}
+    with operation(f"Importación de '{os.path.basename(path)}'") as conn:
+        if import_categories:
+            # Los porcentajes solo están en las fórmulas: este libro se abre sin data_only
+            formulas_wb = load_workbook(path, read_only=True)
+            try:
+                categories = list(iter_distribution_categories(formulas_wb[DISTRIBUTION_SHEET]))
+            finally:
+                formulas_wb.close()
+            # rowcount no cuenta lo que escriben los triggers (p.ej. el diario de operaciones)
+            summary['categories'] = conn.executemany("INSERT OR IGNORE INTO Categories (name, percentage) VALUES (?, ?)",
+                                                     categories).rowcount
+            if summary['categories']:
+                mark_changed('Categories')
+
+        category_ids = {normalize_name(cat['name']): cat['id'] for cat in get_all_categories()}
+        for section, category_name in (category_map or {}).items():
+            category_ids[normalize_name(section)] = category_ids.get(normalize_name(category_name))
+
+        # Las fechas de la cabecera son fórmulas (=C4+1): hacen falta los valores calculados
+        values_wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = iter_cashflow_transactions(values_wb[CASHFLOW_SHEET], category_ids)
+            summary['inserted'], summary['skipped'] = write_transactions(rows, batch_size, progress)
+        finally:
+            values_wb.close()
+
+    logging.info(f"📥 Importación de '{os.path.basename(path)}': {summary['inserted']} transacciones nuevas, "
+                 f"{summary['skipped']} ya existentes, {summary['categories']} categorías nuevas.")
+    return summary
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.importers.xlsx_import [ruta.xlsx] [--categories]
+    parser = argparse.ArgumentParser(description="Importa el libro de Excel de administración del dinero.")
+    parser.add_argument('path', nargs='?', default=WORKBOOK_PATH, help="Ruta del .xlsx")
+    parser.add_argument('--categories', action='store_true', help="Crear también las categorías de la hoja de distribución")
+    args = parser.parse_args()
+
+    create_tables()
+    try:
+        result = import_workbook(args.path, import_categories=args.categories,
+                                 progress=lambda processed, inserted: print(f"  ... {processed} filas leídas, {inserted} nuevas"))
+        print(f"✅ Importación terminada: {result}")
+    finally:
+        close_all_connections() # También si el fichero no se puede leer
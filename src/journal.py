@@ -0,0 +1,229 @@
+import argparse
+import json
+import logging
+import sqlite3
+from collections import namedtuple
+
+from src.database import get_db_connection, transaction, mark_changed, create_tables, close_all_connections
+from src.migrations import JOURNALED_TABLES, row_json_sql
+
+# --- Diario de operaciones: deshacer y rehacer ---
+# Cada operación (database.operation) añade una fila a Journal y guarda solo lo necesario
+# para volver atrás:
+# - Transactions solo recibe filas nuevas, así que basta el rango de id que añadió. Deshacer
+#   mueve ese rango a UndoneTransactions con dos sentencias, sea cual sea su tamaño, y los
+#   triggers del libro devuelven balances, totales e índice de búsqueda a como estaban.
+#   Rehacer lo vuelve a insertar con los mismos id.
+# - De Categories y RecurringRules los triggers de la migración 11 guardan en JournalRows la
+#   fila de antes (y end_operation la de después) de cada fila que toca la operación.
+# Cada CHECKPOINT_INTERVAL operaciones se copian enteras esas tablas pequeñas: deshacer muchas
+# operaciones de golpe parte de la copia anterior y aplica hacia delante lo que queda, en vez
+# de recorrer hacia atrás todas las operaciones, si así hay menos filas que leer.
+
+CHECKPOINT_INTERVAL = 50 # Operaciones entre dos copias completas de las tablas pequeñas
+DEFAULT_HISTORY_LIMIT = 20
+
+_TRANSACTION_COLUMNS = ('id', 'type', 'description', 'amount_cents', 'date', 'category_id', 'import_hash',
+                        'balance_delta_cents')
+_UNIQUE_COLUMNS = {'Categories': 'name'}
+
+# transactions: cuántas filas de Transactions añadió la operación
+Operation = namedtuple('Operation', ['seq', 'label', 'created_at', 'transactions', 'undone'])
+
+def _last_transaction_id(conn: sqlite3.Connection) -> int:
+    """Último id asignado en Transactions (AUTOINCREMENT no reutiliza id, ni los de filas borradas)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Transactions'").fetchone()
+    return row[0] if row else 0
+
+def begin_operation(conn: sqlite3.Connection, label: str) -> int:
+    """Abre una operación en el diario (la llama database.operation). Devuelve su seq."""
+    seq = conn.execute("INSERT INTO Journal (label, first_transaction_id) VALUES (?, ?)",
+                       (label, _last_transaction_id(conn))).lastrowid
+    conn.execute("INSERT INTO JournalActive (seq) VALUES (?)", (seq,))
+    return seq
+
+def end_operation(conn: sqlite3.Connection, seq: int):
+    """Cierra la operación: guarda cómo quedaron sus filas y, si toca, una copia completa."""
+    conn.execute("DELETE FROM JournalActive")
+    for table, columns in JOURNALED_TABLES.items():
+        conn.execute(f"""
+            UPDATE JournalRows SET after = (SELECT {row_json_sql(columns, 't')} FROM {table} t WHERE t.id = JournalRows.row_id)
+            WHERE seq = ? AND table_name = ?
+        """, (seq, table))
+    conn.execute("DELETE FROM JournalRows WHERE seq = ? AND before IS after", (seq,)) # p.ej. guardar sin cambios
+    first = conn.execute("SELECT first_transaction_id FROM Journal WHERE seq = ?", (seq,)).fetchone()[0]
+    last = _last_transaction_id(conn)
+    if last == first and not conn.execute("SELECT 1 FROM JournalRows WHERE seq = ? LIMIT 1", (seq,)).fetchone():
+        conn.execute("DELETE FROM Journal WHERE seq = ?", (seq,)) # No cambió nada: no hay nada que deshacer
+        return
+    conn.execute("UPDATE Journal SET last_transaction_id = ? WHERE seq = ?", (last, seq))
+    # Tras una operación nueva, lo deshecho antes ya no se puede rehacer
+    conn.execute("UPDATE Journal SET undone = 2 WHERE undone = 1")
+    conn.execute("DELETE FROM UndoneTransactions")
+    _maybe_checkpoint(conn, seq)
+    mark_changed('Journal')
+
+def _maybe_checkpoint(conn: sqlite3.Connection, seq: int):
+    """Copia enteras las tablas del diario si van CHECKPOINT_INTERVAL operaciones desde la última copia."""
+    last_checkpoint = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM JournalCheckpoints").fetchone()[0]
+    pending = conn.execute("SELECT COUNT(*) FROM Journal WHERE undone = 0 AND seq > ?", (last_checkpoint,)).fetchone()[0]
+    if pending < CHECKPOINT_INTERVAL:
+        return
+    for table, columns in JOURNALED_TABLES.items():
+        conn.execute(f"""
+            INSERT OR REPLACE INTO JournalCheckpoints (seq, table_name, rows)
+            SELECT ?, ?, json_group_array({row_json_sql(columns, 't')}) FROM {table} t
+        """, (seq, table))
+
+def _rows_before(conn: sqlite3.Connection, oldest: int) -> dict:
+    """Cómo estaban las filas del diario antes de la operación 'oldest', si se deshacen todas desde ella.
+
+    Devuelve {(tabla, id): fila JSON o None si no existía}. Hacia atrás basta la fila de antes
+    de la primera operación que tocó cada una; desde la copia anterior hay que restaurar la
+    tabla entera y aplicar hacia delante las filas de después. Se elige lo que menos lee.
+    """
+    backward_rows = conn.execute("SELECT COUNT(*) FROM JournalRows WHERE seq >= ?", (oldest,)).fetchone()[0]
+    checkpoint = conn.execute("SELECT MAX(seq) FROM JournalCheckpoints WHERE seq < ?", (oldest,)).fetchone()[0]
+    if checkpoint is not None:
+        table_rows = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in JOURNALED_TABLES)
+        forward_rows = conn.execute("SELECT COUNT(*) FROM JournalRows WHERE seq > ? AND seq < ?",
+                                    (checkpoint, oldest)).fetchone()[0]
+        if table_rows + forward_rows < backward_rows:
+            images = {}
+            for table in JOURNALED_TABLES:
+                images.update(((table, row_id), None) for (row_id,) in conn.execute(f"SELECT id FROM {table}"))
+            for table, rows in conn.execute("SELECT table_name, rows FROM JournalCheckpoints WHERE seq = ?", (checkpoint,)):
+                images.update(((table, row['id']), json.dumps(row)) for row in json.loads(rows))
+            images.update(((table, row_id), after) for table, row_id, after in conn.execute("""
+                SELECT r.table_name, r.row_id, r.after FROM JournalRows r JOIN Journal j ON j.seq = r.seq
+                WHERE r.seq > ? AND r.seq < ? AND j.undone = 0 ORDER BY r.seq
+            """, (checkpoint, oldest)))
+            return images
+
+    images = {}
+    for table, row_id, before in conn.execute("""
+            SELECT r.table_name, r.row_id, r.before FROM JournalRows r JOIN Journal j ON j.seq = r.seq
+            WHERE r.seq >= ? AND j.undone = 0 ORDER BY r.seq DESC""", (oldest,)):
+        images[(table, row_id)] = before # La más antigua se queda
+    return images
+
+def _restore_rows(conn: sqlite3.Connection, images: dict):
+    """Deja cada fila {(tabla, id): fila JSON o None} como indica su imagen."""
+    for table, columns in JOURNALED_TABLES.items():
+        rows = {row_id: image for (image_table, row_id), image in images.items() if image_table == table}
+        if not rows:
+            continue
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id, image in rows.items() if image is None])
+        restored = [json.loads(image) for image in rows.values() if image is not None]
+        unique = _UNIQUE_COLUMNS.get(table)
+        if unique:
+            # Nombre provisional: dos filas que se intercambian el nombre chocarían a mitad de camino
+            conn.executemany(f"UPDATE {table} SET {unique} = char(0) || id WHERE id = ?", [(row['id'],) for row in restored])
+        conn.executemany(f"""
+            INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+            ON CONFLICT (id) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in columns[1:])}
+        """, [tuple(row[column] for column in columns) for row in restored])
+        if table == 'Categories':
+            # Una categoría que vuelve tras borrarse recupera el balance de sus transacciones
+            conn.executemany("""
+                UPDATE Categories SET balance_cents = (
+                    SELECT COALESCE(SUM(balance_delta_cents), 0) FROM Transactions WHERE category_id = Categories.id
+                ) WHERE id = ?
+            """, [(row['id'],) for row in restored])
+
+def undo(steps: int = 1) -> list[str]:
+    """Deshace las últimas 'steps' operaciones en UNA transacción. Devuelve sus etiquetas (la más reciente primero)."""
+    columns = ", ".join(_TRANSACTION_COLUMNS)
+    try:
+        with transaction() as conn:
+            operations = conn.execute("""
+                SELECT seq, label, first_transaction_id, last_transaction_id FROM Journal
+                WHERE undone = 0 ORDER BY seq DESC LIMIT ?
+            """, (steps,)).fetchall()
+            if not operations:
+                logging.info("No hay nada que deshacer.")
+                return []
+            oldest = operations[-1][0]
+            images = _rows_before(conn, oldest)
+            for seq, _, first, last in operations:
+                if last > first:
+                    conn.execute(f"INSERT INTO UndoneTransactions (seq, {columns}) "
+                                 f"SELECT ?, {columns} FROM Transactions WHERE id > ? AND id <= ?", (seq, first, last))
+                    conn.execute("DELETE FROM Transactions WHERE id > ? AND id <= ?", (first, last))
+            _restore_rows(conn, images)
+            conn.execute("UPDATE Journal SET undone = 1 WHERE undone = 0 AND seq >= ?", (oldest,))
+            # Las copias posteriores incluyen lo que se acaba de deshacer
+            conn.execute("DELETE FROM JournalCheckpoints WHERE seq >= ?", (oldest,))
+            mark_changed('Transactions', 'Categories', 'RecurringRules', 'Journal')
+        labels = [operation[1] for operation in operations]
+        logging.info(f"↩️ Deshecho: {', '.join(labels)}")
+        return labels
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al deshacer (no se deshizo nada): {e}")
+        return []
+
+def redo(steps: int = 1) -> list[str]:
+    """Rehace las 'steps' operaciones deshechas más antiguas en UNA transacción. Devuelve sus etiquetas."""
+    columns = ", ".join(_TRANSACTION_COLUMNS)
+    try:
+        with transaction() as conn:
+            operations = conn.execute("""
+                SELECT seq, label FROM Journal WHERE undone = 1 ORDER BY seq LIMIT ?
+            """, (steps,)).fetchall()
+            if not operations:
+                logging.info("No hay nada que rehacer.")
+                return []
+            oldest, newest = operations[0][0], operations[-1][0]
+            for seq, _ in operations:
+                conn.execute(f"INSERT INTO Transactions ({columns}) "
+                             f"SELECT {columns} FROM UndoneTransactions WHERE seq = ? ORDER BY id", (seq,))
+                conn.execute("DELETE FROM UndoneTransactions WHERE seq = ?", (seq,))
+            images = {}
+            for table, row_id, after in conn.execute("""
+                    SELECT r.table_name, r.row_id, r.after FROM JournalRows r JOIN Journal j ON j.seq = r.seq
+                    WHERE r.seq >= ? AND r.seq <= ? AND j.undone = 1 ORDER BY r.seq""", (oldest, newest)):
+                images[(table, row_id)] = after # La más reciente se queda
+            _restore_rows(conn, images)
+            conn.execute("UPDATE Journal SET undone = 0 WHERE undone = 1 AND seq <= ?", (newest,))
+            _maybe_checkpoint(conn, newest)
+            mark_changed('Transactions', 'Categories', 'RecurringRules', 'Journal')
+        labels = [operation[1] for operation in operations]
+        logging.info(f"↪️ Rehecho: {', '.join(labels)}")
+        return labels
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al rehacer (no se rehízo nada): {e}")
+        return []
+
+def get_history(limit: int = DEFAULT_HISTORY_LIMIT) -> list[Operation]:
+    """Últimas operaciones del diario, la más reciente primero."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("""
+            SELECT seq, label, created_at, last_transaction_id - first_transaction_id, undone
+            FROM Journal WHERE last_transaction_id IS NOT NULL ORDER BY seq DESC LIMIT ?
+        """, (limit,))
+        return [Operation(*row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al leer el diario de operaciones: {e}")
+        return []
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.journal [--undo N | --redo N] [--limit N]
+    parser = argparse.ArgumentParser(description="Diario de operaciones: historial, deshacer y rehacer.")
+    parser.add_argument('--undo', type=int, metavar='N', help="Deshacer las últimas N operaciones")
+    parser.add_argument('--redo', type=int, metavar='N', help="Rehacer N operaciones deshechas")
+    parser.add_argument('--limit', type=int, default=DEFAULT_HISTORY_LIMIT, help="Operaciones a listar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    create_tables()
+    if args.undo:
+        undo(args.undo)
+    elif args.redo:
+        redo(args.redo)
+    for operation in get_history(args.limit):
+        state = ("vigente", "deshecha", "descartada")[operation.undone]
+        print(f"  #{operation.seq} {operation.created_at} {operation.label} "
+              f"({operation.transactions} transacciones, {state})")
+    close_all_connections()
@@ -0,0 +1,491 @@
+import sqlite3
+import logging
+
+from src.money import to_cents
+
+def _rebuild_table(conn: sqlite3.Connection, table: str, create_sql: str, copy_sql: str):
+    """Recrea una tabla con otro esquema copiando sus filas (SQLite no permite cambiar el tipo de una columna).
+
+    create_sql crea '<table>_new' y copy_sql la rellena desde la tabla original.
+    Se conserva el contador AUTOINCREMENT para no reutilizar IDs ya borrados.
+    """
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    old_seq = row[0] if row else 0
+    conn.execute(create_sql)
+    conn.execute(copy_sql)
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (old_seq, table))
+
+def _migrate_money_to_cents(conn: sqlite3.Connection):
+    """Pasa Transactions.amount y Categories.current_balance de REAL (euros) a INTEGER (céntimos)."""
+    # Conversión con Decimal en Python en vez de ROUND(x * 100) para no arrastrar el error del float
+    conn.create_function("to_cents", 1, to_cents, deterministic=True)
+    _rebuild_table(conn, "Categories", '''
+        CREATE TABLE Categories_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            percentage REAL NOT NULL DEFAULT 0,
+            balance_cents INTEGER NOT NULL DEFAULT 0
+        )
+    ''', '''
+        INSERT INTO Categories_new (id, name, percentage, balance_cents)
+        SELECT id, name, percentage, to_cents(current_balance) FROM Categories
+    ''')
+    _rebuild_table(conn, "Transactions", '''
+        CREATE TABLE Transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL CHECK(type IN ('Income', 'Expense', 'Allocation')),
+            description TEXT,
+            amount_cents INTEGER NOT NULL,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            category_id INTEGER,
+            FOREIGN KEY (category_id) REFERENCES Categories (id)
+                ON DELETE SET NULL -- Si se borra categoría, la transacción queda sin categoría
+        )
+    ''', '''
+        INSERT INTO Transactions_new (id, type, description, amount_cents, date, category_id)
+        SELECT id, type, description, to_cents(amount), date, category_id FROM Transactions
+    ''')
+    # Los índices se borran con la tabla antigua
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON Transactions (category_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON Transactions (type, date)")
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, declaration: str):
+    """Añade una columna si no existe (ALTER TABLE ADD COLUMN no tiene IF NOT EXISTS)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _migrate_ledger_balances(conn: sqlite3.Connection):
+    """Hace que el balance de cada categoría se pueda recalcular a partir de Transactions.
+
+    Cada transacción guarda en balance_delta_cents cuánto cambió el balance de su categoría
+    (las asignaciones ESTABLECEN el balance, así que su delta es nuevo - anterior). Los deltas
+    del historial se reconstruyen reproduciéndolo en orden; si el balance guardado no cuadra
+    (p.ej. los reseteos a 0 de distribute_income no dejaban rastro) se añade un 'Adjustment'.
+    """
+    _rebuild_table(conn, "Transactions", '''
+        CREATE TABLE Transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL CHECK(type IN ('Income', 'Expense', 'Allocation', 'Adjustment')),
+            description TEXT,
+            amount_cents INTEGER NOT NULL,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            category_id INTEGER,
+            import_hash TEXT,
+            balance_delta_cents INTEGER NOT NULL DEFAULT 0, -- Efecto sobre Categories.balance_cents
+            FOREIGN KEY (category_id) REFERENCES Categories (id)
+                ON DELETE SET NULL -- Si se borra categoría, la transacción queda sin categoría
+        )
+    ''', '''
+        INSERT INTO Transactions_new (id, type, description, amount_cents, date, category_id, import_hash)
+        SELECT id, type, description, amount_cents, date, category_id, import_hash FROM Transactions
+    ''')
+    # Los índices se borran con la tabla antigua. El de categoría cubre ahora también el delta
+    # para reproducir el saldo de una categoría sin leer la tabla.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date_delta ON Transactions (category_id, date, balance_delta_cents)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type_date_amount ON Transactions (type, date, amount_cents)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON Transactions (date)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_import_hash ON Transactions (import_hash) WHERE import_hash IS NOT NULL")
+
+    # Reproducir el historial de la app (lo importado es historial y no toca balances)
+    running = {}
+    deltas = []
+    for transaction_id, transaction_type, amount_cents, category_id in conn.execute("""
+            SELECT id, type, amount_cents, category_id FROM Transactions
+            WHERE category_id IS NOT NULL AND import_hash IS NULL
+            ORDER BY date, id"""):
+        balance = running.get(category_id, 0)
+        if transaction_type == 'Allocation':
+            delta = amount_cents - balance
+        elif transaction_type == 'Expense':
+            delta = -amount_cents
+        else:
+            delta = 0
+        if delta:
+            running[category_id] = balance + delta
+            deltas.append((delta, transaction_id))
+    conn.executemany("UPDATE Transactions SET balance_delta_cents = ? WHERE id = ?", deltas)
+
+    adjustments = []
+    for category_id, balance_cents in conn.execute("SELECT id, balance_cents FROM Categories"):
+        difference = balance_cents - running.get(category_id, 0)
+        if difference:
+            adjustments.append(("Ajuste de apertura (saldo anterior al registro de movimientos)",
+                                difference, category_id, difference))
+    conn.executemany("""
+        INSERT INTO Transactions (type, description, amount_cents, category_id, balance_delta_cents)
+        VALUES ('Adjustment', ?, ?, ?, ?)
+    """, adjustments)
+
+# Tablas de totales (rollups) y longitud del prefijo de la fecha que forma su periodo
+ROLLUP_TABLES = {'DailyTotals': 10, 'MonthlyTotals': 7}
+
+def _rollup_upsert(table: str, length: int, row: str, sign: str) -> str:
+    """Suma (sign '+') o resta (sign '-') la transacción row (NEW/OLD) a su fila de totales."""
+    return f"""
+            INSERT INTO {table} (period, category_key, type, count, amount_cents, delta_cents)
+            VALUES (substr({row}.date, 1, {length}), IFNULL({row}.category_id, 0), {row}.type,
+                    {sign}1, {sign}{row}.amount_cents, {sign}{row}.balance_delta_cents)
+            ON CONFLICT (period, category_key, type) DO UPDATE SET
+                count = count + excluded.count,
+                amount_cents = amount_cents + excluded.amount_cents,
+                delta_cents = delta_cents + excluded.delta_cents;"""
+
+def _rollup_remove(table: str, length: int) -> str:
+    """Resta OLD de su fila de totales y borra la fila si se queda sin transacciones."""
+    return _rollup_upsert(table, length, 'OLD', '-') + f"""
+            DELETE FROM {table}
+            WHERE period = substr(OLD.date, 1, {length}) AND category_key = IFNULL(OLD.category_id, 0)
+              AND type = OLD.type AND count = 0;"""
+
+def _rollup_triggers() -> list[str]:
+    """Triggers que mantienen los rollups al día en la misma transacción que cada escritura."""
+    tables = ROLLUP_TABLES.items()
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert AFTER INSERT ON Transactions
+        WHEN NEW.date IS NOT NULL
+        BEGIN{''.join(_rollup_upsert(table, length, 'NEW', '+') for table, length in tables)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete AFTER DELETE ON Transactions
+        WHEN OLD.date IS NOT NULL
+        BEGIN{''.join(_rollup_remove(table, length) for table, length in tables)}
+        END
+        ''',
+        # Un UPDATE es quitar la fila vieja y poner la nueva (puede cambiar de periodo o categoría)
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update_old
+        AFTER UPDATE OF type, amount_cents, date, category_id, balance_delta_cents ON Transactions
+        WHEN OLD.date IS NOT NULL
+        BEGIN{''.join(_rollup_remove(table, length) for table, length in tables)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update_new
+        AFTER UPDATE OF type, amount_cents, date, category_id, balance_delta_cents ON Transactions
+        WHEN NEW.date IS NOT NULL
+        BEGIN{''.join(_rollup_upsert(table, length, 'NEW', '+') for table, length in tables)}
+        END
+        ''',
+    ]
+
+def rollup_source_sql(length: int) -> str:
+    """SELECT que calcula desde Transactions los totales con periodo de 'length' caracteres."""
+    return f"""
+        SELECT substr(date, 1, {length}) AS period, IFNULL(category_id, 0) AS category_key, type,
+               COUNT(*), SUM(amount_cents), SUM(balance_delta_cents)
+        FROM Transactions WHERE date IS NOT NULL
+        GROUP BY period, category_key, type
+    """
+
+def populate_rollups(conn: sqlite3.Connection):
+    """Rellena de cero los rollups a partir de Transactions (migración y src/rollups.py --rebuild)."""
+    for table, length in ROLLUP_TABLES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} (period, category_key, type, count, amount_cents, delta_cents) "
+                     f"{rollup_source_sql(length)}")
+
+def _create_search_index(conn: sqlite3.Connection):
+    """Índice FTS5 de Transactions.description (external content: el texto no se duplica).
+
+    Si SQLite se compiló sin FTS5 no se crea y src/history.py busca con LIKE.
+    """
+    try:
+        # remove_diacritics: 'nomina' encuentra 'Nómina'; prefix: índices para prefijos de 2 y 3 letras
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS TransactionsFTS USING fts5(
+                description, content='Transactions', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 1', prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logging.warning(f"⚠️ SQLite sin FTS5 ({e}): la búsqueda de transacciones usará LIKE.")
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert AFTER INSERT ON Transactions
+        BEGIN
+            INSERT INTO TransactionsFTS (rowid, description) VALUES (NEW.id, NEW.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete AFTER DELETE ON Transactions
+        BEGIN
+            INSERT INTO TransactionsFTS (TransactionsFTS, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update AFTER UPDATE OF description ON Transactions
+        BEGIN
+            INSERT INTO TransactionsFTS (TransactionsFTS, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+            INSERT INTO TransactionsFTS (rowid, description) VALUES (NEW.id, NEW.description);
+        END
+    """)
+    conn.execute("INSERT INTO TransactionsFTS (TransactionsFTS) VALUES ('rebuild')")
+
+# Tablas cuyas filas guarda el diario de operaciones (src/journal.py) y columnas de esa copia.
+# Categories.balance_cents no se guarda: es una caché del libro y se recalcula al restaurar.
+JOURNALED_TABLES = {
+    'Categories': ('id', 'name', 'percentage'),
+    'RecurringRules': ('id', 'type', 'description', 'amount_cents', 'category_id', 'frequency', 'interval',
+                       'start_date', 'end_date', 'next_due', 'auto_distribute'),
+}
+
+def row_json_sql(columns: tuple[str, ...], row: str) -> str:
+    """Expresión SQL con la fila 'row' (NEW, OLD o un alias) como objeto JSON."""
+    pairs = ", ".join(f"'{column}', {row}.{column}" for column in columns)
+    return f"json_object({pairs})"
+
+def _journal_triggers() -> list[str]:
+    """Triggers que, con una operación abierta (fila en JournalActive), guardan cada fila tocada.
+
+    Solo se guarda la copia de antes del PRIMER cambio de cada fila en la operación (INSERT
+    OR IGNORE); la de después la añade src/journal.py al cerrar la operación.
+    """
+    triggers = []
+    for table, columns in JOURNALED_TABLES.items():
+        for event, row, image in (('INSERT', 'NEW', 'NULL'),
+                                  (f"UPDATE OF {', '.join(columns[1:])}", 'OLD', row_json_sql(columns, 'OLD')),
+                                  ('DELETE', 'OLD', row_json_sql(columns, 'OLD'))):
+            triggers.append(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_journal_{event.split()[0].lower()} AFTER {event} ON {table}
+        WHEN EXISTS (SELECT 1 FROM JournalActive)
+        BEGIN
+            INSERT OR IGNORE INTO JournalRows (seq, table_name, row_id, before)
+            SELECT seq, '{table}', {row}.id, {image} FROM JournalActive;
+        END
+        ''')
+    return triggers
+
+# --- Migraciones del esquema ---
+# La versión del esquema se guarda en PRAGMA user_version (0 = BD creada antes de este sistema).
+# Cada migración es (versión, descripción, pasos) y se aplica una sola vez, en orden.
+# Un paso es una sentencia SQL o una función que recibe la conexión (para migraciones con lógica).
+# Los pasos deben ser idempotentes: una BD antigua ya puede tener las tablas de la versión 1.
+
+MIGRATIONS = [
+    (1, "Tablas base Categories y Transactions", [
+        '''
+        CREATE TABLE IF NOT EXISTS Categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            percentage REAL NOT NULL DEFAULT 0,
+            current_balance REAL NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL CHECK(type IN ('Income', 'Expense', 'Allocation')),
+            description TEXT,
+            amount REAL NOT NULL,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            category_id INTEGER,
+            FOREIGN KEY (category_id) REFERENCES Categories (id)
+                ON DELETE SET NULL -- Si se borra categoría, la transacción queda sin categoría
+        )
+        ''',
+    ]),
+    (2, "Índices de Transactions por categoría/fecha y tipo/fecha", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON Transactions (category_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON Transactions (type, date)",
+    ]),
+    (3, "Importes en céntimos (INTEGER) en vez de euros (REAL)", [
+        _migrate_money_to_cents,
+    ]),
+    (4, "Índice de Transactions por tipo/fecha que cubre amount_cents (sumas sin leer la tabla)", [
+        "DROP INDEX IF EXISTS idx_transactions_type_date",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date_amount ON Transactions (type, date, amount_cents)",
+    ]),
+    (5, "Índice de Transactions por fecha para paginar el historial por (date, id)", [
+        # El rowid (id) va implícito al final del índice, así que ordena por (date, id)
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON Transactions (date)",
+    ]),
+    (6, "Huella de importación en Transactions para no duplicar filas al reimportar", [
+        lambda conn: _add_column(conn, "Transactions", "import_hash", "TEXT"),
+        # Solo las filas importadas tienen huella; las creadas desde la app la dejan a NULL
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_import_hash ON Transactions (import_hash) WHERE import_hash IS NOT NULL",
+    ]),
+    (7, "Balances derivados del libro de transacciones, con snapshots mensuales", [
+        _migrate_ledger_balances,
+        '''
+        CREATE TABLE IF NOT EXISTS BalanceSnapshots (
+            category_id INTEGER NOT NULL,
+            as_of TEXT NOT NULL,           -- Saldo con todas las transacciones de fecha < as_of
+            balance_cents INTEGER NOT NULL,
+            PRIMARY KEY (category_id, as_of)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_balance_snapshots_as_of ON BalanceSnapshots (as_of)",
+        # Categories.balance_cents es una caché del libro: la mantienen los triggers, y un
+        # cambio con fecha anterior a un snapshot invalida ese snapshot y los posteriores
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_insert AFTER INSERT ON Transactions
+        WHEN NEW.category_id IS NOT NULL AND NEW.balance_delta_cents != 0
+        BEGIN
+            UPDATE Categories SET balance_cents = balance_cents + NEW.balance_delta_cents WHERE id = NEW.category_id;
+            DELETE FROM BalanceSnapshots WHERE as_of > NEW.date;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_delete AFTER DELETE ON Transactions
+        WHEN OLD.category_id IS NOT NULL AND OLD.balance_delta_cents != 0
+        BEGIN
+            UPDATE Categories SET balance_cents = balance_cents - OLD.balance_delta_cents WHERE id = OLD.category_id;
+            DELETE FROM BalanceSnapshots WHERE as_of > OLD.date;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_update
+        AFTER UPDATE OF category_id, balance_delta_cents, date ON Transactions
+        BEGIN
+            UPDATE Categories SET balance_cents = balance_cents - OLD.balance_delta_cents WHERE id = OLD.category_id;
+            UPDATE Categories SET balance_cents = balance_cents + NEW.balance_delta_cents WHERE id = NEW.category_id;
+            DELETE FROM BalanceSnapshots WHERE as_of > MIN(OLD.date, NEW.date);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_categories_delete_snapshots AFTER DELETE ON Categories
+        BEGIN
+            DELETE FROM BalanceSnapshots WHERE category_id = OLD.id;
+        END
+        ''',
+    ]),
+    (8, "Reglas de transacciones recurrentes con índice por próxima fecha", [
+        '''
+        CREATE TABLE IF NOT EXISTS RecurringRules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL CHECK(type IN ('Income', 'Expense')),
+            description TEXT,
+            amount_cents INTEGER NOT NULL CHECK(amount_cents > 0),
+            category_id INTEGER,
+            frequency TEXT NOT NULL CHECK(frequency IN ('daily', 'weekly', 'monthly', 'yearly')),
+            interval INTEGER NOT NULL DEFAULT 1 CHECK(interval > 0), -- Cada cuántos días/semanas/meses/años
+            start_date TEXT NOT NULL,      -- Primera ocurrencia; su día del mes se respeta (31 -> último día)
+            end_date TEXT,                 -- Última fecha posible (NULL = sin fin)
+            next_due TEXT,                 -- Próxima ocurrencia sin registrar (NULL = terminada o en pausa)
+            auto_distribute INTEGER NOT NULL DEFAULT 0, -- Ingresos: repartirlos entre las categorías
+            FOREIGN KEY (category_id) REFERENCES Categories (id)
+                ON DELETE SET NULL
+        )
+        ''',
+        # Solo las reglas pendientes entran en el índice: buscar las vencidas cuesta O(vencidas)
+        "CREATE INDEX IF NOT EXISTS idx_recurring_rules_next_due ON RecurringRules (next_due) WHERE next_due IS NOT NULL",
+    ]),
+    (9, "Totales por día y por mes de cada categoría y tipo, mantenidos por triggers", [
+        *(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            period TEXT NOT NULL,          -- {'YYYY-MM-DD' if length == 10 else 'YYYY-MM'}
+            category_key INTEGER NOT NULL, -- category_id, o 0 si la transacción no tiene categoría
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            delta_cents INTEGER NOT NULL,  -- Suma de balance_delta_cents
+            PRIMARY KEY (period, category_key, type)
+        ) WITHOUT ROWID
+        ''' for table, length in ROLLUP_TABLES.items()),
+        *_rollup_triggers(),
+        populate_rollups,
+    ]),
+    (10, "Índice de texto completo (FTS5) de las descripciones de Transactions", [
+        _create_search_index,
+    ]),
+    (11, "Diario de operaciones para deshacer/rehacer, con copias periódicas de las tablas pequeñas", [
+        '''
+        CREATE TABLE IF NOT EXISTS Journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            first_transaction_id INTEGER NOT NULL, -- La operación añadió las Transactions con id en
+            last_transaction_id INTEGER,           -- (first, last]; last es NULL mientras está abierta
+            undone INTEGER NOT NULL DEFAULT 0      -- 1 = deshecha; 2 = deshecha y ya no se puede rehacer
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_journal_undone_seq ON Journal (undone, seq)",
+        '''
+        CREATE TABLE IF NOT EXISTS JournalRows (
+            seq INTEGER NOT NULL,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            before TEXT,                   -- Fila (JSON) antes de la operación; NULL = no existía
+            after TEXT,                    -- Fila (JSON) al terminarla; NULL = se borró
+            PRIMARY KEY (seq, table_name, row_id)
+        ) WITHOUT ROWID
+        ''',
+        # Una fila mientras hay una operación abierta: activa los triggers del diario
+        "CREATE TABLE IF NOT EXISTS JournalActive (seq INTEGER NOT NULL)",
+        '''
+        CREATE TABLE IF NOT EXISTS JournalCheckpoints (
+            seq INTEGER NOT NULL,          -- Estado tras la operación seq (y las anteriores no deshechas)
+            table_name TEXT NOT NULL,
+            rows TEXT NOT NULL,            -- Array JSON con todas las filas de la tabla
+            PRIMARY KEY (seq, table_name)
+        ) WITHOUT ROWID
+        ''',
+        # Transacciones de las operaciones deshechas, por si se rehacen (mismas columnas e id)
+        '''
+        CREATE TABLE IF NOT EXISTS UndoneTransactions (
+            id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT,
+            amount_cents INTEGER NOT NULL,
+            date TIMESTAMP,
+            category_id INTEGER,
+            import_hash TEXT,
+            balance_delta_cents INTEGER NOT NULL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_undone_transactions_seq ON UndoneTransactions (seq)",
+        *_journal_triggers(),
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Devuelve la versión del esquema guardada en la BD."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Aplica en orden las migraciones pendientes y devuelve cuántas se aplicaron.
+
+    Cada migración va en su propia transacción junto con el cambio de user_version,
+    así que un fallo deja la BD en la última versión completa. La conexión debe estar
+    en modo autocommit (como las de database.get_db_connection) y fuera de una transacción.
+    """
+    current_version = get_schema_version(conn)
+    if current_version >= SCHEMA_VERSION:
+        return 0 # Esquema al día: una sola lectura de PRAGMA
+
+    applied = 0
+    for version, description, steps in MIGRATIONS:
+        if version <= current_version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo migrar mientras esperábamos el bloqueo
+            if get_schema_version(conn) >= version:
+                conn.execute("ROLLBACK")
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except BaseException:
+            # Si SQLite ya deshizo la transacción, un ROLLBACK taparía el error original
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error as e:
+                    logging.error(f"❌ No se pudo deshacer la migración {version}: {e}")
+            raise
+        applied += 1
+        logging.info(f"🛠️ Migración {version} aplicada: {description}")
+    return applied
@@ -0,0 +1,16 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+# --- Importes en céntimos ---
+# En la BD el dinero se guarda como INTEGER en céntimos (1234 = 12,34 €): las sumas son
+# exactas y más rápidas que con REAL. La UI sigue trabajando con euros (float).
+
+def to_cents(amount) -> int:
+    """Convierte un importe en euros (float, str o Decimal) a céntimos, redondeando a la mitad hacia arriba."""
+    if isinstance(amount, int):
+        return amount * 100
+    # str() evita arrastrar el error binario del float (1.005 -> '1.005' -> 101 céntimos)
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+def from_cents(cents: int) -> float:
+    """Convierte céntimos a euros para mostrarlos en la UI."""
+    return cents / 100
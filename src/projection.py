@@ -0,0 +1,175 @@
+import argparse
+import logging
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.database import get_db_connection, get_all_categories, create_tables, close_all_connections
+from src.distribution import allocate
+from src.money import to_cents, from_cents
+
+# --- Proyección "¿y si...?" de los balances por categoría ---
+# Monte Carlo vectorizado: se simulan a la vez miles de futuros posibles. Cada mes cada
+# categoría recibe su parte del ingreso (calculada con el mismo motor que el reparto real,
+# src/distribution.py) y gasta lo que gastó en un mes de su historial elegido al azar
+# (bootstrap). El mes se sortea entero para todas las categorías a la vez, así se conserva
+# la relación entre ellas (un mes caro en Casa suele serlo también en Comida, o no).
+# El resultado son bandas de percentiles del balance de cada categoría mes a mes.
+
+DEFAULT_PATHS = 10000
+DEFAULT_MONTHS = 12
+DEFAULT_HISTORY_MONTHS = 24
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# spending_cents[mes, categoría] de los meses del historial, en el orden de category_ids
+SpendingHistory = namedtuple('SpendingHistory', ['category_ids', 'months', 'spending_cents'])
+
+# bands_cents[percentil, mes, categoría] (mes 0 = hoy) y negative_probability[mes, categoría]
+Projection = namedtuple('Projection', ['category_ids', 'percentiles', 'bands_cents', 'negative_probability'])
+
+def _month_index(month: str) -> int:
+    """'2025-03' -> nº de mes absoluto (para recorrer meses seguidos)."""
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+def load_spending_history(months: int = DEFAULT_HISTORY_MONTHS, now: str = None) -> SpendingHistory:
+    """Gasto ('Expense') por categoría y mes de los últimos 'months' meses cerrados.
+
+    Los meses sin gastos cuentan como meses a 0 (también forman parte de la historia), pero
+    solo desde el primer mes con algún gasto. El mes en curso ('now', 'YYYY-MM-DD ...'; por
+    defecto hoy en UTC, como materialize_due) no se usa: aún no ha terminado.
+    """
+    now = now or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')  # CURRENT_TIMESTAMP de SQLite también es UTC
+    current = _month_index(now)
+    first = current - months
+    month_from = f"{first // 12:04d}-{first % 12 + 1:02d}"
+    month_to = f"{current // 12:04d}-{current % 12 + 1:02d}"
+    try:
+        # Totales mensuales ya agregados (src/rollups.py): unas pocas filas por mes
+        rows = get_db_connection().execute("""
+            SELECT period, category_key, amount_cents FROM MonthlyTotals
+            WHERE type = 'Expense' AND category_key != 0 AND period >= ? AND period < ?
+        """, (month_from, month_to)).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al leer el historial de gastos: {e}")
+        rows = []
+    if not rows:
+        return SpendingHistory([], [], np.zeros((0, 0), dtype=np.int64))
+
+    category_ids = sorted({row[1] for row in rows})
+    columns = {category_id: i for i, category_id in enumerate(category_ids)}
+    start = min(_month_index(row[0]) for row in rows)
+    month_labels = [f"{m // 12:04d}-{m % 12 + 1:02d}" for m in range(start, current)]
+    spending = np.zeros((current - start, len(category_ids)), dtype=np.int64)
+    for month, category_id, cents in rows:
+        spending[_month_index(month) - start, columns[category_id]] = cents
+    return SpendingHistory(category_ids, month_labels, spending)
+
+def simulate(shares_cents, start_cents, spending_cents, months: int = DEFAULT_MONTHS, paths: int = DEFAULT_PATHS,
+             percentiles=DEFAULT_PERCENTILES, carry_over: bool = True, seed: int = None) -> tuple[np.ndarray, np.ndarray]:
+    """Núcleo de la proyección, solo NumPy. Devuelve (bandas, probabilidad de saldo negativo).
+
+    - shares_cents[c]: parte mensual del ingreso para cada categoría
+    - start_cents[c]: balance actual de cada categoría
+    - spending_cents[h, c]: gasto de cada categoría en cada mes del historial (columnas en el
+      mismo orden; sin historial, el gasto es 0)
+    - carry_over: True -> el saldo se acumula (balance + parte - gasto); False -> cada reparto
+      ESTABLECE el balance a la parte, como hace distribute_incomes (parte - gasto del mes)
+
+    bandas[p, m, c] es el percentil p del balance de la categoría c al final del mes m
+    (m = 0 es hoy) y la probabilidad [m, c] la fracción de futuros con balance < 0.
+    """
+    shares = np.asarray(shares_cents, dtype=np.int64)[:, None]
+    if not len(shares):
+        return np.zeros((len(percentiles), months + 1, 0)), np.zeros((months + 1, 0))
+    # Una fila por categoría y una columna por futuro: ordenar filas contiguas es lo más rápido
+    balances = np.repeat(np.asarray(start_cents, dtype=np.int64)[:, None], paths, axis=1)
+    spending = np.asarray(spending_cents, dtype=np.int64).reshape(-1, len(shares)).T
+    rng = np.random.default_rng(seed)
+    # Mes del historial que toca a cada futuro en cada mes: se sortean todos de una vez
+    draws = rng.integers(0, spending.shape[1], size=(months, paths)) if spending.shape[1] else None
+
+    # Percentiles con interpolación lineal (como np.percentile) sobre cada fila ya ordenada
+    positions = np.asarray(percentiles, dtype=np.float64) / 100 * (paths - 1)
+    low = np.floor(positions).astype(np.int64)
+    high = np.minimum(low + 1, paths - 1)
+    weight = positions - low
+
+    # Solo se guarda el mes en curso; de cada mes se quedan sus percentiles
+    bands = np.empty((len(positions), months + 1, len(shares)))
+    negative_probability = np.empty((months + 1, len(shares)))
+    for month in range(months + 1):
+        if month:
+            month_spending = spending[:, draws[month - 1]] if draws is not None else 0
+            if carry_over:
+                balances += shares
+                balances -= month_spending
+            else:
+                balances = shares - month_spending
+        ordered = np.sort(balances, axis=1)
+        bands[:, month] = (ordered[:, low] * (1 - weight) + ordered[:, high] * weight).T
+        negative_probability[month] = np.count_nonzero(ordered < 0, axis=1) / paths
+    return bands, negative_probability
+
+def project_balances(monthly_income: float, categories: list[dict] = None, months: int = DEFAULT_MONTHS,
+                     paths: int = DEFAULT_PATHS, percentiles=DEFAULT_PERCENTILES, history: SpendingHistory = None,
+                     carry_over: bool = True, seed: int = None, now: str = None) -> Projection:
+    """Proyecta los balances de las categorías con un ingreso mensual y sus porcentajes.
+
+    categories tiene el formato de get_all_categories ('id', 'percentage', 'balance_cents');
+    se pueden pasar porcentajes cambiados sin guardarlos para ver su efecto. El historial de
+    gastos se lee de la BD si no se pasa: para probar muchos porcentajes seguidos, cárgalo
+    una vez con load_spending_history() y pásalo en cada llamada. 'now' es la fecha de
+    referencia con la que se lee ese historial.
+    """
+    categories = categories if categories is not None else get_all_categories()
+    history = history if history is not None else load_spending_history(now=now)
+    category_ids = [category['id'] for category in categories]
+
+    shares = allocate(to_cents(monthly_income), [category['percentage'] for category in categories])
+    start = [category.get('balance_cents', 0) for category in categories]
+    # Columnas del historial en el orden de las categorías (sin historial -> gasto 0)
+    spending = np.zeros((len(history.months), len(categories)), dtype=np.int64)
+    columns = {category_id: i for i, category_id in enumerate(history.category_ids)}
+    for i, category_id in enumerate(category_ids):
+        if category_id in columns:
+            spending[:, i] = history.spending_cents[:, columns[category_id]]
+
+    bands, negative_probability = simulate(shares, start, spending, months, paths, percentiles, carry_over, seed)
+    return Projection(category_ids, tuple(percentiles), bands, negative_probability)
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.projection 2000 --months 24 --set 41=25 --set 43=30
+    parser = argparse.ArgumentParser(description="Proyección Monte Carlo de los balances por categoría.")
+    parser.add_argument('income', type=float, help="Ingreso mensual en euros")
+    parser.add_argument('--months', type=int, default=DEFAULT_MONTHS)
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS)
+    parser.add_argument('--history', type=int, default=DEFAULT_HISTORY_MONTHS, help="Meses de historial de gastos")
+    parser.add_argument('--set', action='append', default=[], metavar='ID=PCT',
+                        help="Probar otro porcentaje para una categoría (repetible)")
+    parser.add_argument('--reset', action='store_true', help="Cada reparto establece el balance (sin acumular)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--now', help="Fecha de referencia 'YYYY-MM-DD' (por defecto hoy, UTC)")
+    args = parser.parse_args()
+
+    create_tables()
+    categories = get_all_categories()
+    overrides = dict(item.split('=') for item in args.set)
+    for category in categories:
+        if str(category['id']) in overrides:
+            category['percentage'] = float(overrides[str(category['id'])])
+
+    started = time.perf_counter()
+    projection = project_balances(args.income, categories, args.months, args.paths,
+                                  history=load_spending_history(args.history, args.now),
+                                  carry_over=not args.reset, seed=args.seed)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Proyección a {args.months} meses ({args.paths} futuros, {elapsed_ms:.0f} ms):")
+    for i, category in enumerate(categories):
+        band = ' / '.join(f"{from_cents(projection.bands_cents[p, -1, i]):.2f}" for p in range(len(projection.percentiles)))
+        print(f"  {category['name']} ({category['percentage']}%): P{'/P'.join(map(str, projection.percentiles))} = {band} € "
+              f"· saldo negativo en el {100 * projection.negative_probability[-1, i]:.0f}% de los futuros")
+    close_all_connections()
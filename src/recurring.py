@@ -0,0 +1,197 @@
+import argparse
+import calendar
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from src.database import (get_db_connection, operation, mark_changed, insert_transactions, create_tables,
+                          close_all_connections)
+from src.money import to_cents, from_cents
+
+# --- Transacciones recurrentes ---
+# Cada regla de RecurringRules genera un ingreso o un gasto cada N días, semanas, meses o
+# años. next_due guarda la próxima ocurrencia sin registrar y está indexada (solo las reglas
+# pendientes), así que buscar lo vencido cuesta O(reglas vencidas), no O(todas las reglas).
+# materialize_due() registra TODO lo vencido desde la última vez (p.ej. tras meses sin abrir
+# la app) en una sola transacción y con inserciones por lotes.
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+MAX_OCCURRENCES_PER_RULE = 10000 # Tope de seguridad por regla en una sola puesta al día
+
+_TRANSACTION_COLUMNS = ('type', 'description', 'amount_cents', 'date', 'category_id', 'balance_delta_cents')
+
+def _parse_date(date: str) -> datetime:
+    """'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS' -> datetime."""
+    return datetime.strptime(date, DATE_FORMAT) if len(date) > 10 else datetime.strptime(date, '%Y-%m-%d')
+
+def next_occurrence(date: datetime, frequency: str, interval: int, anchor_day: int) -> datetime:
+    """Ocurrencia siguiente a 'date'. Meses y años respetan el día del mes de la primera (anchor_day)."""
+    if frequency == 'daily':
+        return date + timedelta(days=interval)
+    if frequency == 'weekly':
+        return date + timedelta(weeks=interval)
+    months = interval * (12 if frequency == 'yearly' else 1)
+    month_index = date.year * 12 + date.month - 1 + months
+    year, month = month_index // 12, month_index % 12 + 1
+    # Un día 31 cae el último día de los meses más cortos (y un 29 de febrero, el 28)
+    return date.replace(year=year, month=month, day=min(anchor_day, calendar.monthrange(year, month)[1]))
+
+def add_recurring_rule(type: str, description: str, amount: float, frequency: str, start_date: str,
+                       category_id: int = None, interval: int = 1, end_date: str = None,
+                       auto_distribute: bool = False) -> int | None:
+    """Crea una regla recurrente (amount en euros). Devuelve su ID, o None si no se pudo crear."""
+    if frequency not in FREQUENCIES:
+        logging.error(f"❌ Frecuencia desconocida: '{frequency}'. Usa una de {FREQUENCIES}.")
+        return None
+    start = _parse_date(start_date).strftime(DATE_FORMAT)
+    try:
+        with operation(f"Crear regla recurrente '{description}'") as conn:
+            cursor = conn.execute("""
+                INSERT INTO RecurringRules (type, description, amount_cents, category_id, frequency, interval,
+                                            start_date, end_date, next_due, auto_distribute)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (type, description, to_cents(amount), category_id, frequency, interval, start, end_date, start,
+                  int(auto_distribute)))
+            mark_changed('RecurringRules')
+        logging.info(f"🔁 Regla recurrente '{description}' creada ({type} de {amount}, {frequency} cada {interval}).")
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al crear la regla recurrente '{description}': {e}")
+        return None
+
+def delete_recurring_rule(rule_id: int) -> bool:
+    """Borra una regla (las transacciones que ya generó se quedan en el libro)."""
+    try:
+        with operation(f"Borrar regla recurrente ID {rule_id}") as conn:
+            cursor = conn.execute("DELETE FROM RecurringRules WHERE id = ?", (rule_id,))
+            mark_changed('RecurringRules')
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al borrar la regla recurrente ID {rule_id}: {e}")
+        return False
+
+def get_recurring_rules() -> list[dict]:
+    """Todas las reglas, las pendientes primero por próxima fecha."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("""
+            SELECT id, type, description, amount_cents, category_id, frequency, interval, start_date,
+                   end_date, next_due, auto_distribute
+            FROM RecurringRules ORDER BY next_due IS NULL, next_due, id
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al obtener las reglas recurrentes: {e}")
+        return []
+
+def _due_occurrences(rule, now: str) -> tuple[list[str], str | None]:
+    """Fechas vencidas (<= now) de la regla desde su next_due y la nueva next_due (None si terminó)."""
+    anchor_day = _parse_date(rule['start_date']).day
+    end = rule['end_date'] and _parse_date(rule['end_date']).strftime(DATE_FORMAT)
+    due = []
+    date = _parse_date(rule['next_due'])
+    current = rule['next_due']
+    while current <= now and len(due) < MAX_OCCURRENCES_PER_RULE:
+        if end and current > end:
+            return due, None
+        due.append(current)
+        date = next_occurrence(date, rule['frequency'], rule['interval'], anchor_day)
+        current = date.strftime(DATE_FORMAT)
+    if len(due) == MAX_OCCURRENCES_PER_RULE:
+        logging.warning(f"⚠️ La regla ID {rule['id']} tenía más de {MAX_OCCURRENCES_PER_RULE} ocurrencias vencidas; "
+                        f"el resto se registrará en la siguiente puesta al día.")
+    return due, None if end and current > end else current
+
+def materialize_due(now: str = None) -> int:
+    """Registra todas las ocurrencias vencidas hasta 'now' (por defecto, ahora en UTC) en UNA transacción.
+
+    Los gastos con categoría restan de su balance como add_transaction. Los ingresos con
+    auto_distribute se registran y además se reparten con src/distribution.py. Todo se aplica
+    en orden de fecha: un reparto ESTABLECE los balances, así que importa qué gastos van antes.
+    Devuelve cuántas ocurrencias se registraron.
+    """
+    now = now or datetime.now(timezone.utc).strftime(DATE_FORMAT) # CURRENT_TIMESTAMP de SQLite también es UTC
+    try:
+        # Lo normal es que no venza nada: se comprueba con una lectura (índice de next_due) sin
+        # abrir una transacción de escritura ni anotar una operación vacía en el diario
+        if not get_db_connection().execute(
+                "SELECT 1 FROM RecurringRules WHERE next_due IS NOT NULL AND next_due <= ? LIMIT 1", (now,)).fetchone():
+            return 0
+        with operation("Transacciones recurrentes vencidas") as conn:
+            rules = conn.execute("""
+                SELECT id, type, description, amount_cents, category_id, frequency, interval, start_date,
+                       end_date, next_due, auto_distribute
+                FROM RecurringRules WHERE next_due IS NOT NULL AND next_due <= ?
+            """, (now,)).fetchall()
+
+            occurrences = [] # (fecha, id de regla, fila de Transactions, repartir)
+            next_due_updates = []
+            for rule in rules:
+                dates, next_due = _due_occurrences(rule, now)
+                delta = -rule['amount_cents'] if rule['type'] == 'Expense' and rule['category_id'] is not None else 0
+                for date in dates:
+                    row = (rule['type'], rule['description'], rule['amount_cents'], date, rule['category_id'], delta)
+                    occurrences.append((date, rule['id'], row, rule['type'] == 'Income' and rule['auto_distribute']))
+                next_due_updates.append((next_due, rule['id']))
+            occurrences.sort(key=lambda occurrence: occurrence[:2])
+
+            # Tramos seguidos de filas normales van en un solo insert_transactions; los repartos, en lote
+            # con distribute_incomes (que usa un SAVEPOINT dentro de esta transacción)
+            pending_rows, pending_incomes = [], []
+            def flush():
+                if pending_rows:
+                    insert_transactions(conn, _TRANSACTION_COLUMNS, pending_rows)
+                    pending_rows.clear()
+                if pending_incomes:
+                    from src.distribution import distribute_incomes # numpy solo si hay repartos
+                    if distribute_incomes([from_cents(cents) for cents, _ in pending_incomes],
+                                          [date for _, date in pending_incomes]) is None:
+                        logging.warning("⚠️ No se pudieron repartir los ingresos recurrentes (quedan registrados).")
+                    pending_incomes.clear()
+            for date, rule_id, row, distribute in occurrences:
+                if distribute:
+                    pending_rows.append(row) # El ingreso también queda en el libro
+                    pending_incomes.append((row[2], date))
+                else:
+                    if pending_incomes:
+                        flush()
+                    pending_rows.append(row)
+            flush()
+
+            conn.executemany("UPDATE RecurringRules SET next_due = ? WHERE id = ?", next_due_updates)
+            mark_changed('Transactions', 'Categories', 'RecurringRules')
+        logging.info(f"🔁 {len(occurrences)} ocurrencias recurrentes registradas ({len(rules)} reglas vencidas).")
+        return len(occurrences)
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al registrar las transacciones recurrentes (no se aplicó ninguna): {e}")
+        return 0
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.recurring                 -> registra lo vencido
+    #      python -m src.recurring --list
+    #      python -m src.recurring --add Expense "Alquiler" 750 monthly 2025-01-01 --category 3
+    parser = argparse.ArgumentParser(description="Transacciones recurrentes.")
+    parser.add_argument('--list', action='store_true', help="Listar las reglas")
+    parser.add_argument('--add', nargs=5, metavar=('TIPO', 'DESCRIPCIÓN', 'IMPORTE', 'FRECUENCIA', 'INICIO'),
+                        help="Crear una regla (TIPO: Income/Expense; FRECUENCIA: daily/weekly/monthly/yearly)")
+    parser.add_argument('--category', type=int, help="Categoría de la regla nueva")
+    parser.add_argument('--interval', type=int, default=1, help="Cada cuántos periodos se repite")
+    parser.add_argument('--end', help="Fecha final de la regla nueva")
+    parser.add_argument('--distribute', action='store_true', help="Repartir el ingreso entre las categorías")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    create_tables()
+    if args.add:
+        rule_type, description, amount, frequency, start_date = args.add
+        add_recurring_rule(rule_type, description, float(amount), frequency, start_date, args.category,
+                           args.interval, args.end, args.distribute)
+    if args.list:
+        for rule in get_recurring_rules():
+            print(f"  #{rule['id']} {rule['type']} '{rule['description']}' {from_cents(rule['amount_cents']):.2f}€ "
+                  f"{rule['frequency']}×{rule['interval']} -> próxima: {rule['next_due'] or 'terminada'}")
+    else:
+        print(f"✅ {materialize_due()} ocurrencias registradas.")
+    close_all_connections()
@@ -0,0 +1,64 @@
+import threading
+
+from src import database
+
+class CategoryRepository:
+    """Caché en memoria de la tabla Categories con un número de versión.
+
+    La primera lectura carga la tabla una vez; las siguientes devuelven la copia en memoria
+    hasta que una escritura de src/database.py confirma cambios en Categories. Entonces la
+    versión sube y la siguiente lectura vuelve a la BD. Así la UI puede preguntar
+    "¿ha cambiado algo desde la versión N?" sin consultar la BD.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None # tuple de dicts, o None si hay que recargar
+        self._version = 0
+        database.add_change_listener(self._on_database_change)
+
+    @property
+    def version(self) -> int:
+        """Versión actual de los datos; sube con cada cambio confirmado en Categories."""
+        return self._version
+
+    def changed_since(self, version: int) -> bool:
+        """Indica si las categorías han cambiado desde la versión dada."""
+        return self._version != version
+
+    def get_all(self) -> list[dict]:
+        """Devuelve todas las categorías (mismo formato que database.get_all_categories)."""
+        return [dict(category) for category in self._get_snapshot()]
+
+    def get_by_id(self, category_id: int) -> dict | None:
+        """Devuelve la categoría con ese ID, o None si no existe."""
+        for category in self._get_snapshot():
+            if category['id'] == category_id:
+                return dict(category)
+        return None
+
+    def invalidate(self):
+        """Descarta la copia en memoria (p.ej. si otro proceso ha modificado la BD)."""
+        with self._lock:
+            self._snapshot = None
+            self._version += 1
+
+    def _get_snapshot(self) -> tuple:
+        with self._lock:
+            snapshot, version = self._snapshot, self._version
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = tuple(database.get_all_categories())
+        with self._lock:
+            # Si hubo una escritura mientras leíamos, no guardamos datos posiblemente viejos
+            if self._version == version:
+                self._snapshot = snapshot
+        return snapshot
+
+    def _on_database_change(self, tables: set):
+        if 'Categories' in tables:
+            self.invalidate()
+
+# Instancia compartida por toda la app
+category_repository = CategoryRepository()
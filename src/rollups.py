@@ -0,0 +1,108 @@
+import argparse
+import logging
+import sqlite3
+
+from src.database import get_db_connection, transaction, create_tables, close_all_connections
+from src.migrations import ROLLUP_TABLES, rollup_source_sql, populate_rollups
+
+# --- Totales precalculados del libro (rollups) ---
+# DailyTotals y MonthlyTotals guardan, por periodo, categoría y tipo, cuántas transacciones
+# hay y la suma de amount_cents y de balance_delta_cents. Los triggers de la migración 9 los
+# mantienen al día en la misma transacción que cada INSERT/UPDATE/DELETE de Transactions,
+# así que un informe por meses lee unos cientos de filas aunque el libro tenga millones.
+# category_key es category_id, o 0 para las transacciones sin categoría.
+
+# Inicio del periodo de cada fila de totales (period es 'YYYY-MM-DD'; ver select_totals)
+PERIOD_SQL = {
+    'day': "period",
+    'week': "date(period, '-6 days', 'weekday 1')", # Lunes de esa semana
+    'month': "substr(period, 1, 7) || '-01'",
+}
+
+_COLUMNS = "category_key, type, count, amount_cents, delta_cents"
+
+def _month_start(date: str) -> str:
+    return f"{date[:7]}-01"
+
+def _next_month_start(date: str) -> str:
+    year, month = int(date[:4]), int(date[5:7])
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01"
+
+def select_totals(conn: sqlite3.Connection, columns: str, date_from: str = None, date_to: str = None,
+                  granularity: str = 'month', where: str = "1", params=(), group_by: str = None) -> list:
+    """SELECT {columns} sobre los totales de los días [date_from, date_to) ('YYYY-MM-DD'; None = sin límite).
+
+    columns, where y group_by pueden usar period ('YYYY-MM-DD'), category_key, type, count,
+    amount_cents y delta_cents (PERIOD_SQL da el inicio de semana o mes de cada fila). Con
+    granularity 'day' o 'week' se leen los totales diarios. Con 'month' (o para totales que
+    no se agrupan por periodo) los meses completos salen de MonthlyTotals y solo los días
+    sueltos de los extremos de DailyTotals; entonces period es el día 1 de esos meses.
+    """
+    low = date_from or '0000-01-01'
+    high = date_to or '9999-12-01'
+    if granularity in ('day', 'week'):
+        source = f"SELECT period, {_COLUMNS} FROM DailyTotals WHERE period >= ? AND period < ? AND {where}"
+        source_params = [low, high, *params]
+    else:
+        # Días sueltos [low, full_from) y [full_to, high); meses completos [full_from, full_to)
+        full_from = min(low if low[8:10] == '01' else _next_month_start(low), high)
+        full_to = max(_month_start(high), full_from)
+        source = f"""
+            SELECT period, {_COLUMNS} FROM DailyTotals
+            WHERE ((period >= ? AND period < ?) OR (period >= ? AND period < ?)) AND {where}
+            UNION ALL
+            SELECT period || '-01', {_COLUMNS} FROM MonthlyTotals
+            WHERE period >= ? AND period < ? AND {where}
+        """
+        source_params = [low, full_from, full_to, high, *params, full_from[:7], full_to[:7], *params]
+    group = f"GROUP BY {group_by}" if group_by else ""
+    return conn.execute(f"SELECT {columns} FROM ({source}) {group}", source_params).fetchall()
+
+def rebuild_rollups() -> bool:
+    """Recalcula desde cero los totales a partir de Transactions (si se editó la BD a mano)."""
+    try:
+        with transaction() as conn:
+            populate_rollups(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM MonthlyTotals").fetchone()[0]
+        print(f"✅ Totales recalculados desde el libro ({rows} filas mensuales).")
+        return True
+    except sqlite3.Error as e:
+        print(f"❌ Error al recalcular los totales: {e}")
+        return False
+
+def verify_rollups() -> list[dict]:
+    """Compara los rollups con lo que sale de Transactions; devuelve las filas que no cuadran."""
+    conn = get_db_connection()
+    mismatches = []
+    try:
+        for table, length in ROLLUP_TABLES.items():
+            stored = {tuple(row[:3]): tuple(row[3:]) for row in conn.execute(
+                f"SELECT period, category_key, type, count, amount_cents, delta_cents FROM {table}")}
+            ledger = {tuple(row[:3]): tuple(row[3:]) for row in conn.execute(rollup_source_sql(length))}
+            for key in stored.keys() | ledger.keys():
+                if stored.get(key) != ledger.get(key):
+                    mismatches.append({'table': table, 'period': key[0], 'category_key': key[1], 'type': key[2],
+                                       'stored': stored.get(key), 'ledger': ledger.get(key)})
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al comprobar los totales: {e}")
+    return sorted(mismatches, key=lambda m: (m['table'], m['period'], m['category_key'], m['type']))
+
+
+if __name__ == '__main__':
+    # Uso: python -m src.rollups [--rebuild | --verify]
+    parser = argparse.ArgumentParser(description="Mantenimiento de los totales por día y mes (rollups).")
+    parser.add_argument('--rebuild', action='store_true', help="Recalcular los totales desde cero")
+    parser.add_argument('--verify', action='store_true', help="Comprobar que los totales cuadran con el libro")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.rebuild:
+        rebuild_rollups()
+    else:
+        mismatches = verify_rollups()
+        for m in mismatches[:20]:
+            print(f"⚠️ {m['table']} {m['period']} cat {m['category_key']} {m['type']}: "
+                  f"guardado {m['stored']}, libro {m['ledger']} (nº, importe, delta)")
+        print("✅ Los totales cuadran con el libro." if not mismatches else f"❌ {len(mismatches)} filas no cuadran.")
+    close_all_connections()
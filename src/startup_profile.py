@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+# --- Perfil de arranque ---
+# Con la variable de entorno FINANZAS_PROFILE_STARTUP definida, la app mide las fases del
+# arranque y guarda un informe JSON:
+#   FINANZAS_PROFILE_STARTUP=1 python main_kivy.py              -> startup_profile.json
+#   FINANZAS_PROFILE_STARTUP=/tmp/arranque.json python main_kivy.py
+PROFILE_ENV_VAR = 'FINANZAS_PROFILE_STARTUP'
+DEFAULT_REPORT_PATH = 'startup_profile.json'
+
+class StartupProfile:
+    """Cronómetro de las fases del arranque, en milisegundos desde 'start'.
+
+    Si no está activado (ver PROFILE_ENV_VAR) phase() y mark() no hacen nada, así que se
+    pueden dejar en el código sin coste.
+    """
+
+    def __init__(self, start: float = None, enabled: bool = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.enabled = bool(os.environ.get(PROFILE_ENV_VAR)) if enabled is None else enabled
+        self.phases = [] # (nombre, inicio_ms, duración_ms); los hitos tienen duración None
+
+    def _ms(self, t: float) -> float:
+        return round((t - self.start) * 1000, 2)
+
+    def record(self, name: str, started: float, ended: float = None):
+        """Registra una fase ya medida con time.perf_counter()."""
+        if self.enabled:
+            ended = ended if ended is not None else time.perf_counter()
+            self.phases.append((name, self._ms(started), round((ended - started) * 1000, 2)))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mide la duración del bloque: with profile.phase('build'): ..."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def mark(self, name: str, once: bool = True):
+        """Registra un hito (p.ej. el primer frame); con once solo cuenta la primera vez."""
+        if self.enabled and not (once and any(phase[0] == name for phase in self.phases)):
+            self.phases.append((name, self._ms(time.perf_counter()), None))
+
+    def report(self) -> dict:
+        """Devuelve el informe: fases en orden de inicio y hitos."""
+        return {
+            'phases': [{'name': name, 'start_ms': start, 'duration_ms': duration}
+                       for name, start, duration in sorted(self.phases, key=lambda phase: phase[1])],
+        }
+
+    def write(self, path: str = None) -> str | None:
+        """Guarda el informe en JSON (ruta de PROFILE_ENV_VAR si es un fichero) y lo resume en el log."""
+        if not self.enabled:
+            return None
+        env_value = os.environ.get(PROFILE_ENV_VAR, '')
+        path = path or (env_value if env_value.endswith('.json') else DEFAULT_REPORT_PATH)
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+        summary = ', '.join(f"{phase['name']} {phase['duration_ms'] if phase['duration_ms'] is not None else phase['start_ms']} ms"
+                            for phase in report['phases'])
+        logging.info(f"⏱️ Perfil de arranque guardado en '{path}': {summary}")
+        return path
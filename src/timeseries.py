@@ -0,0 +1,165 @@
+import logging
+import math
+import sqlite3
+from collections import namedtuple
+from datetime import date as Date
+
+import numpy as np
+
+from src.balances import balance_cents_before
+from src.database import get_db_connection
+from src.rollups import PERIOD_SQL, select_totals
+
+# --- Series temporales del libro de transacciones ---
+# Las series se agregan por día, semana (empieza en lunes) o mes a partir de los totales
+# precalculados de src/rollups.py (no de Transactions) y se devuelven densas (un punto por
+# periodo, también los que no tienen movimientos). Después, lttb() reduce los
+# puntos a los que caben en el gráfico: años de historial por días se dibujan
+# con tantos puntos como píxeles tiene el eje, conservando picos y valles.
+#
+# Las fechas del eje x son días desde 1970-01-01 (el mismo origen que usa matplotlib para
+# las fechas), así que el gráfico las usa tal cual.
+
+METRICS = ('balance', 'spending')
+GRANULARITIES = ('day', 'week', 'month')
+
+# 'auto' elige el periodo más fino que no dé más de este múltiplo de los puntos pedidos
+# (LTTB reduce el resto sin perder la forma de la curva)
+AUTO_OVERSAMPLING = 4
+
+EPOCH_ORDINAL = Date(1970, 1, 1).toordinal()
+
+# balance: saldo al final de cada periodo; spending: suma de gastos del periodo. En céntimos.
+Series = namedtuple('Series', ['metric', 'granularity', 'days', 'cents'])
+
+def date_to_day(date: str) -> int:
+    """'2025-03-17[ 10:20:00]' -> días desde 1970-01-01."""
+    return Date.fromisoformat(date[:10]).toordinal() - EPOCH_ORDINAL
+
+def day_to_date(day: float) -> str:
+    """Días desde 1970-01-01 -> 'YYYY-MM-DD' (se trunca la parte decimal)."""
+    return Date.fromordinal(math.floor(day) + EPOCH_ORDINAL).isoformat()
+
+def get_date_range(category_id: int = None) -> tuple[int, int] | None:
+    """Primer día con transacciones y el siguiente al último (días desde 1970), o None si no hay."""
+    condition = "WHERE category_id = ?" if category_id is not None else ""
+    params = (category_id,) if category_id is not None else ()
+    try:
+        first, last = get_db_connection().execute(
+            f"SELECT MIN(date), MAX(date) FROM Transactions {condition}", params).fetchone()
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al obtener el rango de fechas del historial: {e}")
+        return None
+    if first is None:
+        return None
+    return date_to_day(first), date_to_day(last) + 1
+
+def choose_granularity(day_from: int, day_to: int, max_points: int) -> str:
+    """Periodo más fino cuya serie entre day_from y day_to no pasa de max_points * AUTO_OVERSAMPLING."""
+    span = max(day_to - day_from, 1)
+    limit = max(max_points, 1) * AUTO_OVERSAMPLING
+    if span <= limit:
+        return 'day'
+    if span / 7 <= limit:
+        return 'week'
+    return 'month'
+
+def _bucket_days(day_from: int, day_to: int, granularity: str) -> np.ndarray:
+    """Inicio (días desde 1970) de cada periodo que toca [day_from, day_to)."""
+    if granularity == 'day':
+        return np.arange(day_from, day_to, dtype=np.int64)
+    if granularity == 'week':
+        monday = day_from - Date.fromordinal(day_from + EPOCH_ORDINAL).weekday()
+        return np.arange(monday, day_to, 7, dtype=np.int64)
+    first = Date.fromordinal(day_from + EPOCH_ORDINAL)
+    last = Date.fromordinal(day_to - 1 + EPOCH_ORDINAL)
+    months = range(first.year * 12 + first.month - 1, last.year * 12 + last.month)
+    return np.array([Date(m // 12, m % 12 + 1, 1).toordinal() - EPOCH_ORDINAL for m in months], dtype=np.int64)
+
+def get_series(metric: str, day_from: int, day_to: int, granularity: str = 'auto',
+               category_id: int = None, max_points: int = 1000) -> Series:
+    """Serie de 'metric' entre los días [day_from, day_to), agregada por periodo desde los rollups.
+
+    - metric 'balance': saldo total (o de category_id) al final de cada periodo. El saldo
+      inicial sale de los snapshots de src/balances.py, así que mover la ventana por años
+      de historial solo lee los totales de la ventana.
+    - metric 'spending': suma de los gastos ('Expense') de cada periodo.
+
+    granularity 'auto' se elige con choose_granularity(max_points).
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrica desconocida: {metric}")
+    if granularity == 'auto':
+        granularity = choose_granularity(day_from, day_to, max_points)
+    days = _bucket_days(day_from, day_to, granularity)
+    cents = np.zeros(len(days), dtype=np.int64)
+    if not len(days):
+        return Series(metric, granularity, days, cents)
+
+    date_from, date_to = day_to_date(day_from), day_to_date(day_to)
+    if metric == 'balance':
+        value_sql = "SUM(delta_cents)"
+        # Solo categorías existentes: lo mismo que suma el saldo inicial
+        conditions = "category_key IN (SELECT id FROM Categories)"
+    else:
+        value_sql = "SUM(amount_cents)"
+        conditions = "type = 'Expense'"
+    params = []
+    if category_id is not None:
+        conditions += " AND category_key = ?"
+        params.append(category_id)
+
+    conn = get_db_connection()
+    try:
+        rows = select_totals(conn, f"{PERIOD_SQL[granularity]} AS bucket, {value_sql}", date_from, date_to,
+                             granularity, conditions, params, group_by="bucket")
+        start_cents = balance_cents_before(conn, date_from, category_id) if metric == 'balance' else 0
+    except sqlite3.Error as e:
+        logging.error(f"❌ Error al obtener la serie '{metric}' ({granularity}): {e}")
+        return Series(metric, granularity, days[:0], cents[:0])
+
+    if rows:
+        row_days = np.array([date_to_day(bucket) for bucket, _ in rows], dtype=np.int64)
+        np.add.at(cents, np.searchsorted(days, row_days, side='right') - 1, [value for _, value in rows])
+    if metric == 'balance':
+        cents = start_cents + np.cumsum(cents)
+    return Series(metric, granularity, days, cents)
+
+def lttb(x, y, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce la serie (x, y) a 'threshold' puntos con Largest-Triangle-Three-Buckets.
+
+    Conserva el primer y el último punto; el resto se divide en threshold - 2 cubos y de cada
+    uno se queda el punto que forma el triángulo de mayor área con el punto elegido en el cubo
+    anterior y la media del siguiente. Así los picos y valles sobreviven a la reducción.
+    x debe estar ordenado. Si ya hay threshold puntos o menos, devuelve la serie sin cambios.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Límites de los cubos: el cubo i son los índices [edges[i], edges[i + 1])
+    every = (n - 2) / (threshold - 2)
+    edges = np.append((np.arange(threshold - 1) * every).astype(np.int64) + 1, n)
+    edges[-2] = n - 1 # El redondeo no debe dejar puntos fuera del último cubo
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        xa, ya = x[a], y[a]
+        # El doble del área basta para comparar
+        areas = np.abs((xa - avg_x) * (y[start:end] - ya) - (xa - x[start:end]) * (avg_y - ya))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+def load_series(metric: str, day_from: int, day_to: int, max_points: int, category_id: int = None) -> Series:
+    """Serie de la ventana [day_from, day_to) lista para dibujar: periodo automático y como mucho max_points (LTTB)."""
+    series = get_series(metric, day_from, day_to, 'auto', category_id, max_points)
+    days, cents = lttb(series.days, series.cents, max_points)
+    return series._replace(days=days, cents=cents)
@@ -0,0 +1,40 @@
+import logging
+
+# --- Lista de categorías sobre RecycleView ---
+# Cada fila de RecycleView.data es un dict con las propiedades de CategoryRow (ver
+# financeapp.kv). RecycleView solo crea widgets para las filas visibles y los reutiliza al
+# hacer scroll, así que cientos de categorías no suponen cientos de árboles de widgets.
+
+def category_row_data(category: dict) -> dict:
+    """Convierte una categoría (formato de get_all_categories) en los datos de su CategoryRow."""
+    balance = category['current_balance'] if category['current_balance'] is not None else 0.0
+    return {
+        'category_id': category['id'],
+        'category_name': category['name'],
+        'category_percentage': f"{category['percentage']}%",
+        'category_balance': f"{balance:.2f} €",
+        'opacity': 1, # Una fila reciclada puede venir de una animación de borrado
+    }
+
+def sync_category_rows(recycle_view, categories: list[dict]) -> int:
+    """Actualiza recycle_view.data con las categorías haciendo un diff por ID.
+
+    Si las categorías son las mismas y en el mismo orden, solo se sustituyen las filas cuyo
+    nombre, porcentaje o balance cambiaron (RecycleView refresca solo esas). Si se añadieron,
+    quitaron o reordenaron categorías, se asigna la lista nueva de una vez: los widgets se
+    siguen reciclando. Devuelve el número de filas tocadas.
+    """
+    new_rows = [category_row_data(category) for category in categories]
+    old_rows = recycle_view.data
+    if [row['category_id'] for row in old_rows] != [row['category_id'] for row in new_rows]:
+        recycle_view.data = new_rows
+        logging.debug(f"Lista de categorías reconstruida ({len(new_rows)} filas).")
+        return len(new_rows)
+
+    changed = 0
+    for index, row in enumerate(new_rows):
+        if old_rows[index] != row:
+            old_rows[index] = row # Notifica a RecycleView solo el índice modificado
+            changed += 1
+    logging.debug(f"Lista de categorías: {changed} filas actualizadas de {len(new_rows)}.")
+    return changed
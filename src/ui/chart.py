@@ -0,0 +1,293 @@
+import logging
+import math
+import threading
+from functools import partial
+
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+from kivy.properties import BooleanProperty, ObjectProperty, OptionProperty
+from kivy.uix.image import Image
+
+from src import database
+
+# Máximo que espera el hilo de dibujo a que la UI copie el último gráfico antes de seguir
+BLIT_TIMEOUT_SECONDS = 1.0
+
+class ChartView(Image):
+    """Widget que muestra un CategoryChart (src/ui/donut_chart.py) dibujado en un hilo aparte.
+
+    show() solo anota los datos más recientes y despierta al hilo de dibujo, así que la UI
+    no se bloquea mientras Agg rasteriza. El hilo entrega el buffer RGBA al hilo de Kivy con
+    Clock, que lo copia directamente a una Texture (blit_buffer, sin copias intermedias).
+    Si llegan datos nuevos mientras se dibuja, el dibujo viejo se descarta sin mostrarse.
+    Hasta el primer dibujo la textura es None (el kv muestra un aviso de carga en su lugar).
+    """
+
+    def __init__(self, chart=None, **kwargs):
+        super().__init__(**kwargs)
+        self.chart = chart # CategoryChart; si no se pasa, se crea en el hilo de dibujo
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._blitted = threading.Event() # La UI ya no usa el buffer entregado
+        self._blitted.set()
+        self._pending = None    # (generación, datos, tamaño) aún sin dibujar
+        self._generation = 0    # Generación de la última petición de show()
+        self._handoff = None    # Generación entregada a la UI y aún sin copiar
+        self._rendering = False # El hilo de dibujo está trabajando
+        self._data = None       # Últimos datos pedidos, para redibujar al cambiar de tamaño
+        self._stopped = False
+        self._thread = threading.Thread(target=self._render_loop, name='chart-render', daemon=True)
+        self._thread.start()
+        self.bind(size=self._on_size)
+
+    def show(self, categories: list[dict]):
+        """Pide dibujar estas categorías (llamar desde el hilo de Kivy)."""
+        self._request(categories)
+
+    def _request(self, data):
+        self._data = data
+        size = (max(int(self.width), 1), max(int(self.height), 1))
+        with self._lock:
+            self._generation += 1
+            self._pending = (self._generation, data, size)
+        self._wake.set()
+
+    def stop(self):
+        """Termina el hilo de dibujo (al cerrar la app)."""
+        self._stopped = True
+        self._blitted.set()
+        self._wake.set()
+
+    def _on_size(self, *args):
+        if self._data is not None:
+            self._request(self._data)
+
+    @property
+    def idle(self) -> bool:
+        """True si no hay dibujos pendientes, en curso ni esperando a copiarse en la textura."""
+        with self._lock:
+            return self._pending is None and not self._rendering and self._handoff is None
+
+    def _render_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            with self._lock:
+                job, self._pending = self._pending, None
+                self._rendering = job is not None
+            if job is None:
+                continue
+            try:
+                self._render(*job)
+            finally:
+                with self._lock:
+                    self._rendering = False
+
+    def _update_chart(self, categories, size) -> bool:
+        """Pasa los datos al gráfico (hilo de dibujo). Devuelve False si no hace falta redibujar."""
+        if self.chart is None:
+            # matplotlib y numpy se importan aquí, fuera del hilo de la UI y después del arranque
+            from src.ui.donut_chart import CategoryChart
+            self.chart = CategoryChart()
+        return self.chart.update(categories, size)
+
+    def _render(self, generation, data, size):
+        try:
+            if not self._update_chart(data, size):
+                return
+            buffer, rendered_size = self.chart.render()
+        except Exception as e:
+            logging.error(f"Error al dibujar el gráfico: {e}", exc_info=True)
+            if self.chart is not None:
+                self.chart.invalidate()
+            return
+
+        with self._lock:
+            stale = self._pending is not None
+        if stale:
+            self.chart.invalidate() # Lo dibujado no se mostrará: la petición nueva debe redibujar
+            return
+        # El buffer es del renderer: no se vuelve a dibujar hasta que la UI lo haya copiado
+        with self._lock:
+            self._handoff = generation
+        self._blitted.clear()
+        Clock.schedule_once(partial(self._blit, generation, buffer, rendered_size))
+        if not self._blitted.wait(BLIT_TIMEOUT_SECONDS):
+            with self._lock:
+                cancelled = self._handoff == generation # La UI aún no había empezado a copiar
+                self._handoff = None
+            if cancelled:
+                logging.warning("La UI no copió el gráfico a tiempo; se descarta.")
+                self.chart.invalidate()
+            else:
+                self._blitted.wait()
+
+    def _blit(self, generation, buffer, size, dt):
+        with self._lock:
+            if self._handoff != generation:
+                return # Entrega caducada: el hilo de dibujo dejó de esperarla
+            self._handoff = None
+        try:
+            if self._stopped:
+                return
+            if generation != self._generation:
+                self.chart.invalidate() # Hay datos más nuevos en camino
+                return
+            texture = self.texture
+            if texture is None or tuple(texture.size) != tuple(size):
+                texture = Texture.create(size=size, colorfmt='rgba')
+                texture.flip_vertical() # Agg dibuja de arriba abajo; OpenGL de abajo arriba
+            # buffer_rgba() es (alto, ancho, 4) y blit_buffer quiere un buffer plano: cast() no copia
+            texture.blit_buffer(buffer.cast('B'), colorfmt='rgba', bufferfmt='ubyte')
+            if texture is not self.texture:
+                self.texture = texture
+            else:
+                self.canvas.ask_update()
+        finally:
+            self._blitted.set()
+
+# --- Serie temporal con desplazamiento y zoom ---
+# Parte horizontal del widget que ocupan los ejes del TimeSeriesChart (el resto son márgenes
+# para las etiquetas), para pasar de píxeles a días al arrastrar o hacer zoom
+AXES_LEFT = 0.12
+AXES_RIGHT = 0.97
+ZOOM_STEP = 1.25      # Factor de zoom por paso de la rueda del ratón
+MIN_WINDOW_DAYS = 7   # Ventana más estrecha que se puede ver
+
+class TimeSeriesView(ChartView):
+    """Evolución del balance o del gasto (src/timeseries.py), dibujada como ChartView.
+
+    La ventana visible (días desde 1970, o None para todo el historial) se cambia arrastrando
+    (desplazar), con la rueda del ratón o dos dedos (zoom) y con doble toque (volver a todo).
+    Cada cambio solo pide un redibujo: el hilo de dibujo consulta la BD para ESA ventana, con
+    el periodo (día/semana/mes) y los puntos (LTTB) que caben en el ancho del eje, y los
+    gestos que lleguen mientras tanto se agrupan en un solo dibujo.
+
+    Mientras no está activa (active = False) no dibuja; los cambios en Transactions la
+    redibujan al activarse.
+    """
+    metric = OptionProperty('balance', options=('balance', 'spending'))
+    category_id = ObjectProperty(None, allownone=True)
+    active = BooleanProperty(False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.window = None      # (desde, hasta) en días desde 1970; None = todo el historial
+        self.full_range = None  # Rango con datos, lo averigua el hilo de dibujo
+        self._stale = True      # Hay cambios sin dibujar porque la vista no estaba activa
+        self._touches = {}      # Toques en curso: uid -> [x al empezar el gesto, x actual]
+        self._gesture_window = None
+        self._refresh_trigger = Clock.create_trigger(lambda dt: self.refresh(), 0)
+        self.bind(metric=self._on_series_change, category_id=self._on_series_change, active=self._on_active)
+        database.add_change_listener(self._on_database_change)
+
+    def refresh(self):
+        """Vuelve a pedir la ventana actual (hilo de Kivy)."""
+        if not self.active:
+            self._stale = True
+            return
+        self._stale = False
+        self._request((self.metric, self.category_id, self.window))
+
+    def set_window(self, window):
+        """Muestra la ventana (desde, hasta) en días desde 1970, o todo el historial con None."""
+        self.window = window
+        self.refresh()
+
+    def _on_series_change(self, *args):
+        self.window = None # Otra serie: se vuelve a ver todo su historial
+        self.refresh()
+
+    def _on_active(self, instance, active):
+        if active and (self._stale or self.texture is None):
+            self.refresh()
+
+    def _on_database_change(self, tables: set):
+        # Llega desde el hilo que escribió: el redibujo se pide en el hilo de Kivy
+        if 'Transactions' in tables or 'Categories' in tables:
+            self._refresh_trigger()
+
+    def _update_chart(self, data, size) -> bool:
+        from src import timeseries
+        if self.chart is None:
+            from src.ui.timeseries_chart import TimeSeriesChart
+            self.chart = TimeSeriesChart()
+        metric, category_id, window = data
+        if window is None:
+            self.full_range = timeseries.get_date_range(category_id)
+            window = self.full_range
+        if window is None:
+            series = None # Sin transacciones
+        else:
+            axis_width = max(int(size[0] * (AXES_RIGHT - AXES_LEFT)), 3)
+            series = timeseries.load_series(metric, int(window[0]), math.ceil(window[1]), axis_width, category_id)
+        return self.chart.update(metric, series, window, size)
+
+    # --- Gestos ---
+
+    def _visible_window(self):
+        return self.window or self.full_range
+
+    def _days_per_pixel(self, window) -> float:
+        return (window[1] - window[0]) / max(self.width * (AXES_RIGHT - AXES_LEFT), 1)
+
+    def _zoom(self, window, factor: float, x: float):
+        """Ventana escalada por factor (>1 acerca) manteniendo fijo el día bajo la coordenada x."""
+        span = window[1] - window[0]
+        new_span = span / factor
+        if self.full_range:
+            new_span = min(new_span, self.full_range[1] - self.full_range[0])
+        new_span = max(new_span, MIN_WINDOW_DAYS)
+        fraction = min(max((x - self.x - self.width * AXES_LEFT) / max(self.width * (AXES_RIGHT - AXES_LEFT), 1), 0), 1)
+        anchor = window[0] + fraction * span
+        return anchor - fraction * new_span, anchor - fraction * new_span + new_span
+
+    def _restart_gesture(self):
+        """Los toques en curso empiezan un gesto nuevo desde la ventana actual."""
+        self._gesture_window = self._visible_window()
+        for position in self._touches.values():
+            position[0] = position[1]
+
+    def on_touch_down(self, touch):
+        window = self._visible_window()
+        if not self.active or window is None or not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        if touch.is_mouse_scrolling:
+            # Con la rueda hacia delante Kivy envía 'scrolldown': acerca
+            factor = ZOOM_STEP if touch.button == 'scrolldown' else 1 / ZOOM_STEP
+            self.set_window(self._zoom(window, factor, touch.x))
+            return True
+        if touch.is_double_tap:
+            self.set_window(None)
+            return True
+        touch.grab(self)
+        self._touches[touch.uid] = [touch.x, touch.x]
+        self._restart_gesture()
+        return True
+
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self or touch.uid not in self._touches:
+            return super().on_touch_move(touch)
+        self._touches[touch.uid][1] = touch.x
+        window = self._gesture_window
+        if len(self._touches) == 1:
+            start_x, x = self._touches[touch.uid]
+            shift = (x - start_x) * self._days_per_pixel(window)
+            self.set_window((window[0] - shift, window[1] - shift))
+        else:
+            # Dos dedos: zoom según cuánto cambia la distancia entre ellos
+            (start_a, x_a), (start_b, x_b) = list(self._touches.values())[:2]
+            start_distance = abs(start_a - start_b)
+            if start_distance > 10 and x_a != x_b:
+                self.set_window(self._zoom(window, abs(x_a - x_b) / start_distance, (start_a + start_b) / 2))
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_up(touch)
+        touch.ungrab(self)
+        if self._touches.pop(touch.uid, None) is not None:
+            self._restart_gesture() # El dedo que queda sigue desplazando desde aquí
+        return True
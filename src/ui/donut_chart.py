@@ -0,0 +1,113 @@
+import logging
+import math
+
+import numpy as np
+from matplotlib import colormaps, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle, Wedge
+
+# --- Estilo del gráfico de donut (el mismo que dibujaba FinanceApp.update_graph) ---
+BACKGROUND_COLOR = '#1E1E1E' # Fondo de las tarjetas MDCard
+LABEL_COLOR = '#4CAF50'      # Color del texto de las categorías
+START_ANGLE = 90
+RADIUS = 1.0
+WEDGE_WIDTH = 0.7
+LABEL_DISTANCE = 1.1         # Igual que ax.pie
+PCT_DISTANCE = 0.6           # Igual que ax.pie
+
+class CategoryChart:
+    """Gráfico de donut de las categorías que se crea una sola vez y se actualiza en su sitio.
+
+    La figura y los ejes viven mientras viva el gráfico. update() reutiliza los sectores
+    (Wedge) y textos existentes cambiando ángulos, textos y colores; solo crea o quita
+    artistas si cambia el número de categorías. Si los datos dibujados (nombres, porcentajes
+    y tamaño en píxeles) no han cambiado, no hay que redibujar nada.
+
+    No usa pyplot (su estado global no es seguro entre hilos): la figura se rasteriza con Agg
+    a un buffer RGBA desde cualquier hilo, siempre que sea uno solo a la vez.
+    """
+
+    def __init__(self):
+        with style.context('dark_background'):
+            self.figure = Figure(figsize=(8, 6))
+            self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.figure.patch.set_facecolor(BACKGROUND_COLOR)
+        self.ax.set_aspect('equal')
+        self.ax.set_xlim(-1.25, 1.25)
+        self.ax.set_ylim(-1.25, 1.25)
+        self.ax.set_axis_off()
+        self.ax.set_title('Distribución de Categorías', color='white', pad=20, fontsize=14, fontweight='bold')
+        # Círculo central del donut
+        self.ax.add_patch(Circle((0, 0), 0.50, fc=BACKGROUND_COLOR, zorder=3))
+
+        self._wedges = []
+        self._labels = []
+        self._pct_texts = []
+        self._data_key = None
+
+    def invalidate(self):
+        """Obliga a redibujar en el próximo update() aunque los datos no cambien."""
+        self._data_key = None
+
+    def update(self, categories: list[dict], size: tuple[int, int] = None) -> bool:
+        """Actualiza los artistas con las categorías dadas. Devuelve False si no hacía falta redibujar.
+
+        size es el tamaño en píxeles (ancho, alto) del buffer que se quiere obtener con render().
+        """
+        size = size or tuple(int(v) for v in self.canvas.get_width_height())
+        data_key = (size, tuple((cat['name'], cat['percentage']) for cat in categories))
+        if data_key == self._data_key:
+            return False
+        self._data_key = data_key
+
+        dpi = self.figure.dpi
+        self.figure.set_size_inches(max(size[0], 1) / dpi, max(size[1], 1) / dpi, forward=False)
+
+        sizes = [max(cat['percentage'] or 0, 0) for cat in categories]
+        total = sum(sizes)
+        if not total:
+            sizes, categories = [], [] # Sin porcentajes no hay nada que repartir en el donut
+            total = 1
+        self._resize(len(sizes))
+
+        colors = colormaps['Greens'](np.linspace(0.5, 0.8, len(sizes)))
+        theta1 = START_ANGLE
+        for wedge, label, pct_text, share, color, cat in zip(self._wedges, self._labels, self._pct_texts,
+                                                            sizes, colors, categories):
+            theta2 = theta1 + 360 * share / total
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            wedge.set_facecolor(color)
+
+            middle = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            label.set_position((LABEL_DISTANCE * RADIUS * x, LABEL_DISTANCE * RADIUS * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            label.set_text(cat['name'])
+            pct_text.set_position((PCT_DISTANCE * RADIUS * x, PCT_DISTANCE * RADIUS * y))
+            pct_text.set_text(f"{100 * share / total:.1f}%")
+            theta1 = theta2
+        return True
+
+    def render(self) -> tuple[memoryview, tuple[int, int]]:
+        """Rasteriza la figura y devuelve (buffer RGBA, (ancho, alto)).
+
+        El buffer es el del propio renderer de Agg (sin copia): es válido hasta el siguiente render().
+        """
+        self.canvas.draw()
+        return self.canvas.buffer_rgba(), self.canvas.get_width_height()
+
+    def _resize(self, count: int):
+        """Crea o quita sectores y textos hasta tener 'count' (los que ya existen se reutilizan)."""
+        while len(self._wedges) < count:
+            self._wedges.append(self.ax.add_patch(
+                Wedge((0, 0), RADIUS, 0, 0, width=WEDGE_WIDTH, edgecolor=BACKGROUND_COLOR, zorder=2)))
+            self._labels.append(self.ax.text(0, 0, '', size=10, color=LABEL_COLOR, va='center'))
+            self._pct_texts.append(self.ax.text(0, 0, '', size=11, weight='bold', color='white',
+                                                ha='center', va='center', zorder=4))
+        while len(self._wedges) > count:
+            for artist in (self._wedges.pop(), self._labels.pop(), self._pct_texts.pop()):
+                artist.remove()
+        logging.debug(f"Gráfico de categorías con {count} sectores.")
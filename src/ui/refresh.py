@@ -0,0 +1,103 @@
+import logging
+import threading
+
+from kivy.clock import Clock
+
+from src.database import get_dashboard_summary
+from src.db_worker import db_worker
+from src.repository import category_repository
+
+# Zonas de la pantalla que se pueden marcar como pendientes de refrescar
+LIST = 'list'
+CHART = 'chart'
+TOTALS = 'totals'
+
+class RefreshCoordinator:
+    """Agrupa los refrescos de la UI en uno solo por frame.
+
+    Las acciones solo marcan zonas como sucias con mark_dirty(); en el siguiente frame un
+    único flush lee UNA vez, en un hilo lector, los datos que necesiten las zonas sucias
+    (categorías del repositorio y/o resumen del panel) y, de vuelta en el hilo de Kivy, llama
+    al refresco de cada zona con esos datos. Varias ediciones seguidas antes del siguiente
+    frame (o mientras se leía) producen un solo refresco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._handlers = {}
+        self._loading = False # Hay una lectura de datos en curso en segundo plano
+        self._trigger = Clock.create_trigger(self._flush, 0)
+        # Últimos datos entregados (None hasta la primera lectura): la UI valida con ellos
+        # sin volver a leer la BD en su hilo
+        self.categories = None
+        self.summary = None
+
+    def register(self, region: str, handler):
+        """Asocia una zona con su refresco: handler(categories=..., summary=...)."""
+        self._handlers[region] = handler
+
+    @property
+    def idle(self) -> bool:
+        """True si no hay zonas pendientes ni lecturas en curso."""
+        with self._lock:
+            return not self._dirty and not self._loading
+
+    def mark_dirty(self, *regions: str):
+        """Marca zonas para refrescar en el próximo frame (sin argumentos: todas)."""
+        with self._lock:
+            self._dirty.update(regions or self._handlers)
+        self._trigger()
+
+    def flush(self):
+        """Refresca ya las zonas pendientes, leyendo en este hilo (scripts y benchmarks)."""
+        self._trigger.cancel()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if dirty:
+            self._apply(dirty, self._load_snapshot(dirty))
+
+    def _flush(self, dt=None):
+        with self._lock:
+            if self._loading:
+                return # Al terminar la lectura en curso se vuelve a disparar
+            dirty, self._dirty = self._dirty, set()
+            self._loading = bool(dirty)
+        if not dirty:
+            return
+        # La lectura va al pool de lectores; los widgets se tocan en el hilo de Kivy
+        db_worker.submit_read(self._load_snapshot, dirty,
+                              on_done=lambda snapshot: self._on_snapshot(dirty, snapshot),
+                              on_error=lambda error: self._on_snapshot(dirty, None, error))
+
+    @staticmethod
+    def _load_snapshot(dirty: set) -> dict:
+        """Una sola lectura de datos para todas las zonas sucias."""
+        return {
+            'categories': category_repository.get_all() if dirty & {LIST, CHART} else None,
+            'summary': get_dashboard_summary() if TOTALS in dirty else None,
+        }
+
+    def _on_snapshot(self, dirty: set, snapshot: dict | None, error: Exception = None):
+        with self._lock:
+            self._loading = False
+            pending = bool(self._dirty)
+        if error is not None:
+            logging.error(f"Error al leer los datos para refrescar {sorted(dirty)}: {error}")
+        else:
+            self._apply(dirty, snapshot)
+        if pending:
+            self._trigger() # Se marcaron zonas mientras se leía
+
+    def _apply(self, dirty: set, snapshot: dict):
+        if snapshot['categories'] is not None:
+            self.categories = snapshot['categories']
+        if snapshot['summary'] is not None:
+            self.summary = snapshot['summary']
+        for region in (LIST, CHART, TOTALS):
+            if region in dirty and region in self._handlers:
+                try:
+                    self._handlers[region](**snapshot)
+                except Exception as e:
+                    logging.error(f"Error al refrescar la zona '{region}': {e}", exc_info=True)
+        logging.debug(f"Refresco agrupado de {sorted(dirty)}.")
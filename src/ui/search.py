@@ -0,0 +1,79 @@
+import logging
+import time
+
+from kivy.clock import Clock
+
+from src.db_worker import db_worker
+from src.history import search_transactions
+from src.money import from_cents
+
+# Espera desde la última tecla antes de buscar: escribir "mercadona" lanza una búsqueda, no nueve
+SEARCH_DELAY_SECONDS = 0.25
+MIN_SEARCH_CHARS = 2 # Con una letra casi todo coincide: no merece la pena buscar
+SEARCH_LIMIT = 100
+
+TYPE_COLORS = {'Income': '#4CAF50', 'Expense': '#FF5252', 'Allocation': '#64B5F6', 'Adjustment': '#BDBDBD'}
+
+def search_row_data(row, category_names: dict) -> dict:
+    """Convierte un resultado (history.TransactionRow) en los datos de su SearchResultRow (financeapp.kv)."""
+    category = category_names.get(row.category_id, '') if row.category_id is not None else ''
+    return {
+        'date_text': (row.date or '')[:10],
+        'description_text': row.description or '',
+        'category_text': category,
+        'amount_text': f"{from_cents(row.amount_cents):.2f} €",
+        'amount_color': TYPE_COLORS.get(row.type, '#FFFFFF'),
+    }
+
+class SearchController:
+    """Búsqueda mientras se escribe, con las consultas agrupadas (debounce).
+
+    set_text() se llama en cada tecla: solo reprograma la búsqueda para SEARCH_DELAY_SECONDS
+    después. La consulta va al pool de lectores de db_worker y, de vuelta en el hilo de Kivy,
+    on_results(texto, filas, ms) recibe el resultado; filas es None si el texto es demasiado
+    corto. Un resultado que llega cuando ya se ha escrito otra cosa se descarta.
+    """
+
+    def __init__(self, on_results, delay: float = SEARCH_DELAY_SECONDS, limit: int = SEARCH_LIMIT):
+        self.on_results = on_results
+        self.limit = limit
+        self._text = ""
+        self._generation = 0 # Sube con cada cambio del texto
+        self._in_flight = 0 # Búsquedas enviadas a db_worker sin resultado aún
+        self._trigger = Clock.create_trigger(self._search, delay)
+
+    @property
+    def idle(self) -> bool:
+        """True si no hay búsquedas programadas ni en curso."""
+        return not self._trigger.is_triggered and not self._in_flight
+
+    def set_text(self, text: str):
+        """Anota el texto actual y (re)programa la búsqueda."""
+        self._text = text.strip()
+        self._generation += 1
+        self._trigger.cancel()
+        self._trigger()
+
+    def cancel(self):
+        """Descarta la búsqueda programada y cualquier resultado pendiente (p.ej. al cerrar el popup)."""
+        self._generation += 1
+        self._trigger.cancel()
+
+    def _search(self, dt=None):
+        text, generation = self._text, self._generation
+        if len(text) < MIN_SEARCH_CHARS:
+            self.on_results(text, None, 0.0)
+            return
+        started = time.perf_counter()
+        self._in_flight += 1
+        db_worker.submit_read(search_transactions, text, self.limit,
+                              on_done=lambda rows: self._deliver(generation, text, rows, started),
+                              on_error=lambda error: self._deliver(generation, text, [], started, error))
+
+    def _deliver(self, generation: int, text: str, rows: list, started: float, error: Exception = None):
+        self._in_flight -= 1
+        if error is not None:
+            logging.error(f"Error al buscar '{text}': {error}")
+        if generation != self._generation:
+            return # Ya se ha escrito otra cosa (o se cerró la búsqueda)
+        self.on_results(text, rows, (time.perf_counter() - started) * 1000)
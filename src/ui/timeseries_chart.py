@@ -0,0 +1,98 @@
+import logging
+
+from matplotlib import dates as mdates, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from src.ui.chart import AXES_LEFT, AXES_RIGHT
+from src.ui.donut_chart import BACKGROUND_COLOR, LABEL_COLOR
+
+# --- Estilo del gráfico de evolución (a juego con el donut) ---
+SPENDING_COLOR = '#FF5252'
+GRID_COLOR = '#333333'
+TITLES = {'balance': 'Evolución del Balance', 'spending': 'Gasto'}
+PERIOD_LABELS = {'day': 'por día', 'week': 'por semana', 'month': 'por mes'}
+
+def _format_euros(cents, pos=None) -> str:
+    """Etiqueta corta del eje y (en céntimos): 1234 €, 12k €, 1.2M €."""
+    euros = cents / 100
+    if abs(euros) >= 1_000_000:
+        return f"{euros / 1_000_000:.1f}M €"
+    if abs(euros) >= 10_000:
+        return f"{euros / 1000:.0f}k €"
+    return f"{euros:,.0f} €"
+
+class TimeSeriesChart:
+    """Gráfico de línea de una serie de src/timeseries.py, creado una vez y actualizado en su sitio.
+
+    La figura, los ejes y la línea viven mientras viva el gráfico: update() solo cambia los
+    datos de la línea (set_data), los límites y el título. Como CategoryChart, no usa pyplot
+    y se rasteriza con Agg a un buffer RGBA desde el hilo de dibujo.
+    """
+
+    def __init__(self):
+        with style.context('dark_background'):
+            self.figure = Figure(figsize=(8, 6))
+            self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.figure.patch.set_facecolor(BACKGROUND_COLOR)
+        # Márgenes fijos: TimeSeriesView los usa para pasar de píxeles a días
+        self.figure.subplots_adjust(left=AXES_LEFT, right=AXES_RIGHT, bottom=0.12, top=0.88)
+        self.ax.set_facecolor(BACKGROUND_COLOR)
+        self.ax.grid(True, color=GRID_COLOR, linewidth=0.5)
+        for spine in self.ax.spines.values():
+            spine.set_color(GRID_COLOR)
+        self.ax.tick_params(colors='#BDBDBD', labelsize=9)
+        # El eje x son días desde 1970: el origen de fechas de matplotlib
+        locator = mdates.AutoDateLocator()
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        self.ax.yaxis.set_major_formatter(FuncFormatter(_format_euros))
+        self.title = self.ax.set_title('', color='white', pad=12, fontsize=14, fontweight='bold')
+        self.line, = self.ax.plot([], [], linewidth=1.5)
+        self.empty_text = self.ax.text(0.5, 0.5, 'Sin transacciones', transform=self.ax.transAxes,
+                                       ha='center', va='center', color='#BDBDBD')
+        self._data_key = None
+
+    def invalidate(self):
+        """Obliga a redibujar en el próximo update() aunque los datos no cambien."""
+        self._data_key = None
+
+    def update(self, metric: str, series, window: tuple | None, size: tuple[int, int] = None) -> bool:
+        """Muestra la serie (o nada si es None) en la ventana de días dada. False si no hacía falta redibujar."""
+        size = size or tuple(int(v) for v in self.canvas.get_width_height())
+        data_key = (size, metric, window, None if series is None else
+                    (series.granularity, series.days.tobytes(), series.cents.tobytes()))
+        if data_key == self._data_key:
+            return False
+        self._data_key = data_key
+
+        dpi = self.figure.dpi
+        self.figure.set_size_inches(max(size[0], 1) / dpi, max(size[1], 1) / dpi, forward=False)
+
+        color = SPENDING_COLOR if metric == 'spending' else LABEL_COLOR
+        self.line.set_color(color)
+        if series is None or not len(series.days):
+            self.line.set_data([], [])
+            self.empty_text.set_visible(True)
+            self.title.set_text(TITLES[metric])
+            return True
+
+        self.empty_text.set_visible(False)
+        # El balance es el saldo al cerrar cada periodo: se mantiene hasta el siguiente
+        self.line.set_drawstyle('steps-post' if metric == 'balance' else 'default')
+        self.line.set_data(series.days, series.cents)
+        self.ax.set_xlim(window[0], window[1])
+        low, high = float(series.cents.min()), float(series.cents.max())
+        margin = (high - low) * 0.05 or abs(high) * 0.05 or 100
+        self.ax.set_ylim(min(low, 0) - margin if metric == 'spending' else low - margin, high + margin)
+        title = TITLES[metric] if metric == 'balance' else f"{TITLES[metric]} {PERIOD_LABELS[series.granularity]}"
+        self.title.set_text(title)
+        logging.debug(f"Serie '{metric}' con {len(series.days)} puntos ({series.granularity}).")
+        return True
+
+    def render(self) -> tuple[memoryview, tuple[int, int]]:
+        """Rasteriza la figura y devuelve (buffer RGBA, (ancho, alto)); válido hasta el siguiente render()."""
+        self.canvas.draw()
+        return self.canvas.buffer_rgba(), self.canvas.get_width_height()
@@ -0,0 +1,11 @@
+import pytest
+
+from src import database
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """BD nueva y migrada en un directorio temporal; devuelve la conexión del hilo."""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / database.DATABASE_NAME))
+    database.create_tables()
+    yield database.get_db_connection()
+    database.close_all_connections()
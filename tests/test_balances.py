@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from src.database import transaction, add_category
+from src.balances import (update_balance_snapshots, rebuild_balances, get_balances_as_of,
+                          balance_cents_before, verify_balances)
+from src.money import from_cents
+
+COLUMNS = ('type', 'description', 'amount_cents', 'date', 'category_id', 'balance_delta_cents')
+INSERT_SQL = f"INSERT INTO Transactions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def random_date(rnd) -> str:
+    return f"{rnd.randint(2023, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} {rnd.randint(0, 23):02d}:00:00"
+
+def add_rows(rnd, category_ids, count):
+    rows = []
+    for i in range(count):
+        delta = rnd.randint(-20000, 50000)
+        rows.append(('Allocation' if delta >= 0 else 'Expense', f"mov {i}", abs(delta),
+                     random_date(rnd), rnd.choice(category_ids), delta))
+    with transaction() as conn:
+        conn.executemany(INSERT_SQL, rows)
+
+def brute_force(db, condition: str, date: str) -> dict:
+    """Saldos recorriendo todo el libro, sin snapshots."""
+    return dict(db.execute(f"""
+        SELECT c.id, COALESCE(SUM(t.balance_delta_cents), 0) FROM Categories c
+        LEFT JOIN Transactions t ON t.category_id = c.id AND t.date {condition} ?
+        GROUP BY c.id""", (date,)).fetchall())
+
+def query_dates(rnd) -> list[str]:
+    # Fechas al azar más los bordes de mes, donde empiezan los snapshots
+    return ([random_date(rnd)[:10] for _ in range(20)] +
+            ['2022-12-31', '2023-01-01', '2024-02-29', '2024-03-01 00:00:00', '2025-12-31', '2026-01-01'])
+
+def assert_matches_ledger(db, rnd):
+    for date in query_dates(rnd):
+        end_of_day = f"{date} 23:59:59" if len(date) == 10 else date
+        expected = brute_force(db, '<=', end_of_day)
+        assert get_balances_as_of(date) == {cat_id: from_cents(cents) for cat_id, cents in expected.items()}
+        before = brute_force(db, '<', date)
+        assert balance_cents_before(db, date) == sum(before.values())
+        for cat_id, cents in before.items():
+            assert balance_cents_before(db, date, cat_id) == cents
+
+@pytest.fixture
+def ledger(db):
+    for name, percentage in (('Ahorro', 50), ('Ocio', 30), ('Casa', 20)):
+        add_category(name, percentage)
+    category_ids = [row[0] for row in db.execute("SELECT id FROM Categories")]
+    rnd = random.Random(10)
+    add_rows(rnd, category_ids, 600)
+    return rnd, category_ids
+
+def test_balances_as_of_match_the_ledger(db, ledger):
+    rnd, _ = ledger
+    assert_matches_ledger(db, rnd) # Sin snapshots
+    assert update_balance_snapshots() > 0
+    assert_matches_ledger(db, rnd)
+    assert update_balance_snapshots() == 0 # Incremental: nada nuevo que guardar
+
+def test_backdated_writes_keep_balances_and_snapshots_right(db, ledger):
+    rnd, category_ids = ledger
+    update_balance_snapshots()
+    snapshots = db.execute("SELECT COUNT(*) FROM BalanceSnapshots").fetchone()[0]
+
+    with transaction() as conn:
+        conn.executemany(INSERT_SQL, [('Expense', 'atrasada', 1234, '2023-02-10 10:00:00', category_ids[0], -1234)])
+        conn.execute("UPDATE Transactions SET date = '2023-05-05 00:00:00' WHERE id = (SELECT MAX(id) FROM Transactions WHERE date > '2025-06-01')")
+        conn.execute("DELETE FROM Transactions WHERE id = (SELECT MIN(id) FROM Transactions WHERE date > '2024-01-01')")
+    # Los snapshots posteriores a febrero de 2023 ya no valen y los triggers los borran
+    assert db.execute("SELECT COUNT(*) FROM BalanceSnapshots").fetchone()[0] < snapshots
+    assert_matches_ledger(db, rnd)
+
+    assert update_balance_snapshots() > 0
+    assert db.execute("SELECT COUNT(*) FROM BalanceSnapshots").fetchone()[0] == snapshots
+    assert_matches_ledger(db, rnd)
+
+    incremental = db.execute("SELECT * FROM BalanceSnapshots ORDER BY category_id, as_of").fetchall()
+    assert rebuild_balances()
+    assert db.execute("SELECT * FROM BalanceSnapshots ORDER BY category_id, as_of").fetchall() == incremental
+    assert verify_balances() == []
@@ -0,0 +1,46 @@
+from src.importers.csv_import import import_csv
+
+HEADER = "Fecha;Concepto;Importe\n"
+
+def write_csv(path, lines) -> str:
+    path.write_text(HEADER + "".join(f"{line}\n" for line in lines), encoding='utf-8')
+    return str(path)
+
+def transaction_count(db) -> int:
+    return db.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0]
+
+def test_reimporting_the_same_file_inserts_nothing(db, tmp_path):
+    path = write_csv(tmp_path / "extracto.csv", [
+        "01/03/2025;Nómina;1.500,00", "01/03/2025;Café;-2,50", "02/03/2025;Supermercado;-45,10"])
+    assert import_csv(path) == {'inserted': 3, 'skipped': 0, 'invalid': 0}
+    assert import_csv(path) == {'inserted': 0, 'skipped': 3, 'invalid': 0}
+    assert transaction_count(db) == 3
+
+def test_identical_rows_on_the_same_day_are_kept(db, tmp_path):
+    path = write_csv(tmp_path / "extracto.csv", ["05/03/2025;Café;-2,50", "05/03/2025;Café;-2,50"])
+    assert import_csv(path)['inserted'] == 2
+    assert import_csv(path)['inserted'] == 0
+    assert transaction_count(db) == 2
+
+def test_overlapping_extract_only_adds_new_rows(db, tmp_path):
+    first = write_csv(tmp_path / "marzo.csv", [
+        "01/03/2025;Café;-2,50", "02/03/2025;Café;-2,50", "02/03/2025;Café;-2,50"])
+    # Repite el día 2 con una tercera compra idéntica y añade el día 3
+    second = write_csv(tmp_path / "marzo_2.csv", [
+        "02/03/2025;Café;-2,50", "02/03/2025;Café;-2,50", "02/03/2025;Café;-2,50", "03/03/2025;Luz;-60,00"])
+    import_csv(first)
+    assert import_csv(second) == {'inserted': 2, 'skipped': 2, 'invalid': 0}
+    assert db.execute("SELECT COUNT(*) FROM Transactions WHERE date LIKE '2025-03-02%'").fetchone()[0] == 3
+    assert transaction_count(db) == 5
+
+def test_same_movements_from_another_account_are_not_duplicates(db, tmp_path):
+    path = write_csv(tmp_path / "extracto.csv", ["01/03/2025;Transferencia;-100,00"])
+    assert import_csv(path, source='Cuenta A')['inserted'] == 1
+    assert import_csv(path, source='Cuenta B')['inserted'] == 1
+    assert import_csv(path, source='Cuenta A')['inserted'] == 0
+
+def test_invalid_rows_are_counted_and_skipped(db, tmp_path):
+    path = write_csv(tmp_path / "extracto.csv", ["no es fecha;Café;-2,50", "01/03/2025;Café;", "01/03/2025;Café;-2,50"])
+    assert import_csv(path) == {'inserted': 1, 'skipped': 0, 'invalid': 2}
+    row = db.execute("SELECT type, amount_cents, date, balance_delta_cents FROM Transactions").fetchone()
+    assert tuple(row) == ('Expense', 250, '2025-03-01 00:00:00', 0)
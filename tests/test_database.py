@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from src.database import get_dashboard_summary, add_category, distribute_income, add_transaction, transaction, TRANSACTION_TYPES
+from src.money import from_cents
+
+def direct_summary(db, start_date=None, end_date=None) -> dict:
+    """Los mismos totales con SUM directos sobre Categories y Transactions."""
+    total_percentage, total_cents, count = db.execute(
+        "SELECT COALESCE(SUM(percentage), 0), COALESCE(SUM(balance_cents), 0), COUNT(*) FROM Categories").fetchone()
+    totals = {t: db.execute("SELECT COALESCE(SUM(amount_cents), 0) FROM Transactions WHERE type = ? "
+                            "AND date >= ? AND date < ?", (t, start_date or '0000-01-01', end_date or '9999-12-31')).fetchone()[0]
+              for t in TRANSACTION_TYPES}
+    return {'total_percentage': total_percentage, 'total_balance': from_cents(total_cents),
+            'total_balance_cents': total_cents, 'category_count': count, 'totals_cents': totals}
+
+def test_empty_database(db):
+    summary = get_dashboard_summary()
+    assert summary == direct_summary(db)
+    assert summary['total_balance_cents'] == 0 and summary['category_count'] == 0
+    assert set(summary['totals_cents'].values()) == {0}
+
+def test_summary_matches_direct_sums(db):
+    add_category('Ahorro', 55.5)
+    add_category('Ocio', 30)
+    add_category('Sin reparto', 0)
+    distribute_income(1234.56)
+    add_transaction('Expense', 'Cine', 12.5, 2)
+    add_transaction('Income', 'Regalo', 50)
+    rnd = random.Random(6)
+    with transaction() as conn:
+        conn.executemany("INSERT INTO Transactions (type, description, amount_cents, date, category_id, balance_delta_cents) "
+                         "VALUES (?, 'mov', ?, ?, ?, ?)",
+                         [('Expense', cents, f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 10:00:00",
+                           rnd.choice([1, 2, None]), 0) for cents in (rnd.randint(1, 9999) for _ in range(300))])
+    assert get_dashboard_summary() == direct_summary(db)
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2025-01-01', '2026-01-01'), ('2025-03-15', '2025-03-16'), ('2025-02-10', '2025-11-20'),
+    (None, '2025-06-01'), ('2025-06-01', None)])
+def test_summary_date_ranges(db, start_date, end_date):
+    rnd = random.Random(start_date or end_date)
+    with transaction() as conn:
+        conn.executemany("INSERT INTO Transactions (type, description, amount_cents, date, balance_delta_cents) "
+                         "VALUES (?, 'mov', ?, ?, 0)",
+                         [(rnd.choice(TRANSACTION_TYPES), rnd.randint(1, 9999),
+                           f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} {rnd.randint(0, 23):02d}:00:00")
+                          for _ in range(500)])
+    assert get_dashboard_summary(start_date, end_date) == direct_summary(db, start_date, end_date)
+
+class StepFailed(Exception):
+    pass
+
+def test_failed_block_is_rolled_back_and_reraised(db):
+    add_category('Ahorro', 60)
+    with pytest.raises(StepFailed):
+        with transaction() as conn:
+            conn.execute("UPDATE Categories SET percentage = 10")
+            with transaction() as inner:
+                inner.execute("UPDATE Categories SET name = 'Otro'")
+                raise StepFailed()
+    assert not db.in_transaction
+    assert tuple(db.execute("SELECT name, percentage FROM Categories").fetchone()) == ('Ahorro', 60)
+
+@pytest.mark.parametrize('nested', [False, True])
+def test_original_error_survives_a_transaction_sqlite_already_rolled_back(db, nested):
+    # Como tras un error que hace que SQLite deshaga la transacción por su cuenta (disco lleno, E/S...)
+    with pytest.raises(StepFailed):
+        with transaction() as conn:
+            if nested:
+                with transaction() as inner:
+                    inner.execute("ROLLBACK")
+                    raise StepFailed()
+            conn.execute("ROLLBACK")
+            raise StepFailed()
+    assert not db.in_transaction
+    # La conexión sigue usable
+    assert add_category('Ahorro', 60)
+    assert db.execute("SELECT COUNT(*) FROM Categories").fetchone()[0] == 1
@@ -0,0 +1,33 @@
+import logging
+import threading
+
+from src.db_worker import DatabaseWorker
+
+def direct_worker() -> DatabaseWorker:
+    # Sin Kivy: los callbacks se entregan en el propio hilo que termina la tarea
+    return DatabaseWorker(readers=1, dispatch=lambda deliver: deliver())
+
+def test_results_and_errors_reach_their_callbacks():
+    worker = direct_worker()
+    results, errors, delivered = [], [], threading.Event()
+    worker.submit(lambda: 42, on_done=results.append)
+    worker.submit_read(lambda: 1 / 0, on_error=lambda e: (errors.append(e), delivered.set()))
+    worker.shutdown()
+    assert delivered.is_set()
+    assert results == [42]
+    assert isinstance(errors[0], ZeroDivisionError)
+
+def test_failing_callback_is_logged_and_later_work_still_runs(caplog):
+    worker = direct_worker()
+    results = []
+
+    def broken_callback(result):
+        raise RuntimeError("widget roto")
+
+    with caplog.at_level(logging.ERROR):
+        worker.submit(lambda: 'primera', on_done=broken_callback)
+        worker.submit(lambda: 1 / 0, on_error=broken_callback)
+        worker.submit(lambda: 'segunda', on_done=results.append)
+        worker.shutdown()
+    assert results == ['segunda']
+    assert sum("widget roto" in record.getMessage() for record in caplog.records) == 2
@@ -0,0 +1,106 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from src import database
+from src.distribution import allocate, allocate_batch, distribute_incomes
+from src.money import to_cents, from_cents
+
+def exact_quotas(income_cents: int, percentages) -> list[Fraction]:
+    return [income_cents * max(Fraction(Decimal(str(p))), Fraction(0)) / 100 for p in percentages]
+
+def expected_total(income_cents: int, percentages) -> int:
+    """Ingreso × (suma de porcentajes / 100), redondeado a la mitad hacia arriba."""
+    total = sum(exact_quotas(income_cents, percentages), Fraction(0))
+    return int((Decimal(total.numerator) / Decimal(total.denominator)).to_integral_value(rounding=ROUND_HALF_UP))
+
+def random_percentages(rnd: random.Random) -> list[float]:
+    n = rnd.randint(1, 12)
+    if rnd.random() < 0.5: # Porcentajes que suman exactamente 100
+        cuts = sorted(rnd.randint(0, 10000) for _ in range(n - 1))
+        return [(b - a) / 100 for a, b in zip([0, *cuts], [*cuts, 10000])]
+    return [round(rnd.uniform(0, 60), rnd.choice([0, 2, 4])) for _ in range(n)]
+
+@pytest.mark.parametrize('seed', range(20))
+def test_shares_are_exact_and_within_one_cent_of_their_quota(seed):
+    rnd = random.Random(seed)
+    percentages = random_percentages(rnd)
+    incomes = [rnd.choice([1, 7, 99, 100]) if rnd.random() < 0.2 else rnd.randint(0, 10 ** 9) for _ in range(50)]
+    shares = allocate_batch(incomes, percentages)
+    assert shares.shape == (len(incomes), len(percentages))
+    for income, row in zip(incomes, shares.tolist()):
+        assert sum(row) == expected_total(income, percentages)
+        for share, quota in zip(row, exact_quotas(income, percentages)):
+            assert quota - 1 < share < quota + 1
+            assert share >= 0
+
+@pytest.mark.parametrize('seed', range(5))
+def test_percentages_summing_100_split_every_cent(seed):
+    rnd = random.Random(seed)
+    percentages = random_percentages(rnd)
+    while abs(sum(percentages) - 100) > 1e-9:
+        percentages = random_percentages(rnd)
+    incomes = [rnd.randint(0, 10 ** 7) for _ in range(200)]
+    assert allocate_batch(incomes, percentages).sum(axis=1).tolist() == incomes
+
+def test_ties_give_leftover_cents_to_the_first_categories():
+    assert allocate(100, [100 / 3] * 3) == [34, 33, 33]
+    assert allocate(200, [100 / 3] * 3) == [67, 67, 66]
+    assert allocate(1, [25, 25, 25, 25]) == [1, 0, 0, 0]
+    assert allocate(3, [25, 25, 25, 25]) == [1, 1, 1, 0]
+
+def test_zero_and_full_percentages():
+    assert allocate(12345, [100]) == [12345]
+    assert allocate(12345, [0, 100, 0]) == [0, 12345, 0]
+    assert allocate(12345, [0, 0]) == [0, 0]
+    assert allocate(12345, [-5, 100]) == [0, 12345] # Un porcentaje negativo cuenta como 0
+    assert allocate(0, [30, 70]) == [0, 0]
+
+def test_batch_matches_one_by_one():
+    rnd = random.Random(42)
+    percentages = [12.5, 33.333333, 20, 0, 34.166667]
+    incomes = [rnd.randint(0, 10 ** 6) for _ in range(100)]
+    assert allocate_batch(incomes, percentages).tolist() == [allocate(income, percentages) for income in incomes]
+
+def test_huge_incomes_stay_exact():
+    income = 10 ** 17 + 1 # Fuera del rango seguro de int64 para las cuotas: se calcula con enteros de Python
+    shares = allocate(income, [50, 25, 25])
+    assert shares == [income // 2 + 1, income // 4, income // 4]
+
+def test_edge_shapes_and_negative_income():
+    assert allocate_batch([], [50, 50]).shape == (0, 2)
+    assert allocate_batch([100], []).shape == (1, 0)
+    with pytest.raises(ValueError):
+        allocate_batch(np.array([100, -1]), [100])
+
+@pytest.mark.parametrize('amount, cents', [(1.005, 101), (0.1 + 0.2, 30), ('12.345', 1235), (7, 700), (-2.5, -250)])
+def test_to_cents_rounds_half_up_without_float_error(amount, cents):
+    assert to_cents(amount) == cents
+    assert from_cents(cents) == cents / 100
+
+def test_distribute_income_sets_balances_that_add_up_to_the_income(db):
+    for name, percentage in [('Ahorro', 100 / 3), ('Ocio', 100 / 3), ('Casa', 100 / 3), ('Vacía', 0)]:
+        assert database.add_category(name, percentage)
+
+    assert database.distribute_income(1000)
+    balances = [row[0] for row in db.execute("SELECT balance_cents FROM Categories ORDER BY id")]
+    assert balances == [33334, 33333, 33333, 0]
+    allocations = db.execute("SELECT category_id, amount_cents FROM Transactions WHERE type = 'Allocation' ORDER BY id").fetchall()
+    assert [tuple(row) for row in allocations] == [(1, 33334), (2, 33333), (3, 33333)]
+
+def test_distribute_income_rejects_non_positive_income(db):
+    assert database.add_category('Ahorro', 100)
+    assert not database.distribute_income(0)
+    assert db.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 0
+
+def test_several_incomes_are_applied_in_date_order(db):
+    assert database.add_category('Ahorro', 60)
+    assert database.add_category('Ocio', 40)
+    distribution = distribute_incomes([100, 1000], dates=['2025-02-01 00:00:00', '2025-01-01 00:00:00'])
+    assert distribution.category_ids == [1, 2]
+    assert distribution.shares_cents.tolist() == [[6000, 4000], [60000, 40000]]
+    # La más reciente es la última en ESTABLECER el balance
+    assert [row[0] for row in db.execute("SELECT balance_cents FROM Categories ORDER BY id")] == [6000, 4000]
@@ -0,0 +1,133 @@
+import random
+
+import pytest
+
+from src import history
+from src.database import transaction
+from src.history import get_transactions_page, iter_transactions, search_transactions
+
+COLUMNS = ('type', 'description', 'amount_cents', 'date', 'category_id', 'balance_delta_cents')
+
+def add_rows(rows):
+    with transaction() as conn:
+        conn.executemany(f"INSERT INTO Transactions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+def all_pages(limit, **filters) -> list:
+    rows, after = [], None
+    while True:
+        page, after = get_transactions_page(limit, after, **filters)
+        assert len(page) <= limit
+        rows.extend(page)
+        if after is None:
+            return rows
+
+def test_pages_have_no_gaps_or_duplicates_with_equal_dates(db):
+    rnd = random.Random(3)
+    # Pocas fechas distintas: casi todas las páginas cortan dentro de un grupo de fechas iguales
+    dates = ['2025-01-01 00:00:00', '2025-01-02 12:00:00', '2025-02-01 00:00:00']
+    add_rows([(rnd.choice(['Income', 'Expense']), f"mov {i}", rnd.randint(1, 5000), rnd.choice(dates), None, 0)
+              for i in range(503)])
+    expected = [tuple(row) for row in db.execute("SELECT id, date FROM Transactions ORDER BY date DESC, id DESC")]
+    for limit in (1, 7, 50, 503, 1000):
+        assert [(row.id, row.date) for row in all_pages(limit)] == expected
+
+def test_filtered_pages_match_the_filtered_query(db):
+    add_rows([('Expense' if i % 3 else 'Income', f"mov {i}", 100 * (i % 40), f"2025-03-{i % 5 + 1:02d} 00:00:00",
+               i % 4 or None, 0) for i in range(300)])
+    expected = [row[0] for row in db.execute("""
+        SELECT id FROM Transactions
+        WHERE type = 'Expense' AND category_id = 2 AND amount_cents BETWEEN 500 AND 3000
+          AND date >= '2025-03-02' AND date < '2025-03-05'
+        ORDER BY date DESC, id DESC""")]
+    assert expected
+    filters = dict(types='Expense', category_id=2, min_amount=5, max_amount=30,
+                   date_from='2025-03-02', date_to='2025-03-05')
+    assert [row.id for row in all_pages(4, **filters)] == expected
+    assert [row.id for row in iter_transactions(page_size=3, **filters)] == expected
+
+def test_empty_history_has_no_next_page(db):
+    assert get_transactions_page(10) == ([], None)
+
+def add_descriptions(descriptions, date='2025-03-01 00:00:00', category_id=None):
+    add_rows([('Expense', description, 100, date, category_id, 0) for description in descriptions])
+
+def found(text, **kwargs) -> list[str]:
+    return [row.description for row in search_transactions(text, **kwargs)]
+
+def test_search_matches_prefixes_without_diacritics(db):
+    add_descriptions(['Nómina marzo', 'Nomenclatura', 'Camión de mudanza', 'Café', 'CAFETERÍA Central', 'Ñandú'])
+    assert sorted(found('nom')) == ['Nomenclatura', 'Nómina marzo']
+    assert found('nomina') == ['Nómina marzo']
+    assert found('NÓMINA') == ['Nómina marzo']
+    assert found('camion') == ['Camión de mudanza']
+    assert sorted(found('cafe')) == ['CAFETERÍA Central', 'Café']
+    assert found('nandu') == ['Ñandú']
+    assert found('marzo nom') == ['Nómina marzo']
+
+def test_every_term_must_match(db):
+    add_descriptions(['Compra supermercado Lidl', 'Compra farmacia', 'Supermercado Mercadona'])
+    assert found('compra super') == ['Compra supermercado Lidl']
+    assert sorted(found('super')) == ['Compra supermercado Lidl', 'Supermercado Mercadona']
+    assert found('compra gasolina') == []
+
+@pytest.mark.parametrize('text', ['a\'b"c', '"', "'", 'NOT', 'AND OR', 'NEAR(a b)', 'desc:*', '-a', '^a', '*', '(', 'a + b'])
+def test_quotes_and_fts_operators_are_plain_text(db, text):
+    add_descriptions(['a\'b"c', 'NOT AND OR', 'NEAR a b', 'desc a', 'otra'])
+    # Nunca es un error de sintaxis de FTS5: cada palabra es un término más
+    expected = [row[0] for row in db.execute("SELECT description FROM Transactions")
+                if all(any(word.lower().startswith(term.lower()) for word in history._search_terms(row[0]))
+                       for term in history._search_terms(text))]
+    assert sorted(found(text)) == (sorted(expected) if history._search_terms(text) else [])
+
+def test_empty_search(db):
+    add_descriptions(['Café'])
+    assert found('') == [] and found('   ') == [] and found('¿?!') == []
+
+def test_ranking_with_filters(db):
+    add_rows([
+        ('Expense', 'Café', 100, '2025-03-01 10:00:00', 1, 0),
+        ('Expense', 'Café con leche y tostada en el bar de la esquina', 100, '2025-03-05 10:00:00', 1, 0),
+        ('Expense', 'Café café', 100, '2025-03-03 10:00:00', 1, 0),
+        ('Expense', 'Café', 100, '2025-03-02 10:00:00', 2, 0),
+        ('Income', 'Café', 100, '2025-03-04 10:00:00', 1, 0),
+        ('Expense', 'Café', 100, '2025-04-01 10:00:00', 1, 0),
+    ])
+    rows = search_transactions('cafe', types='Expense', category_id=1, date_from='2025-03-01', date_to='2025-04-01')
+    # Más relevante primero (bm25: la descripción más corta con más apariciones); a igualdad, la más reciente
+    assert [row.date[:10] for row in rows] == ['2025-03-03', '2025-03-01', '2025-03-05']
+    assert all(row.category_id == 1 and row.type == 'Expense' for row in rows)
+    assert [row.id for row in search_transactions('cafe', limit=2)] == [3, 6]
+
+def test_ranking_only_among_the_latest_candidates(db, monkeypatch):
+    monkeypatch.setattr(history, 'RANK_CANDIDATES', 5)
+    # Las más antiguas son las más relevantes, pero quedan fuera de las 5 candidatas más recientes
+    add_descriptions(['Alquiler'] * 10)
+    add_descriptions(['Alquiler del piso de la calle Mayor número 5'] * 10)
+    rows = search_transactions('alquiler', limit=50)
+    assert sorted(row.id for row in rows) == list(range(16, 21))
+
+def test_like_fallback_without_search_index(db, monkeypatch):
+    add_rows([('Expense', description, 100 * i, f"2025-03-{i + 1:02d} 00:00:00", None, 0)
+              for i, description in enumerate(['Compra super', 'Super compra', 'Compra', 'superficie', '100% super_x'])])
+    with_index = found('compra super')
+    monkeypatch.setattr(history, '_has_search_index', lambda conn: False)
+    # Sin FTS5 se busca cada palabra en cualquier parte, de la más reciente a la más antigua
+    assert found('compra super') == ['Super compra', 'Compra super']
+    assert sorted(with_index) == sorted(found('compra super'))
+    assert found('perf') == ['superficie']
+    assert found('100 x') == ['100% super_x']
+    assert found('super', min_amount=1) == ['100% super_x', 'superficie', 'Super compra']
+
+def test_search_index_follows_updates_and_deletes(db):
+    add_descriptions(['Gasolina', 'Peaje autopista', 'Parking'])
+    with transaction() as conn:
+        conn.execute("UPDATE Transactions SET description = 'Gasóleo' WHERE description = 'Gasolina'")
+        conn.execute("UPDATE Transactions SET amount_cents = 999 WHERE description = 'Parking'") # Sin tocar el texto
+        conn.execute("DELETE FROM Transactions WHERE description = 'Peaje autopista'")
+    assert found('gasolina') == []
+    assert found('gasoleo') == ['Gasóleo']
+    assert found('peaje') == [] and found('autopista') == []
+    assert found('parking') == ['Parking']
+    db.execute("INSERT INTO TransactionsFTS (TransactionsFTS) VALUES ('integrity-check')")
+    indexed = db.execute("SELECT COUNT(*) FROM TransactionsFTS").fetchone()[0]
+    assert indexed == db.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 2
@@ -0,0 +1,163 @@
+import random
+
+import pytest
+
+from src import journal
+from src.database import add_category, update_category, delete_category, add_transaction
+from src.distribution import distribute_incomes
+from src.recurring import add_recurring_rule, materialize_due
+from src.balances import verify_balances
+from src.rollups import verify_rollups
+from src.journal import undo, redo, get_history
+
+def state(db) -> tuple:
+    """Todo lo que deshacer y rehacer deben dejar igual (incluidos balances y totales)."""
+    return tuple(tuple(tuple(row) for row in db.execute(sql)) for sql in (
+        "SELECT id, name, percentage, balance_cents FROM Categories ORDER BY id",
+        "SELECT * FROM RecurringRules ORDER BY id",
+        "SELECT id, type, description, amount_cents, date, category_id, import_hash, balance_delta_cents "
+        "FROM Transactions ORDER BY id",
+        "SELECT * FROM DailyTotals ORDER BY 1, 2, 3",
+        "SELECT * FROM MonthlyTotals ORDER BY 1, 2, 3",
+    ))
+
+def assert_consistent(db):
+    assert verify_balances() == []
+    assert verify_rollups() == []
+    db.execute("INSERT INTO TransactionsFTS (TransactionsFTS) VALUES ('integrity-check')")
+
+def category_id(db, name: str) -> int:
+    return db.execute("SELECT id FROM Categories WHERE name = ?", (name,)).fetchone()[0]
+
+def test_multi_step_undo_and_redo(db):
+    states = [state(db)]
+    add_category('Ahorro', 60)
+    states.append(state(db))
+    add_category('Ocio', 40)
+    states.append(state(db))
+    distribute_incomes([1500])
+    states.append(state(db))
+    add_transaction('Expense', 'Cine', 12.5, category_id(db, 'Ocio'))
+    states.append(state(db))
+    update_category(category_id(db, 'Ahorro'), 'Colchón', 60)
+    states.append(state(db))
+
+    assert undo() == ["Editar categoría ID 1"]
+    assert state(db) == states[4]
+    assert len(undo(2)) == 2
+    assert state(db) == states[2]
+    assert_consistent(db)
+    assert len(redo()) == 1
+    assert state(db) == states[3]
+    assert len(redo(10)) == 2 # Solo quedaban dos por rehacer
+    assert state(db) == states[5]
+    assert_consistent(db)
+
+    assert len(undo(10)) == 5
+    assert state(db) == states[0]
+    assert undo() == []
+    assert len(redo(5)) == 5
+    assert state(db) == states[5]
+    assert_consistent(db)
+
+def test_new_operation_discards_redo(db):
+    add_category('Ahorro', 100)
+    distribute_incomes([100])
+    undo()
+    assert [operation.undone for operation in get_history()] == [1, 0]
+
+    add_category('Ocio', 0)
+    assert redo() == []
+    assert [operation.undone for operation in get_history()] == [0, 2, 0]
+    assert not db.execute("SELECT 1 FROM UndoneTransactions").fetchone()
+    # Deshacer ahora se salta la operación descartada
+    after_first = state(db)
+    undo()
+    assert db.execute("SELECT COUNT(*) FROM Categories").fetchone()[0] == 1
+    redo()
+    assert state(db) == after_first
+    assert_consistent(db)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_undo_across_checkpoints(db, monkeypatch, seed):
+    monkeypatch.setattr(journal, 'CHECKPOINT_INTERVAL', 4)
+    rnd = random.Random(seed)
+    states = [state(db)]
+    for i in range(40):
+        ids = [row[0] for row in db.execute("SELECT id FROM Categories")]
+        action = rnd.random() if ids else 0
+        if action < 0.2 or len(ids) < 2:
+            add_category(f"Cat {i}", rnd.randint(0, 40))
+        elif action < 0.5:
+            update_category(rnd.choice(ids), f"Cat {i}", rnd.randint(0, 40))
+        elif action < 0.6:
+            delete_category(rnd.choice(ids))
+        elif action < 0.8:
+            distribute_incomes([rnd.randint(1, 3000)])
+        else:
+            add_transaction('Expense', f"Gasto {i}", rnd.randint(1, 500) / 100, rnd.choice(ids))
+        states.append(state(db))
+    assert db.execute("SELECT COUNT(*) FROM JournalCheckpoints").fetchone()[0] > 0
+
+    # Deshacer k pasos de golpe: los que empiezan justo tras una copia salen de ella hacia delante
+    total = len(get_history(limit=100))
+    for steps in (1, 3, 5, 12, total):
+        labels = undo(steps)
+        assert len(labels) == steps
+        assert state(db) == states[total - steps]
+        assert_consistent(db)
+        assert len(redo(steps)) == steps
+        assert state(db) == states[total]
+
+def test_undo_restores_from_checkpoint(db, monkeypatch):
+    monkeypatch.setattr(journal, 'CHECKPOINT_INTERVAL', 3)
+    add_category('Ahorro', 50)
+    add_category('Ocio', 50)
+    distribute_incomes([1000])
+    checkpoint_state = state(db)
+    assert db.execute("SELECT MAX(seq) FROM JournalCheckpoints").fetchone()[0] == 3
+    for i in range(10):
+        update_category(1 + i % 2, f"Nombre {i}", 50)
+    # Diez filas hacia atrás frente a dos en la copia: _rows_before parte de la copia de la operación 3
+    assert db.execute("SELECT COUNT(*) FROM JournalRows WHERE seq > 3").fetchone()[0] == 10
+    assert len(undo(10)) == 10
+    assert state(db) == checkpoint_state
+    assert_consistent(db)
+
+def test_undo_recurring_catch_up(db):
+    add_category('Casa', 100)
+    distribute_incomes([2000])
+    rule_id = add_recurring_rule('Expense', 'Alquiler', 650, 'monthly', '2025-01-31', category_id(db, 'Casa'))
+    before = state(db)
+
+    assert materialize_due('2025-04-30 12:00:00') == 4
+    assert db.execute("SELECT next_due FROM RecurringRules WHERE id = ?", (rule_id,)).fetchone()[0] == '2025-05-31 00:00:00'
+    after = state(db)
+
+    assert undo() == ["Transacciones recurrentes vencidas"]
+    assert state(db) == before
+    assert db.execute("SELECT next_due FROM RecurringRules WHERE id = ?", (rule_id,)).fetchone()[0] == '2025-01-31 00:00:00'
+    assert not db.execute("SELECT 1 FROM Transactions WHERE description = 'Alquiler'").fetchone()
+    assert_consistent(db)
+
+    redo()
+    assert state(db) == after
+    assert_consistent(db)
+
+def test_undo_category_delete(db):
+    add_category('Ahorro', 70)
+    add_category('Ocio', 30)
+    distribute_incomes([1000])
+    ocio = category_id(db, 'Ocio')
+    add_transaction('Expense', 'Cine', 20, ocio)
+    before = state(db)
+    assert db.execute("SELECT balance_cents FROM Categories WHERE id = ?", (ocio,)).fetchone()[0] == 28000
+
+    assert delete_category(ocio)
+    assert undo() == [f"Borrar categoría ID {ocio}"]
+    assert state(db) == before # La fila vuelve con su id, porcentaje y balance
+    assert_consistent(db)
+
+    redo()
+    assert not db.execute("SELECT 1 FROM Categories WHERE id = ?", (ocio,)).fetchone()
+    assert_consistent(db)
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+from src import database, migrations
+from src.migrations import apply_migrations, get_schema_version, SCHEMA_VERSION
+
+def query_plan(conn, sql, params=()) -> str:
+    return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+def test_category_date_query_uses_covering_index(db):
+    plan = query_plan(db, """
+        SELECT COALESCE(SUM(balance_delta_cents), 0) FROM Transactions
+        WHERE category_id = ? AND date >= ? AND date <= ?
+    """, (1, '2025-01-01', '2025-01-31 23:59:59'))
+    assert "COVERING INDEX idx_transactions_category_date_delta" in plan
+
+def test_type_date_query_uses_covering_index(db):
+    plan = query_plan(db, """
+        SELECT SUM(amount_cents) FROM Transactions WHERE type = ? AND date >= ? AND date < ?
+    """, ('Expense', '2025-01-01', '2025-02-01'))
+    assert "COVERING INDEX idx_transactions_type_date_amount" in plan
+
+def test_history_page_query_uses_date_index_without_sorting(db):
+    # Misma forma que history.get_transactions_page con cursor
+    plan = query_plan(db, """
+        SELECT id, date, type, description, amount_cents, category_id FROM Transactions
+        WHERE (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?
+    """, ('2025-01-01 00:00:00', 10, 51))
+    assert "idx_transactions_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_apply_migrations_is_noop_when_up_to_date(db):
+    assert get_schema_version(db) == SCHEMA_VERSION
+    schema = db.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+    assert apply_migrations(db) == 0
+    assert get_schema_version(db) == SCHEMA_VERSION
+    assert db.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+def test_database_from_before_migrations_is_upgraded_in_place(tmp_path, monkeypatch):
+    # Esquema de antes del sistema de migraciones (user_version = 0) con datos
+    path = str(tmp_path / database.DATABASE_NAME)
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE Categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE,
+                                 percentage REAL NOT NULL DEFAULT 0, current_balance REAL NOT NULL DEFAULT 0);
+        CREATE TABLE Transactions (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                   type TEXT NOT NULL CHECK(type IN ('Income', 'Expense', 'Allocation')),
+                                   description TEXT, amount REAL NOT NULL, date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                   category_id INTEGER, FOREIGN KEY (category_id) REFERENCES Categories (id) ON DELETE SET NULL);
+        INSERT INTO Categories (name, percentage, current_balance) VALUES ('Ahorro', 60, 600), ('Ocio', 40, 400);
+        INSERT INTO Transactions (type, description, amount, category_id) VALUES
+            ('Allocation', 'Asignación del 60.00% de 1000.00€', 600, 1),
+            ('Allocation', 'Asignación del 40.00% de 1000.00€', 400, 2);
+    """)
+    legacy.close()
+
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    try:
+        database.create_tables()
+        conn = database.get_db_connection()
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        assert [row[0] for row in conn.execute("SELECT name FROM Categories ORDER BY id")] == ['Ahorro', 'Ocio']
+        assert conn.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0] == 2
+        # Los importes REAL pasan a céntimos enteros
+        assert [row[0] for row in conn.execute("SELECT balance_cents FROM Categories ORDER BY id")] == [60000, 40000]
+        assert [row[0] for row in conn.execute("SELECT amount_cents FROM Transactions ORDER BY id")] == [60000, 40000]
+        assert apply_migrations(conn) == 0
+    finally:
+        database.close_all_connections()
+
+@pytest.mark.parametrize('already_rolled_back', [False, True])
+def test_failed_migration_keeps_the_last_version_and_its_error(db, monkeypatch, already_rolled_back):
+    def failing_step(conn):
+        conn.execute("CREATE TABLE Temporal (id INTEGER)")
+        if already_rolled_back:
+            conn.execute("ROLLBACK") # Como si SQLite la hubiera deshecho por su cuenta
+        raise ZeroDivisionError("paso roto")
+
+    version = SCHEMA_VERSION + 1
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [(version, "Rota", [failing_step])])
+    monkeypatch.setattr(migrations, 'SCHEMA_VERSION', version)
+    with pytest.raises(ZeroDivisionError, match="paso roto"):
+        apply_migrations(db)
+    assert not db.in_transaction
+    assert get_schema_version(db) == SCHEMA_VERSION
+    assert db.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'Temporal'").fetchone()[0] == 0
+
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from src.distribution import allocate
+from src.database import transaction
+from src.projection import SpendingHistory, load_spending_history, project_balances, simulate
+
+NO_HISTORY = SpendingHistory([], [], np.zeros((0, 0), dtype=np.int64))
+CATEGORIES = [{'id': 1, 'percentage': 50, 'balance_cents': 10000},
+              {'id': 2, 'percentage': 33.33, 'balance_cents': -2500},
+              {'id': 3, 'percentage': 16.67, 'balance_cents': 0}]
+
+def brute_force(shares, start, spending, months, paths, percentiles, carry_over, seed):
+    """Los mismos futuros mes a mes con los mismos sorteos, y np.percentile de cada mes."""
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(0, len(spending), size=(months, paths))
+    balances = np.repeat(np.array(start)[:, None], paths, axis=1)
+    bands, negative = [np.percentile(balances, percentiles, axis=1)], [np.mean(balances < 0, axis=1)]
+    for month in range(months):
+        spent = np.array(spending)[draws[month]].T
+        balances = (balances if carry_over else 0) + np.array(shares)[:, None] - spent
+        bands.append(np.percentile(balances, percentiles, axis=1))
+        negative.append(np.mean(balances < 0, axis=1))
+    return np.stack(bands, axis=1), np.array(negative)
+
+@pytest.mark.parametrize('carry_over', [True, False])
+@pytest.mark.parametrize('seed', range(3))
+def test_simulate_matches_month_by_month_paths(carry_over, seed):
+    rnd = np.random.default_rng(100 + seed)
+    shares, start = rnd.integers(0, 50000, 4), rnd.integers(-20000, 20000, 4)
+    spending = rnd.integers(0, 60000, (7, 4))
+    percentiles = (5, 25, 50, 75, 95)
+    bands, negative = simulate(shares, start, spending, 6, 501, percentiles, carry_over, seed)
+    expected_bands, expected_negative = brute_force(shares, start, spending, 6, 501, percentiles, carry_over, seed)
+    assert np.allclose(bands, expected_bands)
+    assert np.array_equal(negative, expected_negative)
+
+def test_zero_history_is_deterministic():
+    projection = project_balances(2000, CATEGORIES, months=12, paths=200, history=NO_HISTORY, seed=1)
+    shares = allocate(200000, [category['percentage'] for category in CATEGORIES])
+    for i, category in enumerate(CATEGORIES):
+        expected = [category['balance_cents'] + k * shares[i] for k in range(13)]
+        for p in range(len(projection.percentiles)):
+            assert projection.bands_cents[p, :, i].tolist() == expected
+
+def test_without_carry_over_each_month_starts_from_the_share():
+    history = SpendingHistory([1, 2, 3], ['2025-01'], np.array([[30000, 50000, 1000]]))
+    projection = project_balances(1000, CATEGORIES, months=4, paths=100, history=history, carry_over=False, seed=2)
+    shares = allocate(100000, [category['percentage'] for category in CATEGORIES])
+    assert projection.bands_cents[:, 0, :].tolist() == [[10000, -2500, 0]] * 5 # Mes 0: el balance de hoy
+    for month in range(1, 5):
+        assert projection.bands_cents[:, month, :].tolist() == [[shares[0] - 30000, shares[1] - 50000, shares[2] - 1000]] * 5
+    assert projection.negative_probability[1:].tolist() == [[0, 1, 0]] * 4
+
+def test_negative_probability_degenerate_cases():
+    history = SpendingHistory([1, 2, 3], ['2025-01', '2025-02'], np.array([[0, 90000, 0], [0, 95000, 0]]))
+    projection = project_balances(1000, CATEGORIES, months=6, paths=300, history=history, seed=3)
+    # Ahorro nunca gasta; Ocio gasta siempre más de lo que recibe; la 3.ª empieza en 0 y no gasta
+    assert projection.negative_probability[:, 0].tolist() == [0] * 7
+    assert projection.negative_probability[:, 1].tolist() == [1] * 7
+    assert projection.negative_probability[:, 2].tolist() == [0] * 7
+
+@pytest.mark.parametrize('months, categories', [(1, 1), (12, 3), (36, 3)])
+def test_output_shapes(months, categories):
+    percentiles = (10, 50, 90)
+    projection = project_balances(1500, CATEGORIES[:categories], months=months, paths=50, percentiles=percentiles,
+                                  history=NO_HISTORY, seed=4)
+    assert projection.category_ids == [category['id'] for category in CATEGORIES[:categories]]
+    assert projection.percentiles == percentiles
+    assert projection.bands_cents.shape == (len(percentiles), months + 1, categories) # Mes 0 = hoy
+    assert projection.negative_probability.shape == (months + 1, categories)
+
+def test_no_categories():
+    projection = project_balances(1500, [], months=5, paths=10, history=NO_HISTORY)
+    assert projection.bands_cents.shape == (5, 6, 0)
+    assert projection.negative_probability.shape == (6, 0)
+
+def test_same_seed_same_projection():
+    history = SpendingHistory([1, 2], ['2025-01', '2025-02', '2025-03'],
+                              np.array([[100, 20000], [5000, 0], [70000, 3000]]))
+    first = project_balances(800, CATEGORIES, months=8, paths=1000, history=history, seed=9)
+    second = project_balances(800, CATEGORIES, months=8, paths=1000, history=history, seed=9)
+    assert np.array_equal(first.bands_cents, second.bands_cents)
+    assert np.array_equal(first.negative_probability, second.negative_probability)
+
+def test_history_uses_closed_months_before_now(db):
+    with transaction() as conn:
+        category_id = conn.execute("INSERT INTO Categories (name, percentage) VALUES ('Casa', 100)").lastrowid
+        conn.executemany("""INSERT INTO Transactions (type, description, amount_cents, date, category_id, balance_delta_cents)
+                            VALUES ('Expense', 'gasto', ?, ?, ?, ?)""",
+                         [(cents, date, category_id, -cents) for cents, date in
+                          [(1000, '2025-01-10 12:00:00'), (300, '2025-03-05 12:00:00'), (700, '2025-05-01 00:00:00')]])
+    history = load_spending_history(now='2025-05-31 23:59:59')
+    assert history.category_ids == [category_id]
+    assert history.months == ['2025-01', '2025-02', '2025-03', '2025-04']  # mayo aún no ha terminado
+    assert history.spending_cents[:, 0].tolist() == [1000, 0, 300, 0]
+    assert load_spending_history(2, now='2025-05-01').months == ['2025-03', '2025-04']
+    assert load_spending_history(now='2025-01-20').months == []
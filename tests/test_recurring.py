@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+
+from src import recurring
+from src.database import add_category
+from src.recurring import add_recurring_rule, materialize_due, next_occurrence, get_recurring_rules
+
+def occurrence_dates(db, description: str) -> list[str]:
+    return [row[0] for row in db.execute("SELECT date FROM Transactions WHERE description = ? ORDER BY id", (description,))]
+
+def next_due(db, rule_id: int):
+    return db.execute("SELECT next_due FROM RecurringRules WHERE id = ?", (rule_id,)).fetchone()[0]
+
+def test_month_end_anchor_does_not_drift():
+    date = datetime(2025, 1, 31)
+    dates = []
+    for _ in range(5):
+        date = next_occurrence(date, 'monthly', 1, 31)
+        dates.append(date.strftime('%Y-%m-%d'))
+    assert dates == ['2025-02-28', '2025-03-31', '2025-04-30', '2025-05-31', '2025-06-30']
+
+def test_monthly_rule_on_the_31st(db):
+    add_recurring_rule('Expense', 'Alquiler', 700, 'monthly', '2025-01-31')
+    assert materialize_due('2025-05-31 00:00:00') == 5
+    assert [date[:10] for date in occurrence_dates(db, 'Alquiler')] == [
+        '2025-01-31', '2025-02-28', '2025-03-31', '2025-04-30', '2025-05-31']
+
+def test_yearly_rule_on_february_29(db):
+    rule_id = add_recurring_rule('Income', 'Cumpleaños', 50, 'yearly', '2024-02-29')
+    assert materialize_due('2029-01-01 00:00:00') == 5
+    assert [date[:10] for date in occurrence_dates(db, 'Cumpleaños')] == [
+        '2024-02-29', '2025-02-28', '2026-02-28', '2027-02-28', '2028-02-29']
+    assert next_due(db, rule_id) == '2029-02-28 00:00:00'
+
+@pytest.mark.parametrize('frequency, interval, expected', [
+    ('weekly', 1, ['2025-03-03', '2025-03-10', '2025-03-17', '2025-03-24', '2025-03-31']),
+    ('weekly', 2, ['2025-03-03', '2025-03-17', '2025-03-31']),
+    ('daily', 10, ['2025-03-03', '2025-03-13', '2025-03-23', '2025-04-02']),
+    ('monthly', 3, ['2025-03-03']),
+    ('monthly', 1, ['2025-03-03', '2025-04-03']),
+])
+def test_intervals(db, frequency, interval, expected):
+    add_recurring_rule('Expense', 'Gasto', 10, frequency, '2025-03-03', interval=interval)
+    assert materialize_due('2025-04-05 00:00:00') == len(expected)
+    assert [date[:10] for date in occurrence_dates(db, 'Gasto')] == expected
+
+def test_catch_up_is_incremental(db):
+    rule_id = add_recurring_rule('Expense', 'Gimnasio', 30, 'monthly', '2025-01-10')
+    assert materialize_due('2025-02-15 00:00:00') == 2
+    assert materialize_due('2025-02-20 00:00:00') == 0
+    assert materialize_due('2025-04-10 00:00:00') == 2
+    assert len(occurrence_dates(db, 'Gimnasio')) == 4
+    assert next_due(db, rule_id) == '2025-05-10 00:00:00'
+
+def test_nothing_due_writes_nothing(db):
+    add_recurring_rule('Expense', 'Gimnasio', 30, 'monthly', '2025-01-10')
+    changes = db.total_changes
+    assert materialize_due('2025-01-09 23:59:59') == 0
+    assert db.total_changes == changes # Ni transacción ni operación vacía en el diario
+    assert not db.in_transaction
+    assert db.execute("SELECT COUNT(*) FROM Journal WHERE label = 'Transacciones recurrentes vencidas'").fetchone()[0] == 0
+
+def test_end_date_as_bare_date(db):
+    rule_id = add_recurring_rule('Expense', 'Curso', 100, 'monthly', '2025-01-15', end_date='2025-03-15')
+    assert materialize_due('2025-02-20 00:00:00') == 2
+    assert next_due(db, rule_id) == '2025-03-15 00:00:00' # Aún falta la última
+    assert materialize_due('2025-12-31 00:00:00') == 1
+    assert [date[:10] for date in occurrence_dates(db, 'Curso')] == ['2025-01-15', '2025-02-15', '2025-03-15']
+    assert next_due(db, rule_id) is None
+    assert get_recurring_rules()[-1]['id'] == rule_id # Las terminadas van al final
+    assert materialize_due('2026-12-31 00:00:00') == 0
+
+def test_end_date_before_now_stops_mid_catch_up(db):
+    rule_id = add_recurring_rule('Expense', 'Curso', 100, 'weekly', '2025-01-06', end_date='2025-01-25')
+    assert materialize_due('2025-06-01 00:00:00') == 3
+    assert next_due(db, rule_id) is None
+
+def test_occurrence_cap_per_rule(db, monkeypatch):
+    monkeypatch.setattr(recurring, 'MAX_OCCURRENCES_PER_RULE', 5)
+    rule_id = add_recurring_rule('Expense', 'Café', 2, 'daily', '2025-01-01')
+    assert materialize_due('2025-01-31 00:00:00') == 5
+    assert next_due(db, rule_id) == '2025-01-06 00:00:00' # Sigue donde lo dejó la próxima vez
+    assert materialize_due('2025-01-31 00:00:00') == 5
+    assert occurrence_dates(db, 'Café')[-1] == '2025-01-10 00:00:00'
+
+def test_invalid_frequency(db):
+    assert add_recurring_rule('Expense', 'Raro', 10, 'hourly', '2025-01-01') is None
+    assert get_recurring_rules() == []
+
+def balance(db, name: str) -> int:
+    return db.execute("SELECT balance_cents FROM Categories WHERE name = ?", (name,)).fetchone()[0]
+
+def test_distributed_income_applies_after_earlier_expenses(db):
+    add_category('Casa', 100)
+    add_recurring_rule('Expense', 'Luz', 60, 'monthly', '2025-03-01 08:00:00', category_id=1)
+    add_recurring_rule('Income', 'Nómina', 1000, 'monthly', '2025-03-01 09:00:00', auto_distribute=True)
+    assert materialize_due('2025-03-02 00:00:00') == 2
+    # El reparto ESTABLECE el balance, así que el gasto de antes queda absorbido
+    assert balance(db, 'Casa') == 100000
+
+def test_expense_after_distributed_income(db):
+    add_category('Casa', 100)
+    add_recurring_rule('Income', 'Nómina', 1000, 'monthly', '2025-03-01 09:00:00', auto_distribute=True)
+    add_recurring_rule('Expense', 'Luz', 60, 'monthly', '2025-03-01 10:00:00', category_id=1)
+    assert materialize_due('2025-05-02 00:00:00') == 6
+    assert balance(db, 'Casa') == 100000 - 6000
+    types = [row[0] for row in db.execute("SELECT type FROM Transactions ORDER BY id")]
+    assert types == ['Income', 'Allocation', 'Expense'] * 3
+
+def test_same_time_occurrences_follow_rule_order(db):
+    add_category('Casa', 100)
+    add_recurring_rule('Income', 'Nómina', 1000, 'monthly', '2025-03-01', auto_distribute=True)
+    add_recurring_rule('Expense', 'Luz', 60, 'monthly', '2025-03-01', category_id=1)
+    add_recurring_rule('Income', 'Extra', 500, 'monthly', '2025-03-01', auto_distribute=True)
+    assert materialize_due('2025-03-01 00:00:00') == 3
+    # Mismo instante: se aplican en el orden de las reglas (la segunda nómina pisa el gasto)
+    assert balance(db, 'Casa') == 50000
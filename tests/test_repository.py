@@ -0,0 +1,64 @@
+from src import database
+from src.database import add_category, update_category, delete_category, add_transaction, transaction
+from src.repository import CategoryRepository
+
+def category_rows(db) -> list[dict]:
+    return [dict(row) for row in database.get_all_categories()]
+
+def test_reads_are_cached_until_categories_change(db, monkeypatch):
+    repository = CategoryRepository()
+    add_category('Ahorro', 60)
+    assert repository.get_all() == category_rows(db)
+
+    reads = []
+    real_get_all = database.get_all_categories
+    monkeypatch.setattr(database, 'get_all_categories', lambda: reads.append(1) or real_get_all())
+    repository.get_all()
+    repository.get_by_id(1)
+    assert reads == []
+
+    add_category('Ocio', 40)
+    assert [category['name'] for category in repository.get_all()] == ['Ahorro', 'Ocio']
+    assert len(reads) == 1
+
+def test_every_write_invalidates_the_cache(db):
+    repository = CategoryRepository()
+    add_category('Ahorro', 60)
+    add_category('Ocio', 40)
+    for write in (lambda: update_category(1, 'Colchón', 50),
+                  lambda: database.distribute_income(1000),
+                  # El balance lo cambia el trigger del libro, no un UPDATE de la propia función
+                  lambda: add_transaction('Expense', 'Cine', 12.5, 2),
+                  lambda: delete_category(1)):
+        repository.get_all()
+        version = repository.version
+        write()
+        assert repository.changed_since(version)
+        assert repository.get_all() == category_rows(db)
+        assert not repository.changed_since(repository.version)
+    assert repository.get_by_id(1) is None
+    assert repository.get_by_id(2)['balance_cents'] == 40000 - 1250
+
+def test_rolled_back_writes_keep_the_cache(db):
+    repository = CategoryRepository()
+    add_category('Ahorro', 60)
+    repository.get_all()
+    version = repository.version
+    try:
+        with transaction() as conn:
+            conn.execute("UPDATE Categories SET percentage = 10")
+            database.mark_changed('Categories')
+            raise RuntimeError("fallo a mitad")
+    except RuntimeError:
+        pass
+    assert not repository.changed_since(version)
+    assert repository.get_all() == category_rows(db)
+
+def test_invalidate_rereads_external_changes(db):
+    repository = CategoryRepository()
+    add_category('Ahorro', 60)
+    repository.get_all()
+    db.execute("UPDATE Categories SET name = 'Cambiado fuera'") # Sin mark_changed: la caché no se entera
+    assert repository.get_by_id(1)['name'] == 'Ahorro'
+    repository.invalidate()
+    assert repository.get_by_id(1)['name'] == 'Cambiado fuera'
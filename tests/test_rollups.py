@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from src.database import transaction
+from src.rollups import ROLLUP_TABLES, verify_rollups
+
+COLUMNS = ('type', 'description', 'amount_cents', 'date', 'category_id', 'balance_delta_cents')
+INSERT_SQL = f"INSERT INTO Transactions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+TYPES = ('Income', 'Expense', 'Allocation')
+
+def stored_totals(db, table: str) -> dict:
+    return {tuple(row[:3]): tuple(row[3:]) for row in db.execute(
+        f"SELECT period, category_key, type, count, amount_cents, delta_cents FROM {table}")}
+
+def ledger_totals(db, length: int) -> dict:
+    """Los mismos totales con un GROUP BY directo sobre Transactions."""
+    return {tuple(row[:3]): tuple(row[3:]) for row in db.execute(f"""
+        SELECT substr(date, 1, {length}), COALESCE(category_id, 0), type,
+               COUNT(*), SUM(amount_cents), SUM(balance_delta_cents)
+        FROM Transactions GROUP BY 1, 2, 3""")}
+
+def assert_rollups_match(db):
+    for table, length in ROLLUP_TABLES.items():
+        assert stored_totals(db, table) == ledger_totals(db, length), table
+    assert verify_rollups() == []
+
+def random_row(rnd, category_ids, i):
+    delta = rnd.randint(-5000, 5000)
+    return (rnd.choice(TYPES), f"mov {i}", abs(delta) or 1,
+            f"2025-{rnd.randint(1, 4):02d}-{rnd.randint(1, 28):02d} 12:00:00", rnd.choice(category_ids), delta)
+
+@pytest.fixture
+def category_ids(db):
+    with transaction() as conn:
+        conn.executemany("INSERT INTO Categories (name, percentage) VALUES (?, ?)", [('Ahorro', 60), ('Ocio', 40)])
+    return [row[0] for row in db.execute("SELECT id FROM Categories")] + [None]
+
+def test_rollups_follow_inserts(db, category_ids):
+    rnd = random.Random(23)
+    with transaction() as conn:
+        conn.executemany(INSERT_SQL, [random_row(rnd, category_ids, i) for i in range(400)])
+    assert_rollups_match(db)
+
+def test_rollups_follow_updates(db, category_ids):
+    rnd = random.Random(24)
+    with transaction() as conn:
+        conn.executemany(INSERT_SQL, [random_row(rnd, category_ids, i) for i in range(200)])
+    ids = [row[0] for row in db.execute("SELECT id FROM Transactions")]
+    with transaction() as conn:
+        for transaction_id in rnd.sample(ids, 60):
+            # Cambia de día, de mes, de categoría, de tipo y de importe (a veces a los mismos valores)
+            type, _, amount_cents, date, category_id, delta = random_row(rnd, category_ids, 0)
+            conn.execute("UPDATE Transactions SET type = ?, amount_cents = ?, date = ?, category_id = ?, "
+                         "balance_delta_cents = ? WHERE id = ?",
+                         (type, amount_cents, date, category_id, delta, transaction_id))
+        conn.execute("UPDATE Transactions SET amount_cents = amount_cents + 1 WHERE date < '2025-02-01'")
+    assert_rollups_match(db)
+
+def test_rollups_follow_deletes(db, category_ids):
+    rnd = random.Random(25)
+    with transaction() as conn:
+        conn.executemany(INSERT_SQL, [random_row(rnd, category_ids, i) for i in range(200)])
+    ids = [row[0] for row in db.execute("SELECT id FROM Transactions")]
+    with transaction() as conn:
+        conn.executemany("DELETE FROM Transactions WHERE id = ?", [(i,) for i in rnd.sample(ids, 80)])
+        conn.execute("DELETE FROM Transactions WHERE date >= '2025-04-01'")
+    assert_rollups_match(db)
+    # Un mes vacío no deja filas de totales
+    assert not db.execute("SELECT 1 FROM MonthlyTotals WHERE period = '2025-04'").fetchone()
+
+    with transaction() as conn:
+        conn.execute("DELETE FROM Transactions")
+    assert_rollups_match(db)
+    assert all(not stored_totals(db, table) for table in ROLLUP_TABLES)
@@ -0,0 +1,111 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.database import add_category, distribute_income, transaction
+from src.timeseries import (AUTO_OVERSAMPLING, choose_granularity, date_to_day, day_to_date, get_date_range,
+                            get_series, load_series, lttb)
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (100, 10), (1000, 999), (5000, 640), (7, 5)])
+def test_lttb_keeps_the_ends_and_returns_threshold_points(n, threshold):
+    rnd = np.random.default_rng(n)
+    x = np.sort(rnd.uniform(0, 1000, n))
+    y = rnd.normal(size=n)
+    sampled_x, sampled_y = lttb(x, y, threshold)
+    assert len(sampled_x) == len(sampled_y) == threshold
+    assert (sampled_x[0], sampled_y[0]) == (x[0], y[0])
+    assert (sampled_x[-1], sampled_y[-1]) == (x[-1], y[-1])
+    assert np.all(np.diff(sampled_x) > 0) # Puntos de la serie, en orden y sin repetir
+    assert set(zip(sampled_x, sampled_y)) <= set(zip(x, y))
+
+def test_lttb_keeps_spikes():
+    x = np.arange(10000)
+    y = np.zeros(10000)
+    y[1234], y[8765] = 50, -50
+    _, sampled_y = lttb(x, y, 100)
+    assert sampled_y.max() == 50 and sampled_y.min() == -50
+
+@pytest.mark.parametrize('n, threshold', [(0, 10), (1, 10), (10, 10), (10, 11), (10, 2), (10, 0)])
+def test_lttb_passes_short_series_through(n, threshold):
+    x = np.arange(n, dtype=np.float64)
+    y = x ** 2
+    sampled_x, sampled_y = lttb(x, y, threshold)
+    assert np.array_equal(sampled_x, x) and np.array_equal(sampled_y, y)
+
+@pytest.mark.parametrize('max_points', [1, 100, 640])
+def test_granularity_switches_at_the_documented_spans(max_points):
+    limit = max_points * AUTO_OVERSAMPLING
+    start = date_to_day('2020-01-01')
+    assert choose_granularity(start, start + limit, max_points) == 'day'
+    assert choose_granularity(start, start + limit + 1, max_points) == 'week'
+    assert choose_granularity(start, start + 7 * limit, max_points) == 'week'
+    assert choose_granularity(start, start + 7 * limit + 1, max_points) == 'month'
+
+def test_granularity_edge_cases():
+    assert choose_granularity(100, 100, 10) == 'day' # Ventana vacía
+    assert choose_granularity(0, 4, 0) == choose_granularity(0, 4, 1)
+
+def test_day_conversions():
+    assert date_to_day('1970-01-01') == 0
+    assert date_to_day('2025-03-17 10:20:00') == date_to_day('2025-03-17')
+    assert day_to_date(date_to_day('2024-02-29') + 0.75) == '2024-02-29'
+
+@pytest.fixture
+def ledger(db):
+    add_category('Ahorro', 60)
+    add_category('Ocio', 40)
+    distribute_income(2500)
+    rnd = random.Random(19)
+    rows = []
+    for i in range(800):
+        cents = rnd.randint(1, 20000)
+        category_id = rnd.choice([1, 2, None])
+        date = f"{rnd.randint(2022, 2025)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 09:00:00"
+        kind = rnd.choice(['Expense', 'Income'])
+        delta = -cents if kind == 'Expense' and category_id else 0
+        rows.append((kind, f"mov {i}", cents, date, category_id, delta))
+    with transaction() as conn:
+        conn.executemany("INSERT INTO Transactions (type, description, amount_cents, date, category_id, balance_delta_cents) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return db
+
+@pytest.mark.parametrize('granularity', ['day', 'week', 'month', 'auto'])
+def test_balance_series_ends_at_the_category_balances(ledger, granularity):
+    day_from, day_to = get_date_range()
+    series = get_series('balance', day_from, day_to, granularity)
+    assert series.cents[-1] == ledger.execute("SELECT SUM(balance_cents) FROM Categories").fetchone()[0]
+    for category_id in (1, 2):
+        series = get_series('balance', day_from, day_to, granularity, category_id)
+        assert series.cents[-1] == ledger.execute("SELECT balance_cents FROM Categories WHERE id = ?",
+                                                  (category_id,)).fetchone()[0]
+
+def test_balance_series_from_a_later_start(ledger):
+    # Empieza a mitad del historial: el saldo inicial sale de los snapshots y del libro
+    day_to = get_date_range()[1]
+    series = get_series('balance', date_to_day('2024-02-10'), day_to, 'week')
+    assert series.cents[-1] == ledger.execute("SELECT SUM(balance_cents) FROM Categories").fetchone()[0]
+    before = ledger.execute("""SELECT SUM(balance_delta_cents) FROM Transactions
+                               WHERE date < '2024-02-12' AND category_id IS NOT NULL""").fetchone()[0]
+    assert series.cents[0] == before # La semana del 10/02 termina el domingo 11
+
+@pytest.mark.parametrize('granularity', ['day', 'week', 'month'])
+def test_spending_series_sums_expenses(ledger, granularity):
+    day_from, day_to = date_to_day('2023-03-15'), date_to_day('2024-09-20')
+    series = get_series('spending', day_from, day_to, granularity)
+    assert series.granularity == granularity
+    assert series.cents.sum() == ledger.execute("""SELECT SUM(amount_cents) FROM Transactions WHERE type = 'Expense'
+                                                   AND date >= '2023-03-15' AND date < '2024-09-20'""").fetchone()[0]
+
+def test_load_series_is_capped_at_max_points(ledger):
+    day_from, day_to = get_date_range()
+    series = load_series('balance', day_from, day_to, 100)
+    assert series.granularity == 'week' and len(series.days) == 100
+    assert series.cents[-1] == ledger.execute("SELECT SUM(balance_cents) FROM Categories").fetchone()[0]
+
+def test_empty_ledger(db):
+    assert get_date_range() is None
+    series = get_series('spending', 0, 10, 'day')
+    assert list(series.cents) == [0] * 10
+    with pytest.raises(ValueError):
+        get_series('otra', 0, 10)